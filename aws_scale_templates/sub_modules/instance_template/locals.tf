@@ -300,6 +300,8 @@ locals {
           fs_name     = disk["fs_name"]
           pool        = disk["pool"]
           device_name = element(local.instance_storage_device_names, jdx)
+          size        = try(tolist(data.aws_ec2_instance_type.storage_profile[0].instance_disks)[0].size, null)
+          type        = "nvme"
         }
         }) : local.is_nitro_instance ? tomap({
         for jdx, disk in tolist(local.flatten_disks_per_vm) :
@@ -307,6 +309,8 @@ locals {
           fs_name     = disk["fs_name"]
           pool        = disk["pool"]
           device_name = element(slice(local.instance_storage_device_names, 1, length(local.instance_storage_device_names) - 1), jdx)
+          size        = disk["size"]
+          type        = disk["type"]
         }
         }) : tomap({
         for jdx, disk in tolist(local.flatten_disks_per_vm) :
@@ -314,6 +318,8 @@ locals {
           fs_name     = disk["fs_name"]
           pool        = disk["pool"]
           device_name = element(local.ebs_device_names, jdx)
+          size        = disk["size"]
+          type        = disk["type"]
         }
       })
     }
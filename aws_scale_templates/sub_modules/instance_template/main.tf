@@ -632,6 +632,8 @@ resource "local_sensitive_file" "write_storage_cluster_inventory" {
     storage_cluster_with_data_volume_mapping = local.storage_instance_ips_with_disk_mapping
     storage_cluster_desc_details             = [for instance in module.storage_cluster_tie_breaker_instance : instance.instance_details]
     storage_cluster_desc_data_volume_mapping = length(module.storage_cluster_tie_breaker_instance) > 0 ? local.storage_instance_desc_ip_with_disk_mapping : {}
+    protocol_cluster_details                 = [for instance in module.protocol_instances : instance.instance_details]
+    ces_private_ips                          = local.storage_and_protocol && var.ces_private_ips != null ? var.ces_private_ips : []
   })
 }
 
@@ -655,6 +657,8 @@ resource "local_sensitive_file" "write_combined_inventory" {
     storage_cluster_with_data_volume_mapping = local.storage_instance_ips_with_disk_mapping
     storage_cluster_desc_details             = [for instance in module.storage_cluster_tie_breaker_instance : instance.instance_details]
     storage_cluster_desc_data_volume_mapping = length(module.storage_cluster_tie_breaker_instance) > 0 ? local.storage_instance_desc_ip_with_disk_mapping : {}
+    protocol_cluster_details                 = [for instance in module.protocol_instances : instance.instance_details]
+    ces_private_ips                          = local.storage_and_protocol && var.ces_private_ips != null ? var.ces_private_ips : []
   })
 }
 
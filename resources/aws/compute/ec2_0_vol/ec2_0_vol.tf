@@ -51,6 +51,18 @@ data "aws_kms_key" "itself" {
   key_id = var.root_device_kms_key_id
 }
 
+# Image and instance type details, used to seed ansible facts
+data "aws_ami" "itself" {
+  filter {
+    name   = "image-id"
+    values = [var.ami_id]
+  }
+}
+
+data "aws_ec2_instance_type" "itself" {
+  instance_type = var.instance_type
+}
+
 resource "aws_instance" "itself" {
   ami                   = var.ami_id
   instance_type         = var.instance_type
@@ -137,9 +149,13 @@ resource "aws_route53_record" "ces_ptr_itself" {
 
 output "instance_details" {
   value = {
-    private_ip = aws_instance.itself.private_ip
-    id         = aws_instance.itself.id
-    dns        = format("%s.%s", var.name_prefix, var.dns_domain)
-    zone       = aws_instance.itself.availability_zone
+    private_ip  = aws_instance.itself.private_ip
+    id          = aws_instance.itself.id
+    dns         = format("%s.%s", var.name_prefix, var.dns_domain)
+    zone        = aws_instance.itself.availability_zone
+    image_name  = data.aws_ami.itself.name
+    arch        = data.aws_ami.itself.architecture
+    vcpus       = data.aws_ec2_instance_type.itself.default_vcpus
+    memory_size = data.aws_ec2_instance_type.itself.memory_size
   }
 }
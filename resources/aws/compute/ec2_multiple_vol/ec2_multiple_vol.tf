@@ -86,6 +86,18 @@ data "aws_kms_key" "itself" {
   key_id = var.root_device_kms_key_id
 }
 
+# Image and instance type details, used to seed ansible facts
+data "aws_ami" "itself" {
+  filter {
+    name   = "image-id"
+    values = [var.ami_id]
+  }
+}
+
+data "aws_ec2_instance_type" "itself" {
+  instance_type = var.instance_type
+}
+
 # Create the EC2 instance
 resource "aws_instance" "itself" {
   ami             = var.ami_id
@@ -173,9 +185,13 @@ resource "aws_volume_attachment" "itself" {
 
 output "instance_details" {
   value = {
-    private_ip = aws_instance.itself.private_ip
-    id         = aws_instance.itself.id
-    dns        = format("%s.%s", var.name_prefix, var.dns_domain)
-    zone       = aws_instance.itself.availability_zone
+    private_ip  = aws_instance.itself.private_ip
+    id          = aws_instance.itself.id
+    dns         = format("%s.%s", var.name_prefix, var.dns_domain)
+    zone        = aws_instance.itself.availability_zone
+    image_name  = data.aws_ami.itself.name
+    arch        = data.aws_ami.itself.architecture
+    vcpus       = data.aws_ec2_instance_type.itself.default_vcpus
+    memory_size = data.aws_ec2_instance_type.itself.memory_size
   }
 }
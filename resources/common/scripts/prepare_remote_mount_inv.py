@@ -19,9 +19,13 @@ limitations under the License.
 import argparse
 import configparser
 import json
+import logging
 import pathlib
 import os
 import sys
+from scale_log import LOG_FORMATS, setup_logging
+
+LOGGER = logging.getLogger("prepare_remote_mount_inv")
 
 
 def cleanup(target_file):
@@ -38,32 +42,26 @@ def read_json_file(json_path):
             try:
                 tf_inv = json.load(json_handler)
             except json.decoder.JSONDecodeError:
-                print(
-                    "Provided terraform inventory file (%s) is not a valid json."
-                    % json_path
-                )
+                LOGGER.error("Provided terraform inventory file (%s) is not a valid json.", json_path)
                 sys.exit(1)
     except OSError:
-        print("Provided terraform inventory file (%s) does not exist." % json_path)
+        LOGGER.error("Provided terraform inventory file (%s) does not exist.", json_path)
         sys.exit(1)
 
     return tf_inv
 
 
-def write_to_file(filepath, filecontent):
+def write_to_file(filepath, filecontent, mode=None):
     """Write to specified file"""
     with open(filepath, "w") as file_handler:
         file_handler.write(filecontent)
+    if mode is not None:
+        os.chmod(filepath, mode)
 
 
-def prepare_remote_mount_playbook(hosts_config, mount_details):
-    """Write to playbook"""
-    if ARGUMENTS.using_rest_initialization == "true":
-        no_gui = False
-    else:
-        no_gui = True
-    content = """---
-# Config remote mount
+def get_remote_mount_play(hosts_config, mount_details, no_gui):
+    """Return remote mount play of one compute/storage cluster pairing"""
+    return """# Config remote mount
 - hosts: {hosts_config}
   collections:
      - ibm.spectrum_scale
@@ -76,7 +74,7 @@ def prepare_remote_mount_playbook(hosts_config, mount_details):
     - scale_remotemount_storage_gui_password: {storage_gui_password}
     - scale_remotemount_storage_gui_hostname: {storage_gui_ip}
     - scale_remotemount_filesystem_name:
-        - {{ scale_remotemount_client_filesystem_name: {compute_fs_name}, scale_remotemount_client_remotemount_path: {compute_fs_mount_path}, scale_remotemount_storage_filesystem_name: {storage_fs_name} }}
+{filesystems}
   pre_tasks:
   roles:
     - remotemount_configure
@@ -89,22 +87,152 @@ def prepare_remote_mount_playbook(hosts_config, mount_details):
         storage_gui_username=mount_details["storage_gui_username"],
         storage_gui_password=mount_details["storage_gui_password"],
         storage_gui_ip=mount_details["storage_gui_ip"],
-        compute_fs_mount_path=mount_details["compute_fs_mnt"],
-        compute_fs_name=mount_details["compute_fs_name"],
-        storage_fs_name=mount_details["storage_fs_name"],
+        filesystems="\n".join(
+            "        - { scale_remotemount_client_filesystem_name: %s, scale_remotemount_client_remotemount_path: %s, scale_remotemount_storage_filesystem_name: %s }"
+            % (each_fs["compute_fs_name"], each_fs["compute_fs_mnt"], each_fs["storage_fs_name"])
+            for each_fs in mount_details["filesystems"]
+        ),
     )
+
+
+def prepare_remote_mount_playbook(hosts_config, mount_details):
+    """Write to playbook"""
+    if ARGUMENTS.using_rest_initialization == "true":
+        no_gui = False
+    else:
+        no_gui = True
+    return "---\n" + get_remote_mount_play(hosts_config, mount_details, no_gui)
+
+
+def prepare_multi_remote_mount_playbook(waves, pairing_details):
+    """Write to playbook, one play per pairing in wave order.
+    remotemount_configure runs its tasks once per play (run_once), hence
+    every pairing gets its own play targeting its own inventory host. Run
+    serially the plays keep wave order, remote_mount_waves.sh runs the
+    pairings of a wave concurrently.
+    :args: waves (list of list of pairing host names),
+           pairing_details (dict of pairing host name to mount details)
+    """
+    if ARGUMENTS.using_rest_initialization == "true":
+        no_gui = False
+    else:
+        no_gui = True
+    content = "---\n"
+    for wave_idx, wave in enumerate(waves, start=1):
+        for each_pairing in wave:
+            content = content + "# Wave %s, pairing %s\n" % (wave_idx, each_pairing) + \
+                get_remote_mount_play(each_pairing, pairing_details[each_pairing], no_gui)
+    return content
+
+
+def prepare_mount_wave_coordinator(waves):
+    """Write to coordinator script, runs the pairings of a wave as parallel
+    ansible-playbook processes limited to their own play, waves one after
+    the other. Arguments are passed to every ansible-playbook run.
+    :args: waves (list of list of pairing host names)
+    """
+    content = """#!/bin/bash
+# Remote mount pairings wave by wave, pairings of a wave share no cluster
+# and run in parallel
+cd "$(dirname "$0")" || exit 1
+run_wave() {
+    local pids=() pairing rc=0 idx=0
+    for pairing in "$@"; do
+        ansible-playbook -i remote_mount_inventory.ini remote_mount_cloud_playbook.yaml \\
+            --limit "${pairing}" "${ARGS[@]}" > "${pairing}.log" 2>&1 &
+        pids+=($!)
+    done
+    for pairing in "$@"; do
+        if ! wait "${pids[${idx}]}"; then
+            echo "Pairing ${pairing} failed, see ${pairing}.log"
+            rc=1
+        fi
+        idx=$((idx + 1))
+    done
+    return $rc
+}
+ARGS=("$@")
+"""
+    for each_wave in waves:
+        content = content + "run_wave %s || exit 1\n" % " ".join(each_wave)
     return content
 
 
+def get_mount_filesystems(comp_tf, strg_tf, filesystems=None):
+    """Return filesystems to remote mount.
+    Without a filesystem map the storage cluster filesystem is mounted at
+    the compute cluster mount point.
+    :args: comp_tf (dict), strg_tf (dict), filesystems (list of dict with
+           storage_fs_name, optional compute_fs_name and compute_fs_mnt)
+    """
+    if not filesystems:
+        return [
+            {
+                "compute_fs_mnt": comp_tf["compute_cluster_filesystem_mountpoint"],
+                "compute_fs_name": str(
+                    pathlib.PurePath(comp_tf["compute_cluster_filesystem_mountpoint"]).stem
+                ),
+                "storage_fs_name": str(
+                    pathlib.PurePath(strg_tf["storage_cluster_filesystem_mountpoint"]).stem
+                ),
+            }
+        ]
+    mount_parent = str(
+        pathlib.PurePath(comp_tf["compute_cluster_filesystem_mountpoint"]).parent
+    )
+    mount_filesystems = []
+    for each_fs in filesystems:
+        if not each_fs.get("storage_fs_name"):
+            LOGGER.error("Filesystem map entry (%s) has no storage_fs_name.", each_fs)
+            sys.exit(1)
+        compute_fs_name = each_fs.get("compute_fs_name", each_fs["storage_fs_name"])
+        mount_filesystems.append(
+            {
+                "compute_fs_mnt": each_fs.get(
+                    "compute_fs_mnt", "%s/%s" % (mount_parent, compute_fs_name)
+                ),
+                "compute_fs_name": compute_fs_name,
+                "storage_fs_name": each_fs["storage_fs_name"],
+            }
+        )
+    return mount_filesystems
+
+
+def get_mount_waves(pairing_details):
+    """Group pairings into waves, pairings of a wave share no cluster.
+    A pairing runs in the wave after the last earlier pairing it shares the
+    compute or storage cluster with, hence mounts of the same cluster keep
+    their order and never run concurrently.
+    :args: pairing_details (dict of pairing host name to mount details, ordered)
+    :return: list of list of pairing host names
+    """
+    waves, pairing_wave = [], {}
+    for each_pairing, mount_details in pairing_details.items():
+        wave_idx = 0
+        for earlier_pairing, earlier_wave in pairing_wave.items():
+            earlier_details = pairing_details[earlier_pairing]
+            if {mount_details["compute_gui_ip"], mount_details["storage_gui_ip"]} & \
+                    {earlier_details["compute_gui_ip"], earlier_details["storage_gui_ip"]}:
+                wave_idx = max(wave_idx, earlier_wave + 1)
+        pairing_wave[each_pairing] = wave_idx
+        if wave_idx == len(waves):
+            waves.append([])
+        waves[wave_idx].append(each_pairing)
+    return waves
+
+
 def get_host_format(node):
     """Return host entries"""
-    host_format = f"{node['ip_addr']} scale_cluster_quorum={node['is_quorum']} scale_cluster_manager={node['is_manager']} scale_cluster_gui={node['is_gui']} scale_zimon_collector={node['is_collector']} is_nsd_server={node['is_nsd']} is_admin_node={node['is_admin']} ansible_user={node['user']} ansible_ssh_private_key_file={node['key_file']} ansible_python_interpreter=/usr/bin/python3 scale_nodeclass={node['class']} scale_daemon_nodename={node['daemon_nodename']}"
+    host_format = f"{node.get('host_name', node['ip_addr'])} scale_cluster_quorum={node['is_quorum']} scale_cluster_manager={node['is_manager']} scale_cluster_gui={node['is_gui']} scale_zimon_collector={node['is_collector']} is_nsd_server={node['is_nsd']} is_admin_node={node['is_admin']} ansible_user={node['user']} ansible_ssh_private_key_file={node['key_file']} ansible_python_interpreter=/usr/bin/python3 scale_nodeclass={node['class']} scale_daemon_nodename={node['daemon_nodename']}"
+    if "host_name" in node:
+        host_format = host_format + f" ansible_host={node['ip_addr']}"
     return host_format
 
 
-def initialize_node_details(storage_gui_ip, user, key_file):
+def initialize_node_details(storage_gui_ip, user, key_file, host_name=None):
     """Initialize node details for cluster definition.
-    :args: storage_gui_ip (str), user (string), key_file (string)
+    :args: storage_gui_ip (str), user (string), key_file (string),
+           host_name (inventory host name, defaults to storage_gui_ip)
     """
     node_details, node = [], {}
     node = {
@@ -120,6 +248,8 @@ def initialize_node_details(storage_gui_ip, user, key_file):
         "class": "storagenodegrp",
         "daemon_nodename": storage_gui_ip.split('.')[0]
     }
+    if host_name:
+        node["host_name"] = host_name
     node_details.append(get_host_format(node))
     return node_details
 
@@ -131,22 +261,18 @@ if __name__ == "__main__":
     )
     PARSER.add_argument(
         "--compute_tf_inv_path",
-        required=True,
         help="Compute cluster terraform inventory file path",
     )
     PARSER.add_argument(
         "--compute_gui_inv_path",
-        required=True,
         help="Compute cluster gui inventory file path",
     )
     PARSER.add_argument(
         "--storage_tf_inv_path",
-        required=True,
         help="Storage cluster terraform inventory file path",
     )
     PARSER.add_argument(
         "--storage_gui_inv_path",
-        required=True,
         help="Storage cluster gui inventory file path",
     )
     PARSER.add_argument(
@@ -186,80 +312,141 @@ if __name__ == "__main__":
         required=True,
         help="Spectrum Scale storage cluster GUI password",
     )
+    PARSER.add_argument(
+        "--mount_pairings",
+        help="Compute/storage cluster pairings json file path, list of "
+        "inventory paths with optional GUI credentials and filesystem map",
+    )
     PARSER.add_argument("--verbose", action="store_true",
                         help="print log messages")
+    PARSER.add_argument("--log_format", choices=LOG_FORMATS, default="text",
+                        help="log as text or json lines")
     ARGUMENTS = PARSER.parse_args()
+    setup_logging(ARGUMENTS.verbose, ARGUMENTS.log_format)
 
-    # Step-1: Read the inventory file
-    COMP_TF = read_json_file(ARGUMENTS.compute_tf_inv_path)
-    if ARGUMENTS.verbose:
-        print("Parsed compute terraform output: %s" %
-              json.dumps(COMP_TF, indent=4))
-    STRG_TF = read_json_file(ARGUMENTS.storage_tf_inv_path)
-    if ARGUMENTS.verbose:
-        print("Parsed storage terraform output: %s" %
-              json.dumps(STRG_TF, indent=4))
-
-    # Step-2: Read the GUI inventory file
-    COMP_GUI = read_json_file(ARGUMENTS.compute_gui_inv_path)
-    if ARGUMENTS.verbose:
-        print("Parsed compute terraform output: %s" %
-              json.dumps(COMP_GUI, indent=4))
-    STRG_GUI = read_json_file(ARGUMENTS.storage_gui_inv_path)
-    if ARGUMENTS.verbose:
-        print("Parsed storage terraform output: %s" %
-              json.dumps(STRG_GUI, indent=4))
-
-    # Step-3: Create playbook
-    remote_mount = {}
-    remote_mount["compute_gui_ip"] = COMP_GUI["compute_cluster_gui_ip_address"]
-    remote_mount["compute_gui_username"] = ARGUMENTS.compute_cluster_gui_username
-    remote_mount["compute_gui_password"] = ARGUMENTS.compute_cluster_gui_password
-    remote_mount["compute_fs_mnt"] = COMP_TF["compute_cluster_filesystem_mountpoint"]
-    remote_mount["compute_fs_name"] = str(
-        pathlib.PurePath(COMP_TF["compute_cluster_filesystem_mountpoint"]).stem
-    )
-    remote_mount["storage_gui_ip"] = STRG_GUI["storage_cluster_gui_ip_address"]
-    remote_mount["storage_gui_username"] = ARGUMENTS.storage_cluster_gui_username
-    remote_mount["storage_gui_password"] = ARGUMENTS.storage_cluster_gui_password
-    remote_mount["storage_fs_name"] = str(
-        pathlib.PurePath(STRG_TF["storage_cluster_filesystem_mountpoint"]).stem
-    )
+    if ARGUMENTS.mount_pairings:
+        # Step-1: Read the pairings and their inventory files
+        PAIRINGS = read_json_file(ARGUMENTS.mount_pairings)
+        if not isinstance(PAIRINGS, list) or not PAIRINGS:
+            LOGGER.error("Provided pairings file (%s) is not a list of pairings.",
+                         ARGUMENTS.mount_pairings)
+            sys.exit(1)
+        pairing_details = {}
+        for pairing_idx, each_pairing in enumerate(PAIRINGS, start=1):
+            comp_tf = read_json_file(each_pairing["compute_tf_inv_path"])
+            comp_gui = read_json_file(each_pairing["compute_gui_inv_path"])
+            strg_tf = read_json_file(each_pairing["storage_tf_inv_path"])
+            strg_gui = read_json_file(each_pairing["storage_gui_inv_path"])
+            pairing_details["remote_mount_%s" % pairing_idx] = {
+                "compute_gui_ip": comp_gui["compute_cluster_gui_ip_address"],
+                "compute_gui_username": each_pairing.get(
+                    "compute_cluster_gui_username", ARGUMENTS.compute_cluster_gui_username),
+                "compute_gui_password": each_pairing.get(
+                    "compute_cluster_gui_password", ARGUMENTS.compute_cluster_gui_password),
+                "storage_gui_ip": strg_gui["storage_cluster_gui_ip_address"],
+                "storage_gui_username": each_pairing.get(
+                    "storage_cluster_gui_username", ARGUMENTS.storage_cluster_gui_username),
+                "storage_gui_password": each_pairing.get(
+                    "storage_cluster_gui_password", ARGUMENTS.storage_cluster_gui_password),
+                "filesystems": get_mount_filesystems(
+                    comp_tf, strg_tf, each_pairing.get("filesystems")),
+            }
+
+        # Step-2: Group independent pairings into concurrent waves
+        WAVES = get_mount_waves(pairing_details)
+        for wave_idx, wave in enumerate(WAVES, start=1):
+            LOGGER.debug("Remote mount wave %s: %s", wave_idx, ", ".join(wave))
+
+        # Step-3: Create playbook
+        playbook_content = prepare_multi_remote_mount_playbook(
+            WAVES, pairing_details)
+        MOUNT_GROUPS = {
+            "remote_mount_pairings": [
+                initialize_node_details(
+                    pairing_details[each_pairing]["compute_gui_ip"],
+                    "root",
+                    ARGUMENTS.instance_private_key,
+                    each_pairing,
+                )[0]
+                for wave in WAVES for each_pairing in wave
+            ]
+        }
+    else:
+        if not all([ARGUMENTS.compute_tf_inv_path, ARGUMENTS.compute_gui_inv_path,
+                    ARGUMENTS.storage_tf_inv_path, ARGUMENTS.storage_gui_inv_path]):
+            PARSER.error("inventory paths are required without --mount_pairings")
+
+        # Step-1: Read the inventory file
+        COMP_TF = read_json_file(ARGUMENTS.compute_tf_inv_path)
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            LOGGER.debug("Parsed compute terraform output: %s", json.dumps(COMP_TF, indent=4))
+        STRG_TF = read_json_file(ARGUMENTS.storage_tf_inv_path)
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            LOGGER.debug("Parsed storage terraform output: %s", json.dumps(STRG_TF, indent=4))
+
+        # Step-2: Read the GUI inventory file
+        COMP_GUI = read_json_file(ARGUMENTS.compute_gui_inv_path)
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            LOGGER.debug("Parsed compute terraform output: %s", json.dumps(COMP_GUI, indent=4))
+        STRG_GUI = read_json_file(ARGUMENTS.storage_gui_inv_path)
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            LOGGER.debug("Parsed storage terraform output: %s", json.dumps(STRG_GUI, indent=4))
+
+        # Step-3: Create playbook
+        remote_mount = {}
+        remote_mount["compute_gui_ip"] = COMP_GUI["compute_cluster_gui_ip_address"]
+        remote_mount["compute_gui_username"] = ARGUMENTS.compute_cluster_gui_username
+        remote_mount["compute_gui_password"] = ARGUMENTS.compute_cluster_gui_password
+        remote_mount["storage_gui_ip"] = STRG_GUI["storage_cluster_gui_ip_address"]
+        remote_mount["storage_gui_username"] = ARGUMENTS.storage_cluster_gui_username
+        remote_mount["storage_gui_password"] = ARGUMENTS.storage_cluster_gui_password
+        remote_mount["filesystems"] = get_mount_filesystems(COMP_TF, STRG_TF)
+
+        playbook_content = prepare_remote_mount_playbook(
+            "scale_nodes", remote_mount)
+        MOUNT_GROUPS = {
+            "scale_nodes": initialize_node_details(
+                COMP_GUI["compute_cluster_gui_ip_address"],
+                "root",
+                ARGUMENTS.instance_private_key,
+            )
+        }
 
-    playbook_content = prepare_remote_mount_playbook(
-        "scale_nodes", remote_mount)
     write_to_file(
         "%s/%s/remote_mount_cloud_playbook.yaml"
         % (ARGUMENTS.install_infra_path, "ibm-spectrum-scale-install-infra"),
         playbook_content,
     )
+    if ARGUMENTS.mount_pairings:
+        write_to_file(
+            "%s/%s/remote_mount_waves.sh"
+            % (ARGUMENTS.install_infra_path, "ibm-spectrum-scale-install-infra"),
+            prepare_mount_wave_coordinator(WAVES),
+            0o755,
+        )
 
     # Step-4: Create hosts
     config = configparser.ConfigParser(allow_no_value=True)
-    node_details = initialize_node_details(
-        COMP_GUI["compute_cluster_gui_ip_address"],
-        "root",
-        ARGUMENTS.instance_private_key,
-    )
     node_template = ""
-    for each_entry in node_details:
-        if ARGUMENTS.bastion_ssh_private_key is None:
-            node_template = node_template + each_entry + "\n"
-        else:
-            proxy_command = f"ssh -p 22 -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null -W %h:%p {ARGUMENTS.bastion_user}@{ARGUMENTS.bastion_ip} -i {ARGUMENTS.bastion_ssh_private_key}"
-            each_entry = (
-                each_entry
-                + " "
-                + "ansible_ssh_common_args='-o ControlMaster=auto -o ControlPersist=30m -o UserKnownHostsFile=/dev/null -o StrictHostKeyChecking=no -o ProxyCommand=\""
-                + proxy_command
-                + "\"'"
-            )
-            node_template = node_template + each_entry + "\n"
+    for group_name, node_details in MOUNT_GROUPS.items():
+        node_template = node_template + "[%s]" % group_name + "\n"
+        for each_entry in node_details:
+            if ARGUMENTS.bastion_ssh_private_key is None:
+                node_template = node_template + each_entry + "\n"
+            else:
+                proxy_command = f"ssh -p 22 -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null -W %h:%p {ARGUMENTS.bastion_user}@{ARGUMENTS.bastion_ip} -i {ARGUMENTS.bastion_ssh_private_key}"
+                each_entry = (
+                    each_entry
+                    + " "
+                    + "ansible_ssh_common_args='-o ControlMaster=auto -o ControlPersist=30m -o UserKnownHostsFile=/dev/null -o StrictHostKeyChecking=no -o ProxyCommand=\""
+                    + proxy_command
+                    + "\"'"
+                )
+                node_template = node_template + each_entry + "\n"
 
     with open(
         "%s/%s/remote_mount_inventory.ini"
         % (ARGUMENTS.install_infra_path, "ibm-spectrum-scale-install-infra"),
         "w",
     ) as configfile:
-        configfile.write("[scale_nodes]" + "\n")
         configfile.write(node_template)
@@ -17,19 +17,42 @@ limitations under the License.
 """
 
 import argparse
-import configparser
 import json
+import logging
 import pathlib
 import os
 import re
 import sys
+import time
 import yaml
+from scale_benchmark import BENCHMARK_EXPECTED, get_benchmark_clients, get_expected_performance, \
+    prepare_benchmark_playbook
+from scale_cluster_model import INVENTORY_FORMATS, INVENTORY_RENDERERS, NODE_ROLE_KEYS, ClusterModel, \
+    get_cluster_nodes, get_gui_nodes, get_protocol_config, get_protocol_nodes, get_ssh_proxy_args
+from scale_disk_layout import MAX_LOCAL_FAILURE_GROUPS, get_local_failure_groups, \
+    get_nsd_name, get_replica_settings, select_tiebreaker_disks
+from scale_facts import FACT_CACHE_DIR, MINIMAL_GATHER_SUBSET, get_host_image, get_image_group_summary, \
+    get_image_groups, get_instance_facts, is_scale_baked, write_fact_cache
+from scale_fs_config import read_filesystem_config
+from scale_fs_sizing import get_fs_advice, get_workload_hints
+from scale_log import CONTENT_LOGGER, LOG_FORMATS, log_stage, setup_logging
+from scale_output import ARTIFACT_MANIFEST, add_artifact, commit_artifacts, get_pending_artifact, get_yaml_content, \
+    mark_stale
+from scale_placement import get_collector_count, get_install_shards, \
+    get_manager_count, get_perfmon_federation_details, get_quorum_count, get_subnet_zone, \
+    get_tiebreaker_quorum_count, get_zone_config_details, get_zone_labels, get_zone_nodeclass, \
+    get_latency_candidates, get_worst_latency, order_instances_by_zone, promote_managers, relocate_gui_roles
+from scale_preflight import get_latency_nodes, get_preflight_nodes, prepare_latency_playbook, \
+    prepare_preflight_playbook, read_latency_matrix, read_preflight_report
+from scale_tf_reader import STREAM_THRESHOLD, load_json_stream
+from validate_scale_inventory import get_ini_topology, get_topology_summary, validate_topology
+
+LOGGER = logging.getLogger("prepare_scale_inv_ini")
 
 
 def cleanup(target_file):
-    """ Cleanup host inventory, group_vars """
-    if os.path.exists(target_file):
-        os.remove(target_file)
+    """ Cleanup host inventory, group_vars (unless rendered again) """
+    mark_stale(target_file)
 
 
 def calculate_pagepool(memory_size, max_pagepool_gb):
@@ -51,19 +74,20 @@ def create_directory(target_directory):
     pathlib.Path(target_directory).mkdir(parents=True, exist_ok=True)
 
 
-def read_json_file(json_path):
-    """ Read inventory as json file """
+def read_json_file(json_path, stream_threshold=STREAM_THRESHOLD):
+    """ Read inventory as json file, incrementally (bounded memory) from
+    stream_threshold bytes on
+    """
     tf_inv = {}
     try:
         with open(json_path) as json_handler:
             try:
-                tf_inv = json.load(json_handler)
+                tf_inv = load_json_stream(json_handler, stream_threshold=stream_threshold)
             except json.decoder.JSONDecodeError:
-                print("Provided terraform inventory file (%s) is not a valid "
-                      "json." % json_path)
+                LOGGER.error("Provided terraform inventory file (%s) is not a valid json.", json_path)
                 sys.exit(1)
     except OSError:
-        print("Provided terraform inventory file (%s) does not exist." % json_path)
+        LOGGER.error("Provided terraform inventory file (%s) does not exist.", json_path)
         sys.exit(1)
 
     return tf_inv
@@ -71,18 +95,41 @@ def read_json_file(json_path):
 
 def write_json_file(json_data, json_path):
     """ Write inventory to json file """
-    with open(json_path, 'w') as json_handler:
-        json.dump(json_data, json_handler, indent=4)
+    add_artifact(json_path, json.dumps(json_data, indent=4))
 
 
-def write_to_file(filepath, filecontent):
+def write_to_file(filepath, filecontent, mode=None):
     """ Write to specified file """
-    with open(filepath, "w") as file_handler:
-        file_handler.write(filecontent)
+    add_artifact(filepath, filecontent, mode=mode)
 
 
-def prepare_ansible_playbook(hosts_config, cluster_config, cluster_key_file):
-    """ Write to playbook """
+def get_install_pre_tasks(cluster_config, fact_cache=False):
+    """ Return pre_tasks of the install play, fact_cache gathers a minimal
+    subset and fills facts it did not gather from the pre-seeded cache
+    """
+    if not fact_cache:
+        return """  pre_tasks:
+     - include_vars: group_vars/{cluster_config}
+""".format(cluster_config=cluster_config)
+    return """  gather_facts: false
+  pre_tasks:
+     - include_vars: group_vars/{cluster_config}
+     - setup:
+         gather_subset: {gather_subset}
+     - set_fact:
+         "{{{{ item.key }}}}": "{{{{ item.value }}}}"
+       loop: "{{{{ lookup('file', '{fact_cache_dir}/' ~ inventory_hostname) | from_json | dict2items }}}}"
+       when: item.key not in hostvars[inventory_hostname]
+""".format(cluster_config=cluster_config, fact_cache_dir=FACT_CACHE_DIR, gather_subset=MINIMAL_GATHER_SUBSET)
+
+
+def prepare_ansible_playbook(hosts_config, cluster_config, cluster_key_file, skip_baked=False, fact_cache=False):
+    """ Write to playbook, skip_baked skips install roles on hosts with
+    scale_packages_baked (ex: client nodes installed by a shard)
+    """
+    install_when = "scale_packages_installed is false"
+    if skip_baked:
+        install_when = install_when + " and not scale_packages_baked | default(false) | bool"
     content = """---
 # Ensure provisioned VMs are up and Passwordless SSH setup
 # has been compleated and operational
@@ -134,27 +181,26 @@ def prepare_ansible_playbook(hosts_config, cluster_config, cluster_key_file):
   collections:
      - ibm.spectrum_scale
   any_errors_fatal: true
-  pre_tasks:
-     - include_vars: group_vars/{cluster_config}
-  roles:
+{pre_tasks}  roles:
      - core_prepare
-     - {{ role: core_install, when: "scale_packages_installed is false" }}
+     - {{ role: core_install, when: "{install_when}" }}
      - core_configure
 #    - gui_prepare
-     - {{ role: gui_install, when: "scale_packages_installed is false" }}
+     - {{ role: gui_install, when: "{install_when}" }}
      - gui_configure
      - gui_verify
      - perfmon_prepare
-     - {{ role: perfmon_install, when: "scale_packages_installed is false" }}
+     - {{ role: perfmon_install, when: "{install_when}" }}
      - perfmon_configure
      - perfmon_verify
      - {{ role: mrot_config, when: enable_mrot }}
 """.format(hosts_config=hosts_config, cluster_config=cluster_config,
-           cluster_key_file=cluster_key_file)
+           pre_tasks=get_install_pre_tasks(cluster_config, fact_cache),
+           cluster_key_file=cluster_key_file, install_when=install_when)
     return content
 
 
-def prepare_packer_ansible_playbook(hosts_config, cluster_config):
+def prepare_packer_ansible_playbook(hosts_config, cluster_config, fact_cache=False):
     """ Write to playbook """
     content = """---
 # Install and config Spectrum Scale on nodes
@@ -162,37 +208,37 @@ def prepare_packer_ansible_playbook(hosts_config, cluster_config):
   collections:
      - ibm.spectrum_scale
   any_errors_fatal: true
-  pre_tasks:
-     - include_vars: group_vars/{cluster_config}
-  roles:
+{pre_tasks}  roles:
      - core_configure
      - gui_configure
      - gui_verify
      - perfmon_configure
      - perfmon_verify
-""".format(hosts_config=hosts_config, cluster_config=cluster_config)
+""".format(hosts_config=hosts_config, cluster_config=cluster_config,
+           pre_tasks=get_install_pre_tasks(cluster_config, fact_cache))
     return content
 
 
-def prepare_nogui_ansible_playbook(hosts_config, cluster_config):
-    """ Write to playbook """
+def prepare_nogui_ansible_playbook(hosts_config, cluster_config, skip_baked=False, fact_cache=False):
+    """ Write to playbook, skip_baked skips install role on hosts with scale_packages_baked """
+    core_install = '{ role: core_install, when: "not scale_packages_baked | default(false) | bool" }' \
+        if skip_baked else "core_install"
     content = """---
 # Install and config Spectrum Scale on nodes
 - hosts: {hosts_config}
   collections:
      - ibm.spectrum_scale
   any_errors_fatal: true
-  pre_tasks:
-     - include_vars: group_vars/{cluster_config}
-  roles:
+{pre_tasks}  roles:
      - core_prepare
-     - core_install
+     - {core_install}
      - core_configure
-""".format(hosts_config=hosts_config, cluster_config=cluster_config)
+""".format(hosts_config=hosts_config, cluster_config=cluster_config,
+           pre_tasks=get_install_pre_tasks(cluster_config, fact_cache), core_install=core_install)
     return content
 
 
-def prepare_nogui_packer_ansible_playbook(hosts_config, cluster_config):
+def prepare_nogui_packer_ansible_playbook(hosts_config, cluster_config, fact_cache=False):
     """ Write to playbook """
     content = """---
 # Install and config Spectrum Scale on nodes
@@ -200,10 +246,253 @@ def prepare_nogui_packer_ansible_playbook(hosts_config, cluster_config):
   collections:
      - ibm.spectrum_scale
   any_errors_fatal: true
+{pre_tasks}  roles:
+     - core_configure
+""".format(hosts_config=hosts_config, cluster_config=cluster_config,
+           pre_tasks=get_install_pre_tasks(cluster_config, fact_cache))
+    return content
+
+
+def prepare_mixed_image_ansible_playbook(hosts_config, cluster_config, cluster_key_file, fact_cache=False):
+    """ Write to playbook, install roles run only on hosts without baked packages """
+    content = """---
+# Ensure provisioned VMs are up and Passwordless SSH setup
+# has been compleated and operational
+- name: Check passwordless SSH connection is setup
+  hosts: {hosts_config}
+  any_errors_fatal: true
+  gather_facts: false
+  connection: local
+  tasks:
+  - name: Check passwordless SSH on all scale inventory hosts
+    shell: ssh {{{{ ansible_ssh_common_args }}}} -i {cluster_key_file} root@{{{{ inventory_hostname }}}} "echo PASSWDLESS_SSH_ENABLED"
+    register: result
+    until: result.stdout.find("PASSWDLESS_SSH_ENABLED") != -1
+    retries: 60
+    delay: 10
+
+# Install and config Spectrum Scale on nodes, hosts from images with
+# baked Scale packages (scale_packages_baked) skip prepare/install roles
+- hosts: {hosts_config}
+  collections:
+     - ibm.spectrum_scale
+  any_errors_fatal: true
+{pre_tasks}  roles:
+     - {{ role: core_prepare, when: "not scale_packages_baked | bool" }}
+     - {{ role: core_install, when: "not scale_packages_baked | bool" }}
+     - core_configure
+     - {{ role: gui_install, when: "not scale_packages_baked | bool" }}
+     - gui_configure
+     - gui_verify
+     - {{ role: perfmon_prepare, when: "not scale_packages_baked | bool" }}
+     - {{ role: perfmon_install, when: "not scale_packages_baked | bool" }}
+     - perfmon_configure
+     - perfmon_verify
+     - {{ role: mrot_config, when: enable_mrot }}
+""".format(hosts_config=hosts_config, cluster_config=cluster_config,
+           pre_tasks=get_install_pre_tasks(cluster_config, fact_cache),
+           cluster_key_file=cluster_key_file)
+    return content
+
+
+def prepare_nogui_mixed_image_ansible_playbook(hosts_config, cluster_config, cluster_key_file, fact_cache=False):
+    """ Write to playbook, install roles run only on hosts without baked packages """
+    content = """---
+# Ensure provisioned VMs are up and Passwordless SSH setup
+# has been compleated and operational
+- name: Check passwordless SSH connection is setup
+  hosts: {hosts_config}
+  any_errors_fatal: true
+  gather_facts: false
+  connection: local
+  tasks:
+  - name: Check passwordless SSH on all scale inventory hosts
+    shell: ssh {{{{ ansible_ssh_common_args }}}} -i {cluster_key_file} root@{{{{ inventory_hostname }}}} "echo PASSWDLESS_SSH_ENABLED"
+    register: result
+    until: result.stdout.find("PASSWDLESS_SSH_ENABLED") != -1
+    retries: 60
+    delay: 10
+
+# Install and config Spectrum Scale on nodes, hosts from images with
+# baked Scale packages (scale_packages_baked) skip prepare/install roles
+- hosts: {hosts_config}
+  collections:
+     - ibm.spectrum_scale
+  any_errors_fatal: true
+{pre_tasks}  roles:
+     - {{ role: core_prepare, when: "not scale_packages_baked | bool" }}
+     - {{ role: core_install, when: "not scale_packages_baked | bool" }}
+     - core_configure
+""".format(hosts_config=hosts_config, cluster_config=cluster_config,
+           pre_tasks=get_install_pre_tasks(cluster_config, fact_cache),
+           cluster_key_file=cluster_key_file)
+    return content
+
+
+def prepare_shard_ansible_playbook(hosts_config, cluster_config, using_rest_initialization, fact_cache=False):
+    """ Write to playbook, installs client packages on one shard """
+    content = """---
+# Install Spectrum Scale packages on a shard of client nodes, cluster wide
+# configuration (cluster creation, quorum, filesystems) runs afterwards
+# from a single controller
+- hosts: {hosts_config}
+  collections:
+     - ibm.spectrum_scale
+  any_errors_fatal: true
+{pre_tasks}  roles:
+     - core_prepare
+     - core_install
+""".format(hosts_config=hosts_config, cluster_config=cluster_config,
+           pre_tasks=get_install_pre_tasks(cluster_config, fact_cache))
+    if using_rest_initialization == "true":
+        content = content + """     - perfmon_prepare
+     - perfmon_install
+"""
+    return content
+
+
+def prepare_shard_coordinator(cluster_type, shard_count):
+    """ Write to coordinator script, runs shard playbooks in parallel and
+    the cluster playbook afterwards. Arguments are passed to every
+    ansible-playbook run (ex: --extra-vars).
+    """
+    content = """#!/bin/bash
+# Install client shards in parallel, then configure the cluster from a
+# single controller
+cd "$(dirname "$0")" || exit 1
+pids=()
+for shard in $(seq 1 {shard_count}); do
+    ansible-playbook -f 32 -i {cluster_type}_inventory_shard${{shard}}.ini {cluster_type}_shard_playbook.yaml "$@" \\
+        > {cluster_type}_shard${{shard}}.log 2>&1 &
+    pids+=($!)
+done
+rc=0
+for shard in $(seq 1 {shard_count}); do
+    if ! wait "${{pids[$((shard - 1))]}}"; then
+        echo "Shard ${{shard}} failed, see {cluster_type}_shard${{shard}}.log"
+        rc=1
+    fi
+done
+[ $rc -eq 0 ] || exit $rc
+ansible-playbook -f 32 -i {cluster_type}_inventory.ini {cluster_type}_cloud_playbook.yaml "$@"
+""".format(cluster_type=cluster_type, shard_count=shard_count)
+    return content
+
+
+def prepare_tiebreaker_playbook(hosts_config, cluster_config):
+    """ Write to playbook """
+    content = """# Configure tiebreaker disks once the filesystem NSDs exist
+- name: Configure tiebreaker disks
+  hosts: {hosts_config}
+  any_errors_fatal: true
+  gather_facts: false
+  pre_tasks:
+     - include_vars: group_vars/{cluster_config}
+  tasks:
+  - name: Set tiebreakerDisks cluster configuration
+    shell: /usr/lpp/mmfs/bin/mmchconfig tiebreakerDisks="{{{{ scale_cluster_config.tiebreaker_disks }}}}"
+    run_once: true
+    when: scale_cluster_config.tiebreaker_disks is defined
+""".format(hosts_config=hosts_config, cluster_config=cluster_config)
+    return content
+
+
+def prepare_perfmon_federation_playbook(hosts_config):
+    """ Write to playbook """
+    content = """# Federate perfmon collectors once perfmon is configured
+- name: Configure perfmon collector federation
+  hosts: {hosts_config}
+  any_errors_fatal: true
+  gather_facts: false
+  tasks:
+  - name: Set perfmon collector candidates and redundancy
+    shell: /usr/lpp/mmfs/bin/mmperfmon config update colCandidates={{{{ scale_zimon_collectors }}}} colRedundancy={{{{ scale_zimon_col_redundancy }}}}
+    run_once: true
+    when: scale_zimon_collectors | default('') | length > 0
+""".format(hosts_config=hosts_config)
+    return content
+
+
+def prepare_protocol_playbook(hosts_config, cluster_config, protocols):
+    """ Write to playbook """
+    prepare_roles = "".join("     - %s_prepare\n" % each_protocol for each_protocol in protocols)
+    install_roles = "".join("     - %s_install\n" % each_protocol for each_protocol in protocols)
+    configure_roles = "".join("     - %s_configure\n" % each_protocol for each_protocol in protocols)
+    verify_roles = "".join("     - %s_verify\n" % each_protocol for each_protocol in protocols)
+    content = """# Deploy CES protocols on protocol nodes
+- name: Deploy CES protocols
+  hosts: {hosts_config}
+  collections:
+     - ibm.spectrum_scale
+  any_errors_fatal: true
   pre_tasks:
      - include_vars: group_vars/{cluster_config}
   roles:
-     - core_configure
+{prepare_roles}{install_roles}     - ces_common
+{configure_roles}{verify_roles}""".format(hosts_config=hosts_config, cluster_config=cluster_config,
+                                          prepare_roles=prepare_roles, install_roles=install_roles,
+                                          configure_roles=configure_roles, verify_roles=verify_roles)
+    return content
+
+
+def prepare_concurrent_fs_playbook(hosts_config, cluster_config):
+    """ Write to playbook """
+    content = """# Create independent filesystems concurrently
+- name: Create filesystems concurrently
+  hosts: {hosts_config}
+  any_errors_fatal: true
+  gather_facts: false
+  pre_tasks:
+     - include_vars: group_vars/{cluster_config}
+  tasks:
+  - name: Copy NSD stanza files
+    copy:
+      src: "{{{{ item.stanza }}}}"
+      dest: "/var/mmfs/tmp/{{{{ item.filesystem }}}}_nsd.stanza"
+    loop: "{{{{ scale_storage_concurrent }}}}"
+    run_once: true
+
+  - name: Copy per NSD stanza files
+    copy:
+      src: "{{{{ item.nsd_stanza_dir }}}}/"
+      dest: "/var/mmfs/tmp/{{{{ item.filesystem }}}}_nsd/"
+    loop: "{{{{ scale_storage_concurrent }}}}"
+    run_once: true
+
+  # One stanza file per NSD name, only NSDs not defined yet are created
+  - name: Create missing NSDs
+    shell: |
+      stanza_dir=/var/mmfs/tmp/{{{{ item.filesystem }}}}_nsd
+      /usr/lpp/mmfs/bin/mmlsfs {{{{ item.filesystem }}}} > /dev/null 2>&1 && exit 0
+      : > $stanza_dir.missing
+      for nsd in {{{{ item.nsds | join(' ') }}}}; do
+        /usr/lpp/mmfs/bin/mmlsnsd -d $nsd > /dev/null 2>&1 || cat $stanza_dir/$nsd.stanza >> $stanza_dir.missing
+      done
+      [ ! -s $stanza_dir.missing ] || /usr/lpp/mmfs/bin/mmcrnsd -F $stanza_dir.missing
+    loop: "{{{{ scale_storage_concurrent }}}}"
+    run_once: true
+
+  - name: Create filesystems
+    shell: /usr/lpp/mmfs/bin/mmlsfs {{{{ item.filesystem }}}} || /usr/lpp/mmfs/bin/mmcrfs {{{{ item.filesystem }}}} -F /var/mmfs/tmp/{{{{ item.filesystem }}}}_nsd.stanza -B {{{{ item.blockSize }}}} -m {{{{ item.defaultMetadataReplicas }}}} -M {{{{ item.maxMetadataReplicas }}}} -r {{{{ item.defaultDataReplicas }}}} -R {{{{ item.maxDataReplicas }}}} -T {{{{ item.defaultMountPoint }}}} -A yes {{{{ ('-i ' ~ item.inodeSize) if item.inodeSize is defined else '' }}}} {{{{ ('-n ' ~ item.numNodes) if item.numNodes is defined else '' }}}} {{{{ ('--metadata-block-size ' ~ item.metadataBlockSize) if item.metadataBlockSize is defined else '' }}}}
+    loop: "{{{{ scale_storage_concurrent }}}}"
+    async: 7200
+    poll: 0
+    register: scale_fs_create
+    run_once: true
+
+  - name: Wait for filesystem creation
+    async_status:
+      jid: "{{{{ item.ansible_job_id }}}}"
+    loop: "{{{{ scale_fs_create.results }}}}"
+    register: scale_fs_create_status
+    until: scale_fs_create_status.finished
+    retries: 720
+    delay: 10
+    run_once: true
+
+  - name: Mount filesystems
+    shell: /usr/lpp/mmfs/bin/mmmount all -a
+    run_once: true
 """.format(hosts_config=hosts_config, cluster_config=cluster_config)
     return content
 
@@ -277,223 +566,24 @@ def initialize_cluster_details(scale_version, cluster_name, cluster_type, userna
     return cluster_details
 
 
-def get_host_format(node):
-    """ Return host entries """
-    host_format = f"{node['ip_addr']} scale_cluster_quorum={node['is_quorum']} scale_cluster_manager={node['is_manager']} scale_cluster_gui={node['is_gui']} scale_zimon_collector={node['is_collector']} is_nsd_server={node['is_nsd']} is_admin_node={node['is_admin']} ansible_user={node['user']} ansible_ssh_private_key_file={node['key_file']} ansible_python_interpreter=/usr/bin/python3 scale_nodeclass={node['class']} scale_daemon_nodename={node['daemon_nodename']}"
-    return host_format
-
-
-def initialize_node_details(az_count, cls_type, compute_cluster_instance_names, storage_private_ips,
-                            storage_cluster_instance_names, desc_private_ips, quorum_count,
-                            user, key_file):
-    """ Initialize node details for cluster definition.
-    :args: az_count (int), cls_type (string), compute_private_ips (list),
-           storage_private_ips (list), desc_private_ips (list),
-           quorum_count (int), user (string), key_file (string)
+def get_zone_instances(az_count, instance_names, instance_private_ips, slow_hosts=None,
+                       instance_vcpus=None, instance_memory_sizes=None):
+    """ Prepare instance details (name, ip, zone, shape) for placement ordering.
+    Shape lists are optional, without them every instance weighs the same
+    and only the zone order applies.
+    :args: az_count (int), instance_names (list), instance_private_ips (list),
+           slow_hosts (set of pre-flight outlier ips), instance_vcpus (list),
+           instance_memory_sizes (list of MiB)
     """
-    node_details, node = [], {}
-    if cls_type == 'compute':
-        start_quorum_assign = quorum_count - 1
-        for each_ip in compute_cluster_instance_names:
-            each_name = each_ip.split('.')[0]
-            if compute_cluster_instance_names.index(each_ip) <= (start_quorum_assign) and \
-                    compute_cluster_instance_names.index(each_ip) <= (manager_count - 1):
-                if compute_cluster_instance_names.index(each_ip) == 0:
-                    node = {'ip_addr': each_ip, 'is_quorum': True, 'is_manager': True,
-                            'is_gui': True, 'is_collector': True, 'is_nsd': False,
-                            'is_admin': True, 'user': user, 'key_file': key_file,
-                            'class': "computenodegrp", 'daemon_nodename': each_name}
-                    write_json_file({'compute_cluster_gui_ip_address': each_ip},
-                                    "%s/%s" % (str(pathlib.PurePath(ARGUMENTS.tf_inv_path).parent),
-                                               "compute_cluster_gui_details.json"))
-                elif compute_cluster_instance_names.index(each_ip) == 1:
-                    node = {'ip_addr': each_ip, 'is_quorum': True, 'is_manager': True,
-                            'is_gui': False, 'is_collector': True, 'is_nsd': False,
-                            'is_admin': False, 'user': user, 'key_file': key_file,
-                            'class': "computenodegrp", 'daemon_nodename': each_name}
-                else:
-                    node = {'ip_addr': each_ip, 'is_quorum': True, 'is_manager': True,
-                            'is_gui': False, 'is_collector': False, 'is_nsd': False,
-                            'is_admin': False, 'user': user, 'key_file': key_file,
-                            'class': "computenodegrp", 'daemon_nodename': each_name}
-            elif compute_cluster_instance_names.index(each_ip) <= (start_quorum_assign) and \
-                    compute_cluster_instance_names.index(each_ip) > (manager_count - 1):
-                node = {'ip_addr': each_ip, 'is_quorum': True, 'is_manager': False,
-                        'is_gui': False, 'is_collector': False, 'is_nsd': False,
-                        'is_admin': False, 'user': user, 'key_file': key_file,
-                        'class': "computenodegrp", 'daemon_nodename': each_name}
-            else:
-                node = {'ip_addr': each_ip, 'is_quorum': False, 'is_manager': False,
-                        'is_gui': False, 'is_collector': False, 'is_nsd': False,
-                        'is_admin': False, 'user': user, 'key_file': key_file,
-                        'class': "computenodegrp", 'daemon_nodename': each_name}
-            node_details.append(get_host_format(node))
-    elif cls_type == 'storage' and az_count == 1:
-        start_quorum_assign = quorum_count - 1
-        for each_ip in storage_cluster_instance_names:
-            each_name = each_ip.split('.')[0]
-            if storage_cluster_instance_names.index(each_ip) <= (start_quorum_assign) and \
-                    storage_cluster_instance_names.index(each_ip) <= (manager_count - 1):
-                if storage_cluster_instance_names.index(each_ip) == 0:
-                    node = {'ip_addr': each_ip, 'is_quorum': True, 'is_manager': True,
-                            'is_gui': True, 'is_collector': True, 'is_nsd': True,
-                            'is_admin': True, 'user': user, 'key_file': key_file,
-                            'class': "storagenodegrp", 'daemon_nodename': each_name}
-                    write_json_file({'storage_cluster_gui_ip_address': each_ip},
-                                    "%s/%s" % (str(pathlib.PurePath(ARGUMENTS.tf_inv_path).parent),
-                                               "storage_cluster_gui_details.json"))
-                elif storage_cluster_instance_names.index(each_ip) == 1:
-                    node = {'ip_addr': each_ip, 'is_quorum': True, 'is_manager': True,
-                            'is_gui': False, 'is_collector': True, 'is_nsd': True,
-                            'is_admin': False, 'user': user, 'key_file': key_file,
-                            'class': "storagenodegrp", 'daemon_nodename': each_name}
-                else:
-                    node = {'ip_addr': each_ip, 'is_quorum': True, 'is_manager': False,
-                            'is_gui': False, 'is_collector': True, 'is_nsd': True,
-                            'is_admin': False, 'user': user, 'key_file': key_file,
-                            'class': "storagenodegrp", 'daemon_nodename': each_name}
-            elif storage_cluster_instance_names.index(each_ip) <= (start_quorum_assign) and \
-                    storage_cluster_instance_names.index(each_ip) > (manager_count - 1):
-                node = {'ip_addr': each_ip, 'is_quorum': True, 'is_manager': False,
-                        'is_gui': False, 'is_collector': False, 'is_nsd': True,
-                        'is_admin': False, 'user': user, 'key_file': key_file,
-                        'class': "storagenodegrp", 'daemon_nodename': each_name}
-            else:
-                node = {'ip_addr': each_ip, 'is_quorum': False, 'is_manager': False,
-                        'is_gui': False, 'is_collector': False, 'is_nsd': True,
-                        'is_admin': False, 'user': user, 'key_file': key_file,
-                        'class': "storagenodegrp", 'daemon_nodename': each_name}
-            node_details.append(get_host_format(node))
-    elif cls_type == 'storage' and az_count > 1:
-        for each_ip in desc_private_ips:
-            node = {'ip_addr': each_ip, 'is_quorum': True, 'is_manager': False,
-                    'is_gui': False, 'is_collector': False, 'is_nsd': True,
-                    'is_admin': False, 'user': user, 'key_file': key_file,
-                    'class': "computedescnodegrp"}
-            node_details.append(get_host_format(node))
-
-        if az_count > 1:
-            # Storage/NSD nodes to be quorum nodes (quorum_count - 2 as index starts from 0)
-            start_quorum_assign = quorum_count - 2
-        else:
-            # Storage/NSD nodes to be quorum nodes (quorum_count - 1 as index starts from 0)
-            start_quorum_assign = quorum_count - 1
-
-        for each_ip in storage_cluster_instance_names:
-            if storage_cluster_instance_names.index(each_ip) <= (start_quorum_assign) and \
-                    storage_cluster_instance_names.index(each_ip) <= (manager_count - 1):
-                if storage_cluster_instance_names.index(each_ip) == 0:
-                    node = {'ip_addr': each_ip, 'is_quorum': True, 'is_manager': True,
-                            'is_gui': True, 'is_collector': True, 'is_nsd': True,
-                            'is_admin': True, 'user': user, 'key_file': key_file,
-                            'class': "storagenodegrp"}
-                    write_json_file({'storage_cluster_gui_ip_address': each_ip},
-                                    "%s/%s" % (str(pathlib.PurePath(ARGUMENTS.tf_inv_path).parent),
-                                               "storage_cluster_gui_details.json"))
-                elif storage_cluster_instance_names.index(each_ip) == 1:
-                    node = {'ip_addr': each_ip, 'is_quorum': True, 'is_manager': True,
-                            'is_gui': False, 'is_collector': True, 'is_nsd': True,
-                            'is_admin': True, 'user': user, 'key_file': key_file,
-                            'class': "storagenodegrp"}
-                else:
-                    node = {'ip_addr': each_ip, 'is_quorum': True, 'is_manager': True,
-                            'is_gui': False, 'is_collector': False, 'is_nsd': True,
-                            'is_admin': True, 'user': user, 'key_file': key_file,
-                            'class': "storagenodegrp"}
-            elif storage_cluster_instance_names.index(each_ip) <= (start_quorum_assign) and \
-                    storage_cluster_instance_names.index(each_ip) > (manager_count - 1):
-                node = {'ip_addr': each_ip, 'is_quorum': True, 'is_manager': False,
-                        'is_gui': False, 'is_collector': False, 'is_nsd': True,
-                        'is_admin': True, 'user': user, 'key_file': key_file,
-                        'class': "storagenodegrp"}
-            else:
-                node = {'ip_addr': each_ip, 'is_quorum': False, 'is_manager': False,
-                        'is_gui': False, 'is_collector': False, 'is_nsd': True,
-                        'is_admin': False, 'user': user, 'key_file': key_file,
-                        'class': "storagenodegrp"}
-            node_details.append(get_host_format(node))
-    elif cls_type == 'combined':
-        for each_ip in desc_private_ips:
-            node = {'ip_addr': each_ip, 'is_quorum': True, 'is_manager': False,
-                    'is_gui': False, 'is_collector': False, 'is_nsd': True,
-                    'is_admin': False, 'user': user, 'key_file': key_file,
-                    'class': "computedescnodegrp"}
-            node_details.append(get_host_format(node))
-
-        if az_count > 1:
-            # Storage/NSD nodes to be quorum nodes (quorum_count - 2 as index starts from 0)
-            start_quorum_assign = quorum_count - 2
-        else:
-            # Storage/NSD nodes to be quorum nodes (quorum_count - 1 as index starts from 0)
-            start_quorum_assign = quorum_count - 1
-
-        for each_ip in storage_cluster_instance_names:
-            if storage_cluster_instance_names.index(each_ip) <= (start_quorum_assign) and \
-                    storage_cluster_instance_names.index(each_ip) <= (manager_count - 1):
-                if storage_cluster_instance_names.index(each_ip) == 0:
-                    node = {'ip_addr': each_ip, 'is_quorum': True, 'is_manager': True,
-                            'is_gui': True, 'is_collector': True, 'is_nsd': True,
-                            'is_admin': True, 'user': user, 'key_file': key_file,
-                            'class': "storagenodegrp"}
-                elif storage_cluster_instance_names.index(each_ip) == 1:
-                    node = {'ip_addr': each_ip, 'is_quorum': True, 'is_manager': True,
-                            'is_gui': False, 'is_collector': True, 'is_nsd': True,
-                            'is_admin': True, 'user': user, 'key_file': key_file,
-                            'class': "storagenodegrp"}
-                else:
-                    node = {'ip_addr': each_ip, 'is_quorum': True, 'is_manager': True,
-                            'is_gui': False, 'is_collector': False, 'is_nsd': True,
-                            'is_admin': True, 'user': user, 'key_file': key_file,
-                            'class': "storagenodegrp"}
-            elif storage_cluster_instance_names.index(each_ip) <= (start_quorum_assign) and \
-                    storage_cluster_instance_names.index(each_ip) > (manager_count - 1):
-                node = {'ip_addr': each_ip, 'is_quorum': True, 'is_manager': False,
-                        'is_gui': False, 'is_collector': False, 'is_nsd': True,
-                        'is_admin': True, 'user': user, 'key_file': key_file,
-                        'class': "storagenodegrp"}
-            else:
-                node = {'ip_addr': each_ip, 'is_quorum': False, 'is_manager': False,
-                        'is_gui': False, 'is_collector': False, 'is_nsd': True,
-                        'is_admin': False, 'user': user, 'key_file': key_file,
-                        'class': "storagenodegrp"}
-            node_details.append(get_host_format(node))
-
-        if az_count > 1:
-            if len(storage_private_ips) - len(desc_private_ips) >= quorum_count:
-                quorums_left = 0
-            else:
-                quorums_left = quorum_count - \
-                    len(storage_private_ips) - len(desc_private_ips)
-        else:
-            if len(storage_private_ips) > quorum_count:
-                quorums_left = 0
-            else:
-                quorums_left = quorum_count - len(storage_private_ips)
-
-        # Additional quorums assign to compute nodes
-        if quorums_left > 0:
-            for each_ip in compute_cluster_instance_names[0:quorums_left]:
-                node = {'ip_addr': each_ip, 'is_quorum': True, 'is_manager': False,
-                        'is_gui': False, 'is_collector': False, 'is_nsd': False,
-                        'is_admin': True, 'user': user, 'key_file': key_file,
-                        'class': "computenodegrp"}
-                node_details.append(get_host_format(node))
-            for each_ip in compute_cluster_instance_names[quorums_left:]:
-                node = {'ip_addr': each_ip, 'is_quorum': False, 'is_manager': False,
-                        'is_gui': False, 'is_collector': False, 'is_nsd': False,
-                        'is_admin': False, 'user': user, 'key_file': key_file,
-                        'class': "computenodegrp"}
-                node_details.append(get_host_format(node))
-
-        if quorums_left == 0:
-            for each_ip in compute_cluster_instance_names:
-                node = {'ip_addr': each_ip, 'is_quorum': False, 'is_manager': False,
-                        'is_gui': False, 'is_collector': False, 'is_nsd': False,
-                        'is_admin': False, 'user': user, 'key_file': key_file,
-                        'class': "computenodegrp"}
-                node_details.append(get_host_format(node))
-
-    return node_details
+    instances = []
+    instance_vcpus, instance_memory_sizes = instance_vcpus or [], instance_memory_sizes or []
+    for idx, (each_name, each_ip) in enumerate(zip(instance_names, instance_private_ips)):
+        instances.append({'dns': each_name, 'private_ip': each_ip,
+                          'zone': get_subnet_zone(each_ip) if az_count > 1 else None,
+                          'slow': each_ip in (slow_hosts or set()),
+                          'vcpus': instance_vcpus[idx] if idx < len(instance_vcpus) else None,
+                          'memory_size': instance_memory_sizes[idx] if idx < len(instance_memory_sizes) else None})
+    return instances
 
 
 def initialize_scale_config_details(node_classes, param_key, param_value):
@@ -509,10 +599,22 @@ def initialize_scale_config_details(node_classes, param_key, param_value):
     return scale_config
 
 
-def get_disks_list(az_count, disk_mapping, desc_disk_mapping, disk_type):
+def get_disks_list(az_count, disk_mapping, desc_disk_mapping, disk_type, nsd_servers="owner",
+                   local_disk_layout="node", max_failure_groups=MAX_LOCAL_FAILURE_GROUPS):
     """ Initialize disk list. """
     disks_list = []
-    if disk_type == "locally-attached":
+    if disk_type == "locally-attached" and local_disk_layout == "zone":
+        # Group nodes per zone (subnet) so that replicas land in other zones
+        failure_groups = get_local_failure_groups({each_ip: get_subnet_zone(each_ip) if az_count > 1 else None
+                                                   for each_ip in disk_mapping},
+                                                  max_failure_groups)
+        for each_ip, disk_per_ip in disk_mapping.items():
+            for each_disk in disk_per_ip:
+                disks_list.append({"device": each_disk,
+                                   "failureGroup": failure_groups[each_ip], "servers": each_ip,
+                                   "usage": "dataAndMetadata", "pool": "system"})
+
+    elif disk_type == "locally-attached":
         failureGroup = 0
         for each_ip, disk_per_ip in disk_mapping.items():
             failureGroup = failureGroup + 1
@@ -572,6 +674,12 @@ def get_disks_list(az_count, disk_mapping, desc_disk_mapping, disk_type):
                                "failureGroup": 3,
                                "servers": list(desc_disk_mapping.keys())[0],
                                "usage": "descOnly", "pool": "system"})
+
+        # Backup servers need the volume attached, the terraform inventory does
+        # not report multi-attach volumes, hence every disk keeps its owner
+        if nsd_servers == "rotated":
+            LOGGER.warning("--nsd_servers rotated needs multi-attach volumes, the terraform inventory "
+                           "does not report volume attachment; NSD servers kept as owner.")
     return disks_list
 
 
@@ -602,12 +710,91 @@ def initialize_scale_storage_details(az_count, fs_mount, block_size, disk_detail
     return storage
 
 
+def get_filesystem_disks(fs_params, disks_list, desc_disk_mapping):
+    """ Assign disks to filesystems.
+    Data disks whose device is listed in the filesystem "devices" belong to
+    that filesystem, remaining disks belong to the first filesystem. Every
+    filesystem needs its own descOnly disk, desc volumes are assigned in order.
+    :args: fs_params (dict), disks_list (list), desc_disk_mapping (dict)
+    :return: disks per filesystem (dict)
+    """
+    fs_names = list(fs_params)
+    fs_disks = {fs_name: [] for fs_name in fs_names}
+    for each_disk in disks_list:
+        if each_disk["usage"] == "descOnly":
+            continue
+        owner = [fs_name for fs_name in fs_names
+                 if each_disk["device"] in fs_params[fs_name].get("devices", [])] or fs_names
+        fs_disks[owner[0]].append(each_disk)
+
+    desc_disks = [each_disk for each_disk in disks_list if each_disk["usage"] == "descOnly"]
+    if desc_disks:
+        desc_ip = list(desc_disk_mapping.keys())[0]
+        desc_devices = list(desc_disk_mapping.values())[0]
+        for idx, fs_name in enumerate(fs_names):
+            if idx == 0:
+                fs_disks[fs_name].append(desc_disks[0])
+            elif idx < len(desc_devices):
+                fs_disks[fs_name].append({"device": desc_devices[idx],
+                                          "failureGroup": 3, "servers": desc_ip,
+                                          "usage": "descOnly", "pool": "system"})
+            else:
+                LOGGER.warning("No descOnly volume left for filesystem %s.", fs_name)
+    return fs_disks
+
+
+def initialize_filesystems_storage_details(fs_params, fs_disks, zone_replicas):
+    """ Initialize storage details for several filesystems.
+    :args: fs_params (dict), fs_disks (dict), zone_replicas (bool, cap
+           replicas at the failure group count of each filesystem)
+    """
+    storage = {}
+    storage['scale_storage'] = []
+    for fs_name, fs_config in fs_params.items():
+        replicas = [fs_config["data_replicas"], fs_config["metadata_replicas"],
+                    fs_config["max_data_replicas"], fs_config["max_metadata_replicas"]]
+        if zone_replicas:
+            replicas = get_replica_settings(len(set(each_disk['failureGroup'] for each_disk in fs_disks[fs_name]
+                                                    if each_disk['usage'] != "descOnly")),
+                                            *[int(each_value) for each_value in replicas])
+        storage['scale_storage'].append({"filesystem": fs_name,
+                                         "blockSize": fs_config["block_size"],
+                                         "defaultDataReplicas": replicas[0],
+                                         "defaultMetadataReplicas": replicas[1],
+                                         "maxDataReplicas": replicas[2],
+                                         "maxMetadataReplicas": replicas[3],
+                                         "automaticMountOption": "true",
+                                         "defaultMountPoint": fs_config["mount_point"],
+                                         "disks": fs_disks[fs_name]})
+    return storage
+
+
+def get_stanza_nsd_name(disk):
+    """ Return NSD name of the disk, named after its primary server if unset """
+    return disk.get("nsd") or get_nsd_name(disk["servers"].split(",")[0], disk["device"])
+
+
+def get_disk_stanza(disk):
+    """ Return mmcrnsd/mmcrfs stanza block of one disk """
+    return "%%nsd: device=%s\n  nsd=%s\n  servers=%s\n  usage=%s\n  failureGroup=%s\n  pool=%s\n" % (
+        disk["device"], get_stanza_nsd_name(disk), disk["servers"], disk["usage"], disk["failureGroup"],
+        disk["pool"])
+
+
+def get_nsd_stanza(disks):
+    """ Return mmcrnsd/mmcrfs stanza for the disks """
+    return "".join(get_disk_stanza(each_disk) for each_disk in disks)
+
+
 if __name__ == "__main__":
     PARSER = argparse.ArgumentParser(description='Convert terraform inventory '
                                                  'to ansible inventory format '
                                                  'install and configuration.')
     PARSER.add_argument('--tf_inv_path', required=True,
                         help='Terraform inventory file path')
+    PARSER.add_argument('--tf_stream_threshold_mb', default=STREAM_THRESHOLD / 1024 / 1024, type=float,
+                        help='inventories of this size (MiB) and larger are read incrementally, '
+                             'smaller ones by json.load')
     PARSER.add_argument('--install_infra_path', required=True,
                         help='Spectrum Scale install infra clone parent path')
     PARSER.add_argument('--instance_private_key', required=True,
@@ -622,6 +809,17 @@ if __name__ == "__main__":
     PARSER.add_argument('--max_pagepool_gb', help='maximum pagepool size in GB',
                         default=1)
     PARSER.add_argument('--disk_type', help='Disk type')
+    PARSER.add_argument('--nsd_servers', default='owner',
+                        choices=['owner', 'rotated'],
+                        help='rotated adds the other NSD servers of the failure group '
+                             'as backup servers (requires multi-attach volumes, not reported '
+                             'by the ini terraform inventory, owner is kept)')
+    PARSER.add_argument('--local_disk_layout', default='node',
+                        choices=['node', 'zone'],
+                        help='zone groups locally-attached disks into failure groups '
+                             'per zone and matches replica settings')
+    PARSER.add_argument('--max_failure_groups', default=MAX_LOCAL_FAILURE_GROUPS, type=int,
+                        help='maximum failure groups for zone layout of locally-attached disks')
     PARSER.add_argument('--default_data_replicas',
                         help='Value for default data replica')
     PARSER.add_argument('--max_data_replicas',
@@ -639,7 +837,65 @@ if __name__ == "__main__":
                         help='Spectrum Scale GUI password')
     PARSER.add_argument('--enable_mrot_conf', required=True)
     PARSER.add_argument('--verbose', action='store_true',
-                        help='print log messages')
+                        help='print log messages, stage timings and topology summary')
+    PARSER.add_argument('--dump_content', action='store_true',
+                        help='also log full terraform input and generated file content')
+    PARSER.add_argument('--log_format', choices=LOG_FORMATS, default="text",
+                        help='log as text or json lines')
+    PARSER.add_argument('--workload_hints',
+                        help='json file of filesystem (or "*") to workload hints (avg_file_size, '
+                             'file_count, read_ratio) used to recommend filesystem sizing')
+    PARSER.add_argument('--benchmark_playbook', action='store_true',
+                        help='writes filesystem acceptance benchmark playbook and inventory for clients')
+    PARSER.add_argument('--benchmark_clients', type=int,
+                        help='number of clients running the benchmark (default: all)')
+    PARSER.add_argument('--benchmark_mount_point',
+                        help='mount point benchmarked (default: first filesystem)')
+    PARSER.add_argument('--benchmark_volume_type',
+                        help='volume type of the data volumes (e.g. gp3), benchmark expected numbers')
+    PARSER.add_argument('--preflight_playbook', action='store_true',
+                        help='writes pre-flight disk read and network probe playbook for NSD servers')
+    PARSER.add_argument('--preflight_report',
+                        help='pre-flight report, slow volumes are left out and slow hosts are '
+                             'placed after other nodes')
+    PARSER.add_argument('--latency_probe_playbook', action='store_true',
+                        help='writes round trip time probe playbook between quorum candidates')
+    PARSER.add_argument('--latency_matrix',
+                        help='latency matrix json (probe output or supplied), quorum and manager '
+                             'nodes are the lowest latency set')
+    PARSER.add_argument('--install_shards', default=1, type=int,
+                        help='splits client-only package install into shard inventories run '
+                             'as parallel ansible-playbook processes by a coordinator script')
+    PARSER.add_argument('--image_manifest',
+                        help='json file of instance name/ip (or "*") to image details (image, '
+                             'scale_version baked in), overrides --using_packer_image per host')
+    PARSER.add_argument('--fact_cache', action='store_true',
+                        help='pre-seeds ansible jsonfile fact cache from terraform inventory details')
+    PARSER.add_argument('--quorum_mode', default='node',
+                        choices=['node', 'tiebreaker'],
+                        help='tiebreaker uses up to 3 quorum nodes along with tiebreaker disks')
+    PARSER.add_argument('--parallel_fs_create', action='store_true',
+                        help='creates independent filesystems concurrently')
+    PARSER.add_argument('--zone_nodeclasses', action='store_true',
+                        help='adds nodes to zone scoped node classes (ex: storagenodegrp_us-east-1a)')
+    PARSER.add_argument('--zone_config_overrides',
+                        help='json file of zone (or "*") to scale config parameters applied '
+                             'to zone scoped node classes')
+    PARSER.add_argument('--workload_profile', default='default',
+                        choices=['default', 'metadata', 'throughput'],
+                        help='Workload hint used to scale manager node count')
+    PARSER.add_argument('--gui_placement', default='quorum',
+                        choices=['quorum', 'dedicated'],
+                        help='Place GUI/admin/collector roles on the first quorum node '
+                             'or on a non-quorum, non-manager node')
+    PARSER.add_argument('--sensors_per_collector', default=2000, type=int,
+                        help='Target perfmon sensors ingested per collector node')
+    PARSER.add_argument('--skip_topology_validation', action='store_true',
+                        help='skips generated topology invariant checks')
+    PARSER.add_argument('--inventory_formats', nargs='+', default=["ini"], choices=INVENTORY_FORMATS,
+                        help='inventory formats rendered from the cluster model, ini is always written')
+    PARSER.add_argument('--ces_protocols', nargs='+', default=["nfs", "smb"], choices=["nfs", "smb"],
+                        help='protocols served by protocol (CES) nodes of the inventory')
     PARSER.add_argument('--scale_encryption_enabled', help='Enabling encryption feature with GKLM',
                         default=False)
     PARSER.add_argument('--scale_encryption_servers', help='List of key servers for encryption',
@@ -647,13 +903,34 @@ if __name__ == "__main__":
     PARSER.add_argument('--scale_encryption_admin_password', help='Admin Password for the Key server',
                         default="null")
     ARGUMENTS = PARSER.parse_args()
+    setup_logging(ARGUMENTS.verbose, ARGUMENTS.log_format, ARGUMENTS.dump_content)
+    start_time = time.time()
 
     cluster_type, gui_username, gui_password = None, None, None
     profile_path, replica_config, scale_config = None, None, {}
     # Step-1: Read the inventory file
-    TF = read_json_file(ARGUMENTS.tf_inv_path)
-    if ARGUMENTS.verbose:
-        print("Parsed terraform output: %s" % json.dumps(TF, indent=4))
+    TF = read_json_file(ARGUMENTS.tf_inv_path, int(ARGUMENTS.tf_stream_threshold_mb * 1024 * 1024))
+    if CONTENT_LOGGER.isEnabledFor(logging.DEBUG):
+        CONTENT_LOGGER.debug("Parsed terraform output: %s", json.dumps(TF))
+    stage_time = log_stage(LOGGER, "read_inventory", start_time,
+                           compute=len(TF['compute_cluster_instance_private_ips']),
+                           storage=len(TF['storage_cluster_instance_private_ips']),
+                           desc=len(TF['storage_cluster_desc_instance_private_ips']),
+                           volumes=sum(len(devices) for devices in
+                                       TF['storage_cluster_with_data_volume_mapping'].values()))
+
+    # Leave pre-flight outliers out of quorum/manager placement and failure groups
+    slow_hosts = set()
+    if ARGUMENTS.preflight_report:
+        slow_hosts, slow_devices = read_preflight_report(ARGUMENTS.preflight_report)
+        for each_key in ['storage_cluster_with_data_volume_mapping', 'storage_cluster_desc_data_volume_mapping']:
+            for each_ip, devices in TF[each_key].items():
+                if slow_devices.get(each_ip):
+                    LOGGER.info("Excluding slow volumes on %s: %s", each_ip, ", ".join(sorted(slow_devices[each_ip])))
+                    TF[each_key][each_ip] = [each_device for each_device in devices
+                                             if each_device not in slow_devices[each_ip]]
+        for each_ip in sorted(slow_hosts):
+            LOGGER.info("Slow host %s placed after other nodes", each_ip)
 
     # Step-2: Identify the cluster type
     if len(TF['storage_cluster_instance_private_ips']) == 0 and \
@@ -751,7 +1028,13 @@ if __name__ == "__main__":
             scale_config = initialize_scale_config_details(
                 ["storagenodegrp", "computenodegrp", "computedescnodegrp"], "pagepool", pagepool_size)
 
-    print("Identified cluster type: %s" % cluster_type)
+    LOGGER.info("Identified cluster type: %s", cluster_type)
+
+    # Filesystems from filesystem config, single filesystem otherwise
+    fs_params = {}
+    if cluster_type in ['storage', 'combined'] and TF.get('filesystem_config_file'):
+        fs_params = read_filesystem_config(TF['filesystem_config_file'])
+    parallel_fs_create = ARGUMENTS.parallel_fs_create and len(fs_params) > 1
 
     # Step-3: Identify if tie breaker needs to be counted for storage
     if len(TF['vpc_availability_zones']) > 1:
@@ -762,53 +1045,89 @@ if __name__ == "__main__":
         total_node_count = len(TF['compute_cluster_instance_private_ips']) + \
             len(TF['storage_cluster_instance_private_ips'])
 
-    if ARGUMENTS.verbose:
-        print("Total node count: ", total_node_count)
+    LOGGER.debug("Total node count: %s", total_node_count)
 
     # Determine total number of quorum, manager nodes to be in the cluster
     # manager designates the node as part of the pool of nodes from which
     # file system managers and token managers are selected.
-    quorum_count, manager_count = 0, 2
-    if total_node_count < 4:
-        quorum_count = total_node_count
-    elif 4 <= total_node_count < 10:
-        quorum_count = 3
-    elif 10 <= total_node_count < 19:
-        quorum_count = 5
+    # Tiebreaker disks need NSDs, compute only cluster keeps node quorum
+    use_tiebreaker = ARGUMENTS.quorum_mode == "tiebreaker" and cluster_type in ['storage', 'combined']
+    if use_tiebreaker:
+        quorum_count = get_tiebreaker_quorum_count(total_node_count)
     else:
-        quorum_count = 7
-
-    if ARGUMENTS.verbose:
-        print("Total quorum count: ", quorum_count)
+        quorum_count = get_quorum_count(total_node_count)
+    manager_count = get_manager_count(total_node_count, ARGUMENTS.workload_profile)
+    collector_count = get_collector_count(total_node_count, ARGUMENTS.sensors_per_collector)
+
+    LOGGER.debug("Total quorum count: %s, manager count: %s, collector count: %s",
+                 quorum_count, manager_count, collector_count)
+
+    # Group hosts by image, hosts with baked Scale packages skip install roles
+    using_packer_image = ARGUMENTS.using_packer_image
+    host_images = {}
+    if ARGUMENTS.image_manifest:
+        image_manifest = read_json_file(ARGUMENTS.image_manifest)
+        for each_name, each_ip in list(zip(TF['compute_cluster_instance_names'],
+                                           TF['compute_cluster_instance_private_ips'])) + \
+                list(zip(TF['storage_cluster_instance_names'], TF['storage_cluster_instance_private_ips'])) + \
+                [(each_ip, each_ip) for each_ip in TF['storage_cluster_desc_instance_private_ips']]:
+            host_images[each_name] = host_images[each_ip] = get_host_image(image_manifest, [each_name, each_ip])
+        image_groups = get_image_groups({each_ip: host_images[each_ip] for each_ip in
+                                         TF['compute_cluster_instance_private_ips'] +
+                                         TF['storage_cluster_instance_private_ips'] +
+                                         TF['storage_cluster_desc_instance_private_ips']},
+                                        TF['scale_version'])
+        for baked_version, hosts in sorted(image_groups.items()):
+            LOGGER.info(get_image_group_summary(baked_version, len(hosts), TF['scale_version']))
+        if str(TF['scale_version']) not in image_groups:
+            using_packer_image = "false"
+        elif list(image_groups) == [str(TF['scale_version'])]:
+            using_packer_image = "true"
+        else:
+            using_packer_image = "mixed"
 
     # Step-4: Create playbook
-    if ARGUMENTS.using_packer_image == "false" and ARGUMENTS.using_rest_initialization == "true":
+    # Client nodes installed by shards are flagged scale_packages_baked
+    shard_install = ARGUMENTS.install_shards > 1 and using_packer_image == "false"
+    playbook_content = None
+    if using_packer_image == "mixed" and ARGUMENTS.using_rest_initialization == "true":
+        playbook_content = prepare_mixed_image_ansible_playbook(
+            "scale_nodes", "%s_cluster_config.yaml" % cluster_type,
+            ARGUMENTS.instance_private_key, ARGUMENTS.fact_cache)
+    elif using_packer_image == "mixed" and ARGUMENTS.using_rest_initialization == "false":
+        playbook_content = prepare_nogui_mixed_image_ansible_playbook(
+            "scale_nodes", "%s_cluster_config.yaml" % cluster_type,
+            ARGUMENTS.instance_private_key, ARGUMENTS.fact_cache)
+    elif using_packer_image == "false" and ARGUMENTS.using_rest_initialization == "true":
         playbook_content = prepare_ansible_playbook(
             "scale_nodes", "%s_cluster_config.yaml" % cluster_type,
-            ARGUMENTS.instance_private_key)
-        write_to_file("/%s/%s/%s_cloud_playbook.yaml" % (ARGUMENTS.install_infra_path,
-                                                         "ibm-spectrum-scale-install-infra",
-                                                         cluster_type), playbook_content)
-    elif ARGUMENTS.using_packer_image == "true" and ARGUMENTS.using_rest_initialization == "true":
+            ARGUMENTS.instance_private_key, shard_install, ARGUMENTS.fact_cache)
+    elif using_packer_image == "true" and ARGUMENTS.using_rest_initialization == "true":
         playbook_content = prepare_packer_ansible_playbook(
-            "scale_nodes", "%s_cluster_config.yaml" % cluster_type)
-        write_to_file("/%s/%s/%s_cloud_playbook.yaml" % (ARGUMENTS.install_infra_path,
-                                                         "ibm-spectrum-scale-install-infra",
-                                                         cluster_type), playbook_content)
-    elif ARGUMENTS.using_packer_image == "false" and ARGUMENTS.using_rest_initialization == "false":
+            "scale_nodes", "%s_cluster_config.yaml" % cluster_type, ARGUMENTS.fact_cache)
+    elif using_packer_image == "false" and ARGUMENTS.using_rest_initialization == "false":
         playbook_content = prepare_nogui_ansible_playbook(
-            "scale_nodes", "%s_cluster_config.yaml" % cluster_type)
-        write_to_file("/%s/%s/%s_cloud_playbook.yaml" % (ARGUMENTS.install_infra_path,
-                                                         "ibm-spectrum-scale-install-infra",
-                                                         cluster_type), playbook_content)
-    elif ARGUMENTS.using_packer_image == "true" and ARGUMENTS.using_rest_initialization == "false":
+            "scale_nodes", "%s_cluster_config.yaml" % cluster_type, shard_install, ARGUMENTS.fact_cache)
+    elif using_packer_image == "true" and ARGUMENTS.using_rest_initialization == "false":
         playbook_content = prepare_nogui_packer_ansible_playbook(
-            "scale_nodes", "%s_cluster_config.yaml" % cluster_type)
+            "scale_nodes", "%s_cluster_config.yaml" % cluster_type, ARGUMENTS.fact_cache)
+    use_protocols = cluster_type in ['storage', 'combined'] and bool(TF.get('protocol_cluster_instance_names'))
+    if playbook_content is not None:
+        # Optional plays run after the cluster plays, the playbook is written once
+        if parallel_fs_create:
+            playbook_content = playbook_content + prepare_concurrent_fs_playbook(
+                "scale_nodes", "%s_cluster_config.yaml" % cluster_type)
+        if use_tiebreaker:
+            playbook_content = playbook_content + prepare_tiebreaker_playbook(
+                "scale_nodes", "%s_cluster_config.yaml" % cluster_type)
+        if ARGUMENTS.using_rest_initialization == "true":
+            playbook_content = playbook_content + prepare_perfmon_federation_playbook("scale_nodes")
+        if use_protocols:
+            playbook_content = playbook_content + prepare_protocol_playbook(
+                "scale_nodes", "%s_cluster_config.yaml" % cluster_type, ARGUMENTS.ces_protocols)
         write_to_file("/%s/%s/%s_cloud_playbook.yaml" % (ARGUMENTS.install_infra_path,
                                                          "ibm-spectrum-scale-install-infra",
                                                          cluster_type), playbook_content)
-    if ARGUMENTS.verbose:
-        print("Content of ansible playbook:\n", playbook_content)
 
     # Step-4.1: Create Encryption playbook
     if ARGUMENTS.scale_encryption_enabled == "true":
@@ -819,97 +1138,376 @@ if __name__ == "__main__":
             "scale_nodes")
         write_to_file("%s/%s/encryption_cluster_playbook.yaml" % (ARGUMENTS.install_infra_path,
                                                                   "ibm-spectrum-scale-install-infra"), encryption_playbook_content)
-    if ARGUMENTS.verbose:
-        print("Content of ansible playbook for encryption:\n",
-              encryption_playbook_content)
 
     # Step-5: Create hosts
-    config = configparser.ConfigParser(allow_no_value=True)
-    node_details = initialize_node_details(len(TF['vpc_availability_zones']), cluster_type,
-                                           TF['compute_cluster_instance_names'],
-                                           TF['storage_cluster_instance_private_ips'],
-                                           TF['storage_cluster_instance_names'],
-                                           TF['storage_cluster_desc_instance_private_ips'],
-                                           quorum_count, "root", ARGUMENTS.instance_private_key)
-    node_template = ""
-    for each_entry in node_details:
-        if ARGUMENTS.bastion_ssh_private_key is None:
-            each_entry = each_entry + " " + "ansible_ssh_common_args="""
-            node_template = node_template + each_entry + "\n"
+    # Spread quorum/manager positions across zones (subnets) in multi-AZ
+    compute_instances = order_instances_by_zone(
+        get_zone_instances(len(TF['vpc_availability_zones']),
+                           TF['compute_cluster_instance_names'],
+                           TF['compute_cluster_instance_private_ips'], slow_hosts,
+                           TF.get('compute_cluster_instance_vcpus'),
+                           TF.get('compute_cluster_instance_memory_sizes')))
+    storage_instances = order_instances_by_zone(
+        get_zone_instances(len(TF['vpc_availability_zones']),
+                           TF['storage_cluster_instance_names'],
+                           TF['storage_cluster_instance_private_ips'], slow_hosts,
+                           TF.get('storage_cluster_instance_vcpus'),
+                           TF.get('storage_cluster_instance_memory_sizes')))
+    # descOnly nodes are known by ip only
+    desc_instances = get_zone_instances(len(TF['vpc_availability_zones']),
+                                        TF['storage_cluster_desc_instance_private_ips'],
+                                        TF['storage_cluster_desc_instance_private_ips'])
+    latency_matrix = read_latency_matrix(ARGUMENTS.latency_matrix) if ARGUMENTS.latency_matrix else None
+    node_details = get_cluster_nodes(len(TF['vpc_availability_zones']), cluster_type, compute_instances,
+                                     storage_instances, desc_instances, quorum_count, manager_count,
+                                     collector_count, latency_matrix)
+    if latency_matrix:
+        quorum_latency = get_worst_latency(latency_matrix, [each_node.ip for each_node in node_details
+                                                            if each_node.is_quorum])
+        if quorum_latency is None:
+            LOGGER.warning("Latency matrix does not cover all quorum nodes, placement order kept.")
         else:
-            proxy_command = f"ssh -p 22 -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null -W %h:%p {ARGUMENTS.bastion_user}@{ARGUMENTS.bastion_ip} -i {ARGUMENTS.bastion_ssh_private_key}"
-            each_entry = each_entry + " " + \
-                "ansible_ssh_common_args='-o ControlMaster=auto -o ControlPersist=30m -o UserKnownHostsFile=/dev/null -o StrictHostKeyChecking=no -o ProxyCommand=\"" + proxy_command + "\"'"
-            node_template = node_template + each_entry + "\n"
+            LOGGER.info("Quorum worst round trip time: %.3f ms", quorum_latency[0])
+
+    # Small tiebreaker quorum, take remaining managers from non-quorum nodes
+    if use_tiebreaker:
+        promote_managers(node_details, NODE_ROLE_KEYS, manager_count)
+
+    if using_packer_image == "mixed":
+        for each_node in node_details:
+            each_node.packages_baked = is_scale_baked(host_images.get(each_node.name, {}), TF['scale_version'])
+
+    # Step-5.1: Place GUI/admin/collector roles off the quorum managers
+    if len(TF.get('gui_cluster_instance_names', [])) != len(TF.get('gui_cluster_instance_private_ips', [])):
+        LOGGER.warning("GUI instances without private IP are not used as dedicated GUI nodes.")
+    dedicated_gui_nodes = get_gui_nodes(get_zone_instances(len(TF['vpc_availability_zones']),
+                                                           TF.get('gui_cluster_instance_names', []),
+                                                           TF.get('gui_cluster_instance_private_ips', [])))
+    node_details.extend(dedicated_gui_nodes)
+    if ARGUMENTS.gui_placement == "dedicated" or dedicated_gui_nodes:
+        if relocate_gui_roles(node_details, NODE_ROLE_KEYS, dedicated_gui_nodes) is None:
+            LOGGER.warning("No non-quorum, non-manager node available, GUI stays on quorum node.")
+
+    # CES protocol nodes of storage cluster, spread across zones
+    protocol_instances = []
+    if cluster_type in ['storage', 'combined']:
+        protocol_instances = order_instances_by_zone(
+            get_zone_instances(len(TF['vpc_availability_zones']),
+                               TF.get('protocol_cluster_instance_names', []),
+                               TF.get('protocol_cluster_instance_private_ips', [])))
+        node_details.extend(get_protocol_nodes(protocol_instances, ARGUMENTS.ces_protocols))
+
+    if cluster_type in ['compute', 'storage']:
+        for each_node in node_details:
+            if each_node.is_gui:
+                write_json_file({'%s_cluster_gui_ip_address' % cluster_type: each_node.ip},
+                                "%s/%s" % (str(pathlib.PurePath(ARGUMENTS.tf_inv_path).parent),
+                                           "%s_cluster_gui_details.json" % cluster_type))
+
+    # Step-5.2: Add nodes to zone scoped node classes with zone overrides
+    if ARGUMENTS.zone_nodeclasses:
+        node_zones = {}
+        for each_instance in compute_instances + storage_instances + protocol_instances:
+            node_zones[each_instance['dns']] = each_instance['zone']
+            node_zones[each_instance['private_ip']] = each_instance['zone']
+        for each_ip in TF['storage_cluster_desc_instance_private_ips']:
+            node_zones[each_ip] = get_subnet_zone(each_ip) if len(TF['vpc_availability_zones']) > 1 else None
+        zone_labels = get_zone_labels(list(node_zones.values()), TF['vpc_availability_zones'])
+        zone_classes = {}
+        for each_node in node_details:
+            if each_node.name in node_zones and node_zones[each_node.name] in zone_labels:
+                zone = zone_labels[node_zones[each_node.name]]
+                each_node.zone_class = get_zone_nodeclass(each_node.node_class, zone)
+                zone_classes[each_node.zone_class] = zone
+        zone_overrides = read_json_file(ARGUMENTS.zone_config_overrides) \
+            if ARGUMENTS.zone_config_overrides else {}
+        scale_config['scale_config'].extend(get_zone_config_details(zone_classes, zone_overrides))
+
+    # Step-5.3: Pre-seed ansible fact cache, nodes then gather only a minimal subset
+    if ARGUMENTS.fact_cache:
+        instances = {}
+        desc_instances = [{'dns': None, 'private_ip': each_ip,
+                           'zone': get_subnet_zone(each_ip) if len(TF['vpc_availability_zones']) > 1 else None}
+                          for each_ip in TF['storage_cluster_desc_instance_private_ips']]
+        zone_labels = get_zone_labels([each_instance['zone'] for each_instance in
+                                       compute_instances + storage_instances + desc_instances +
+                                       protocol_instances],
+                                      TF['vpc_availability_zones'])
+        for each_instance in compute_instances + storage_instances + desc_instances + protocol_instances:
+            instance = dict(each_instance, zone=zone_labels.get(each_instance['zone']))
+            instances[each_instance['dns']] = instance
+            instances[each_instance['private_ip']] = instance
+        write_fact_cache("%s/%s/%s" % (ARGUMENTS.install_infra_path, "ibm-spectrum-scale-install-infra",
+                                       FACT_CACHE_DIR),
+                         {each_node.name: get_instance_facts(instances.get(each_node.name, {}))
+                          for each_node in node_details})
+
+    # Client-only nodes installed by shards, the cluster playbook skips their install roles
+    shards = []
+    if ARGUMENTS.install_shards > 1 and using_packer_image != "true":
+        client_nodes = [{'name': each_node.name, 'zone': each_node.zone}
+                        for each_node in node_details
+                        if each_node.node_class == "computenodegrp" and not each_node.packages_baked and
+                        not any(each_node[NODE_ROLE_KEYS[each_role]]
+                                for each_role in ['quorum', 'manager', 'gui', 'collector', 'admin'])]
+        shards = get_install_shards(client_nodes, ARGUMENTS.install_shards)
+        sharded_hosts = set(each_host for each_shard in shards for each_host in each_shard)
+        for each_node in node_details:
+            if each_node.name in sharded_hosts:
+                each_node.packages_baked = True
 
     if TF['resource_prefix']:
         cluster_name = TF['resource_prefix']
     else:
         cluster_name = "%s.%s" % ("spectrum-scale", cluster_type)
 
-    config['all:vars'] = initialize_cluster_details(TF['scale_version'],
-                                                    cluster_name,
-                                                    cluster_type,
-                                                    gui_username,
-                                                    gui_password,
-                                                    profile_path,
-                                                    replica_config,
-                                                    ARGUMENTS.enable_mrot_conf,
-                                                    TF['storage_subnet_cidr'],
-                                                    TF['compute_subnet_cidr'],
-                                                    TF['opposit_cluster_clustername'],
-                                                    ARGUMENTS.scale_encryption_servers,
-                                                    ARGUMENTS.scale_encryption_admin_password)
-    with open("%s/%s/%s_inventory.ini" % (ARGUMENTS.install_infra_path,
-                                          "ibm-spectrum-scale-install-infra",
-                                          cluster_type), 'w') as configfile:
-        configfile.write('[scale_nodes]' + "\n")
-        configfile.write(node_template)
-        config.write(configfile)
-
-    if ARGUMENTS.verbose:
-        config.read("%s/%s/%s_inventory.ini" % (ARGUMENTS.install_infra_path,
-                                                "ibm-spectrum-scale-install-infra",
-                                                cluster_type))
-        print("Content of %s/%s/%s_inventory.ini" % (ARGUMENTS.install_infra_path,
-                                                     "ibm-spectrum-scale-install-infra",
-                                                     cluster_type))
-        print('[scale_nodes]')
-        print(node_template)
-        print('[all:vars]')
-        for each_key in config['all:vars']:
-            print("%s: %s" % (each_key, config.get('all:vars', each_key)))
+    cluster_details = initialize_cluster_details(TF['scale_version'],
+                                                 cluster_name,
+                                                 cluster_type,
+                                                 gui_username,
+                                                 gui_password,
+                                                 profile_path,
+                                                 replica_config,
+                                                 ARGUMENTS.enable_mrot_conf,
+                                                 TF['storage_subnet_cidr'],
+                                                 TF['compute_subnet_cidr'],
+                                                 TF['opposit_cluster_clustername'],
+                                                 ARGUMENTS.scale_encryption_servers,
+                                                 ARGUMENTS.scale_encryption_admin_password)
+    cluster_details.update(get_perfmon_federation_details(
+        [each_node.name for each_node in node_details if each_node.is_collector]))
+    cluster_model = ClusterModel(cluster_type, node_details, cluster_details, "root", ARGUMENTS.instance_private_key,
+                                 get_ssh_proxy_args(ARGUMENTS.bastion_user, ARGUMENTS.bastion_ip,
+                                                    ARGUMENTS.bastion_ssh_private_key))
+    write_to_file("%s/%s/%s_inventory.ini" % (ARGUMENTS.install_infra_path,
+                                              "ibm-spectrum-scale-install-infra",
+                                              cluster_type),
+                  INVENTORY_RENDERERS["ini"](cluster_model))
+    stage_time = log_stage(LOGGER, "hosts", stage_time, nodes=len(node_details))
+
+    # Step-5.4: Prepare disks, tiebreaker disks are part of cluster config
+    tiebreaker_disks = []
+    if cluster_type in ['storage', 'combined']:
+        disks_list = get_disks_list(len(TF['vpc_availability_zones']),
+                                    TF['storage_cluster_with_data_volume_mapping'],
+                                    TF['storage_cluster_desc_data_volume_mapping'],
+                                    ARGUMENTS.disk_type,
+                                    ARGUMENTS.nsd_servers,
+                                    ARGUMENTS.local_disk_layout,
+                                    ARGUMENTS.max_failure_groups)
+        if use_tiebreaker:
+            tiebreaker_disks = select_tiebreaker_disks(disks_list)
+            scale_config['scale_cluster_config']['tiebreaker_disks'] = ";".join(tiebreaker_disks)
+
+    # Step-5.5: Shard client-only package install across parallel controllers
+    if shards:
+        for shard_index, shard_hosts in enumerate(shards, 1):
+            write_to_file("%s/%s/%s_inventory_shard%s.ini" % (ARGUMENTS.install_infra_path,
+                                                              "ibm-spectrum-scale-install-infra",
+                                                              cluster_type, shard_index),
+                          INVENTORY_RENDERERS["ini"](cluster_model, shard_hosts))
+        shard_playbook_content = prepare_shard_ansible_playbook(
+            "scale_nodes", "%s_cluster_config.yaml" % cluster_type, ARGUMENTS.using_rest_initialization,
+            ARGUMENTS.fact_cache)
+        write_to_file("%s/%s/%s_shard_playbook.yaml" % (ARGUMENTS.install_infra_path,
+                                                        "ibm-spectrum-scale-install-infra",
+                                                        cluster_type), shard_playbook_content)
+        coordinator_path = "%s/%s/%s_sharded_install.sh" % (ARGUMENTS.install_infra_path,
+                                                            "ibm-spectrum-scale-install-infra", cluster_type)
+        write_to_file(coordinator_path, prepare_shard_coordinator(cluster_type, len(shards)), 0o755)
+        LOGGER.info("Client install split into %s shards (%s hosts), run %s",
+                    len(shards), sum(len(each_shard) for each_shard in shards), coordinator_path)
+
+    # Step-5.6: Pre-flight disk and network probes of NSD servers
+    if ARGUMENTS.preflight_playbook and cluster_type in ['storage', 'combined']:
+        host_names = {each_instance['private_ip']: each_instance['dns'] for each_instance in storage_instances}
+        host_names.update({each_ip: each_ip for each_ip in TF['storage_cluster_desc_instance_private_ips']})
+        disk_map = {}
+        for each_key in ['storage_cluster_with_data_volume_mapping', 'storage_cluster_desc_data_volume_mapping']:
+            for each_ip, devices in TF[each_key].items():
+                disk_map[each_ip] = [(each_device, None) for each_device in devices]
+        write_to_file("%s/%s/%s_preflight_playbook.yaml" % (ARGUMENTS.install_infra_path,
+                                                            "ibm-spectrum-scale-install-infra", cluster_type),
+                      prepare_preflight_playbook("scale_nodes", get_preflight_nodes(host_names, disk_map),
+                                                 os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                              "scale_preflight.py")))
+
+    # Step-5.6.1: Round trip time probes between quorum candidates
+    if ARGUMENTS.latency_probe_playbook:
+        latency_candidates = get_latency_candidates(storage_instances if cluster_type in ['storage', 'combined']
+                                                    else compute_instances)
+        if cluster_type != 'compute':
+            latency_candidates = latency_candidates + desc_instances
+        host_names = {each_instance['private_ip']: each_instance['dns'] for each_instance in latency_candidates}
+        write_to_file("%s/%s/%s_latency_inventory.ini" % (ARGUMENTS.install_infra_path,
+                                                          "ibm-spectrum-scale-install-infra", cluster_type),
+                      INVENTORY_RENDERERS["ini"](cluster_model, list(host_names.values())))
+        write_to_file("%s/%s/%s_latency_playbook.yaml" % (ARGUMENTS.install_infra_path,
+                                                          "ibm-spectrum-scale-install-infra", cluster_type),
+                      prepare_latency_playbook("scale_nodes", get_latency_nodes(host_names),
+                                               os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                            "scale_preflight.py")))
 
     # Step-6: Create group_vars directory
     create_directory("%s/%s/%s" % (ARGUMENTS.install_infra_path,
                                    "ibm-spectrum-scale-install-infra",
                                    "group_vars"))
     # Step-7: Create group_vars
-    with open("%s/%s/%s/%s" % (ARGUMENTS.install_infra_path,
-                               "ibm-spectrum-scale-install-infra",
-                               "group_vars",
-                               "%s_cluster_config.yaml" % cluster_type), 'w') as groupvar:
-        yaml.dump(scale_config, groupvar, default_flow_style=False)
-    if ARGUMENTS.verbose:
-        print("group_vars content:\n%s" % yaml.dump(
-            scale_config, default_flow_style=False))
+    groupvar_content = get_yaml_content(scale_config)
 
     if cluster_type in ['storage', 'combined']:
-        disks_list = get_disks_list(len(TF['vpc_availability_zones']),
-                                    TF['storage_cluster_with_data_volume_mapping'],
-                                    TF['storage_cluster_desc_data_volume_mapping'],
-                                    ARGUMENTS.disk_type)
-        scale_storage = initialize_scale_storage_details(len(TF['vpc_availability_zones']),
-                                                         TF['storage_cluster_filesystem_mountpoint'],
-                                                         TF['filesystem_block_size'],
-                                                         disks_list, int(ARGUMENTS.default_metadata_replicas), int(
-                                                             ARGUMENTS.max_metadata_replicas),
-                                                         int(ARGUMENTS.default_data_replicas), int(ARGUMENTS.max_data_replicas))
-        with open("%s/%s/%s/%s" % (ARGUMENTS.install_infra_path,
+        zone_replicas = ARGUMENTS.disk_type == "locally-attached" and ARGUMENTS.local_disk_layout == "zone"
+        if fs_params:
+            scale_storage = initialize_filesystems_storage_details(
+                fs_params, get_filesystem_disks(fs_params, disks_list,
+                                                TF['storage_cluster_desc_data_volume_mapping']),
+                zone_replicas)
+        else:
+            replicas = [ARGUMENTS.default_data_replicas, ARGUMENTS.default_metadata_replicas,
+                        ARGUMENTS.max_data_replicas, ARGUMENTS.max_metadata_replicas]
+            if zone_replicas:
+                # Replicas can not exceed failure groups, unset defaults leave a replica after a lost node
+                replicas = get_replica_settings(len(set(each_disk['failureGroup'] for each_disk in disks_list)),
+                                                *[None if each_value is None else int(each_value)
+                                                  for each_value in replicas])
+            else:
+                replicas = [int(each_value) for each_value in replicas]
+            scale_storage = initialize_scale_storage_details(len(TF['vpc_availability_zones']),
+                                                             TF['storage_cluster_filesystem_mountpoint'],
+                                                             TF['filesystem_block_size'],
+                                                             disks_list, replicas[1], replicas[3],
+                                                             replicas[0], replicas[2])
+        # Recommend filesystem sizing from workload hints
+        if ARGUMENTS.workload_hints:
+            hints_map = read_json_file(ARGUMENTS.workload_hints)
+            # Volume sizes are not part of the ini terraform inventory and every disk
+            # holds dataAndMetadata, hence metadata requirement is not checked against capacity
+            LOGGER.info("Terraform inventory has no volume sizes, metadata capacity is not checked.")
+            for each_fs in scale_storage['scale_storage']:
+                hints = get_workload_hints(hints_map, each_fs['filesystem'])
+                if not hints.get('avg_file_size'):
+                    continue
+                settings, notes = get_fs_advice(hints, total_node_count, int(each_fs['defaultMetadataReplicas']),
+                                                metadata_capacity=None, separate_metadata=False)
+                each_fs.update(settings)
+                for each_note in notes:
+                    LOGGER.info("Filesystem %s: %s", each_fs['filesystem'], each_note)
+
+        # CES shared root on the first filesystem, export IPs balanced across protocol nodes
+        protocol_content = ""
+        if protocol_instances and scale_storage['scale_storage']:
+            scale_protocols, node_ips, unplaced_ips = get_protocol_config(
+                node_details, TF.get('ces_private_ips', []), scale_storage['scale_storage'][0]['filesystem'],
+                scale_storage['scale_storage'][0]['defaultMountPoint'],
+                get_zone_labels([each_instance['zone'] for each_instance in storage_instances + protocol_instances],
+                                TF['vpc_availability_zones']))
+            for each_group in scale_protocols['scale_ces_groups']:
+                LOGGER.info("CES group %s: %s protocol nodes, %s export IPs", each_group['group_name'],
+                            len(each_group['node_list']), len(each_group['export_ip_pool']))
+            if unplaced_ips:
+                LOGGER.warning("CES IPs without protocol node in their subnet left out: %s", ", ".join(unplaced_ips))
+            if any(not each_ips for each_ips in node_ips.values()):
+                LOGGER.warning("Protocol nodes without CES IP: %s",
+                               ", ".join(each_name for each_name, each_ips in node_ips.items() if not each_ips))
+            protocol_content = get_yaml_content({'scale_protocols': scale_protocols})
+
+        cluster_model.filesystems = [{each_key: each_value for each_key, each_value in each_fs.items()
+                                      if each_key != 'disks'} for each_fs in scale_storage['scale_storage']]
+        cluster_model.disks = [dict(each_disk, filesystem=each_fs['filesystem'])
+                               for each_fs in scale_storage['scale_storage'] for each_disk in each_fs['disks']]
+        if protocol_content:
+            cluster_model.protocols = scale_protocols
+
+        if parallel_fs_create:
+            # Filesystems are created by the concurrent play instead of the storage role
+            create_directory("%s/%s/%s" % (ARGUMENTS.install_infra_path,
+                                           "ibm-spectrum-scale-install-infra", "vars"))
+            for each_fs in scale_storage['scale_storage']:
+                each_fs['stanza'] = "%s/%s/%s/%s_nsd.stanza" % (ARGUMENTS.install_infra_path,
+                                                               "ibm-spectrum-scale-install-infra",
+                                                               "vars", each_fs['filesystem'])
+                write_to_file(each_fs['stanza'], get_nsd_stanza(each_fs['disks']))
+                # Per NSD stanza files, the play creates the NSDs it does not find by name
+                each_fs['nsd_stanza_dir'] = "%s/%s/%s/%s_nsd" % (ARGUMENTS.install_infra_path,
+                                                                "ibm-spectrum-scale-install-infra",
+                                                                "vars", each_fs['filesystem'])
+                each_fs['nsds'] = []
+                for each_disk in each_fs['disks']:
+                    each_fs['nsds'].append(get_stanza_nsd_name(each_disk))
+                    write_to_file("%s/%s.stanza" % (each_fs['nsd_stanza_dir'], each_fs['nsds'][-1]),
+                                  get_disk_stanza(each_disk))
+            scale_storage = {'scale_storage_concurrent': scale_storage['scale_storage']}
+        storage_content = get_yaml_content(scale_storage)
+        groupvar_content = groupvar_content + storage_content + protocol_content
+    write_to_file("%s/%s/%s/%s" % (ARGUMENTS.install_infra_path,
                                    "ibm-spectrum-scale-install-infra",
                                    "group_vars",
-                                   "%s_cluster_config.yaml" % cluster_type), 'a') as groupvar:
-            yaml.dump(scale_storage, groupvar, default_flow_style=False)
-        if ARGUMENTS.verbose:
-            print("group_vars content:\n%s" % yaml.dump(
-                scale_storage, default_flow_style=False))
+                                   "%s_cluster_config.yaml" % cluster_type), groupvar_content)
+
+    # Step-7.1: Acceptance benchmark from compute nodes (storage nodes if none)
+    if ARGUMENTS.benchmark_playbook:
+        mount_point = ARGUMENTS.benchmark_mount_point or \
+            next((each_fs['mount_point'] for each_fs in fs_params.values()), None) or \
+            TF.get('storage_cluster_filesystem_mountpoint')
+        clients = [each_node for each_node in node_details if each_node.node_class == "computenodegrp"] or \
+            [each_node for each_node in node_details if each_node.is_nsd]
+        if mount_point is None:
+            LOGGER.warning("No filesystem mount point known, skipping benchmark playbook.")
+        else:
+            clients = get_benchmark_clients(clients, ARGUMENTS.benchmark_clients)
+            write_to_file("%s/%s/%s_benchmark_inventory.ini" % (ARGUMENTS.install_infra_path,
+                                                                "ibm-spectrum-scale-install-infra",
+                                                                cluster_type),
+                          INVENTORY_RENDERERS["ini"](cluster_model, [each_node.name for each_node in clients]))
+            write_to_file("%s/%s/%s_benchmark_playbook.yaml" % (ARGUMENTS.install_infra_path,
+                                                                "ibm-spectrum-scale-install-infra", cluster_type),
+                          prepare_benchmark_playbook("scale_nodes", mount_point,
+                                                     os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                  "scale_benchmark.py"),
+                                                     expected="%s_%s" % (cluster_type, BENCHMARK_EXPECTED)))
+            # Terraform inventory has device paths only, volume type of the data volumes is given
+            benchmark_fs = next((each_fs for each_fs in cluster_model.filesystems or []
+                                 if each_fs['defaultMountPoint'] == mount_point), None)
+            expected = None
+            if ARGUMENTS.benchmark_volume_type and benchmark_fs:
+                expected = get_expected_performance(
+                    [ARGUMENTS.benchmark_volume_type for each_disk in cluster_model.disks or []
+                     if each_disk['filesystem'] == benchmark_fs['filesystem'] and
+                     each_disk['usage'] in ["dataOnly", "dataAndMetadata"]],
+                    benchmark_fs['defaultDataReplicas'])
+            if expected:
+                write_to_file("%s/%s/%s_%s" % (ARGUMENTS.install_infra_path, "ibm-spectrum-scale-install-infra",
+                                               cluster_type, BENCHMARK_EXPECTED), json.dumps(expected, indent=4))
+            else:
+                LOGGER.info("Volume types are not part of the ini inventory and --benchmark_volume_type "
+                            "is not set or unknown, benchmark report has no expected numbers.")
+
+    # Other inventory formats rendered from the same cluster model
+    cluster_model.cluster_config = scale_config.get('scale_cluster_config', {})
+    cluster_model.config = scale_config.get('scale_config', [])
+    for each_format in ARGUMENTS.inventory_formats:
+        if each_format != "ini":
+            write_to_file("%s/%s/%s_inventory.%s" % (ARGUMENTS.install_infra_path,
+                                                     "ibm-spectrum-scale-install-infra",
+                                                     cluster_type, each_format),
+                          INVENTORY_RENDERERS[each_format](cluster_model))
+
+    stage_time = log_stage(LOGGER, "render", stage_time)
+
+    # Step-8: Validate rendered topology before anything is written
+    if not ARGUMENTS.skip_topology_validation:
+        nodes, disks = get_ini_topology(
+            get_pending_artifact("%s/%s/%s_inventory.ini" % (ARGUMENTS.install_infra_path,
+                                                             "ibm-spectrum-scale-install-infra",
+                                                             cluster_type)),
+            yaml.safe_load(groupvar_content) or {})
+        validate_topology(nodes, disks, TF, tiebreaker_disks)
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            topology_summary = get_topology_summary(nodes, disks, TF)
+            LOGGER.debug("Topology summary: %s", json.dumps(topology_summary), extra={"summary": topology_summary})
+        stage_time = log_stage(LOGGER, "validate", stage_time, nodes=len(nodes), disks=len(disks))
+
+    # Write changed outputs (atomic rename), remove stale ones, record manifest
+    written = commit_artifacts("%s/%s/%s_%s" % (ARGUMENTS.install_infra_path, "ibm-spectrum-scale-install-infra",
+                                                cluster_type, ARTIFACT_MANIFEST))
+    log_stage(LOGGER, "write", stage_time, artifacts=len(written))
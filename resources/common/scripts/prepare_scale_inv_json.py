@@ -18,33 +18,57 @@ limitations under the License.
 
 import argparse
 import json
+import logging
 import pathlib
 import re
 import os
 import sys
+import time
+from scale_benchmark import BENCHMARK_EXPECTED, get_benchmark_clients, get_expected_performance, \
+    prepare_benchmark_playbook
+from scale_cluster_model import INVENTORY_FORMATS, INVENTORY_RENDERERS, NODE_ROLE_KEYS, ClusterModel, \
+    get_cluster_definition, get_cluster_nodes, get_gui_nodes, get_protocol_config, get_protocol_nodes, \
+    get_ssh_proxy_args
+from scale_disk_layout import apply_performance_layout, assign_nsd_servers, get_node_capacity, get_nsd_name, \
+    get_placement_policy, get_volume_size_bytes, select_tiebreaker_disks, split_by_capacity
+from scale_facts import FACT_CACHE_DIR, get_host_image, get_image_group_summary, \
+    get_image_groups, get_instance_facts, get_node_arch, get_node_os, is_scale_baked, write_fact_cache
+from scale_fs_config import get_filesystem_params
+from scale_fs_sizing import get_fs_advice, get_workload_hints
+from scale_log import CONTENT_LOGGER, LOG_FORMATS, log_stage, setup_logging
+from scale_output import ARTIFACT_MANIFEST, add_artifact, commit_artifacts, write_json_stream
+from scale_placement import get_collector_count, get_manager_count, \
+    get_perfmon_federation_details, get_quorum_count, get_tiebreaker_quorum_count, get_zone_config_details, \
+    get_zone_labels, get_zone_nodeclass, get_latency_candidates, get_worst_latency, order_instances_by_zone, \
+    promote_managers, relocate_gui_roles
+from scale_preflight import get_latency_nodes, get_preflight_nodes, prepare_latency_playbook, \
+    prepare_preflight_inventory, prepare_preflight_playbook, read_latency_matrix, read_preflight_report
+from scale_tf_reader import STREAM_THRESHOLD, load_json_stream
+from validate_scale_inventory import get_json_topology, get_topology_summary, validate_topology
 
 # Note: Don't use socket for FQDN resolution.
 
 SCALE_CLUSTER_DEFINITION_PATH = "/ibm-spectrum-scale-install-infra/vars/scale_clusterdefinition.json"  # TODO: FIX
+LOGGER = logging.getLogger("prepare_scale_inv_json")
 CLUSTER_DEFINITION_JSON = {"scale_cluster": {},
                            "scale_callhome_params": {},
-                           "node_details": [],
                            "scale_config": []}
 
 
-def read_json_file(json_path):
-    """ Read inventory as json file """
+def read_json_file(json_path, stream_threshold=STREAM_THRESHOLD):
+    """ Read inventory as json file, incrementally (bounded memory) from
+    stream_threshold bytes on
+    """
     tf_inv = {}
     try:
         with open(json_path) as json_handler:
             try:
-                tf_inv = json.load(json_handler)
+                tf_inv = load_json_stream(json_handler, stream_threshold=stream_threshold)
             except json.decoder.JSONDecodeError:
-                print("Provided terraform inventory file (%s) is not a valid "
-                      "json." % json_path)
+                LOGGER.error("Provided terraform inventory file (%s) is not a valid json.", json_path)
                 sys.exit(1)
     except OSError:
-        print("Provided terraform inventory file (%s) does not exist." % json_path)
+        LOGGER.error("Provided terraform inventory file (%s) does not exist.", json_path)
         sys.exit(1)
 
     return tf_inv
@@ -95,6 +119,12 @@ def initialize_cluster_details(scale_version, cluster_name, username,
         CLUSTER_DEFINITION_JSON['scale_cluster']['scale_jump_host_user'] = bastion_user
 
 
+def get_ssh_common_args(bastion_user, bastion_ip, bastion_key_file):
+    """ Return ansible_ssh_common_args, connects through the bastion if any """
+    ssh_args = get_ssh_proxy_args(bastion_user, bastion_ip, bastion_key_file)
+    return "'%s'" % ssh_args if ssh_args else ""
+
+
 def initialize_callhome_details():
     CLUSTER_DEFINITION_JSON['scale_callhome_params']['is_enabled'] = False
 
@@ -107,304 +137,35 @@ def initialize_scale_config_details(node_class, param_key, param_value):
                                                     "params": [{param_key: param_value}]})
 
 
-def set_node_details(fqdn, ip_address, ansible_ssh_private_key_file,
-                     node_class, user, is_quorum_node=False,
-                     is_manager_node=False, is_gui_server=False,
-                     is_collector_node=False, is_nsd_server=False,
-                     is_admin_node=True):
-    """ Initialize node details for cluster definition.
-    :args: json_data (json), fqdn (string), ip_address (string), node_class (string),
-           is_nsd_server (bool), is_quorum_node (bool),
-           is_manager_node (bool), is_collector_node (bool), is_gui_server (bool),
-           is_admin_node (bool)
-    """
-    CLUSTER_DEFINITION_JSON['node_details'].append({
-        'fqdn': fqdn,
-        'ip_address': ip_address,
-        'ansible_ssh_private_key_file': ansible_ssh_private_key_file,
-        'scale_state': 'present',
-        'is_nsd_server': is_nsd_server,
-        'is_quorum_node': is_quorum_node,
-        'is_manager_node': is_manager_node,
-        'scale_zimon_collector': is_collector_node,
-        'is_gui_server': is_gui_server,
-        'is_admin_node': is_admin_node,
-        'scale_nodeclass': node_class,
-        "os": "rhel8",  # TODO: FIX
-        "arch": "x86_64",  # TODO: FIX
-        "is_object_store": False,
-        "is_nfs": False,
-        "is_smb": False,
-        "is_hdfs": False,
-        "is_protocol_node": False,
-        "is_ems_node": False,
-        "is_callhome_node": False,
-        "is_broker_node": False,
-        "is_node_offline": False,
-        "is_node_reachable": True,
-        "is_node_excluded": False,
-        "is_mestor_node": False,
-        "scale_daemon_nodename": fqdn,
-        "upgrade_prompt": False
-    })
-
-
-def interleave_nodes_by_fg(node_details):
-    failure_groups = {}
-    zone_list = []
-    for node in node_details:
-        ip = node['private_ip']
-        zone = node['zone']
-        if zone not in failure_groups:
-            failure_groups[zone] = []
-            zone_list.append(zone)
-        failure_groups[zone].append(ip)
-
-    instances = []
-    max_len = max(len(nodes) for nodes in failure_groups.values())
-    for idx in range(max_len):
-        for zone in zone_list:
-            nodes = failure_groups[zone]
-            if idx < len(nodes):
-                instances.append(nodes[idx])
-    return instances
-
-
-def initialize_node_details(az_count, cls_type,
-                            compute_cluster_details, storage_cluster_details,
-                            storage_cluster_desc_details, quorum_count, user, key_file):
-    """ Initialize node details for cluster definition.
-    :args: az_count (int), cls_type (string), compute_cluster_details (dict),
-           storage_cluster_details (dict), storage_cluster_desc_details (dict),
-           quorum_count (int), user (string), key_file (string)
+def get_disk_entry(each_ip, each_disk, failure_group, usage):
+    """ Prepare dict of disk / NSD entry """
+    # "nsd": "nsd1",
+    # "device": "/dev/xvdf",
+    # "size": 536870912000,
+    # "failureGroup": "1",
+    # "filesystem": "FS1",
+    # "servers": "ip-10-0-3-10.ap-south-1.compute.internal",
+    # "usage": "dataAndMetadata",
+    # "pool": "system"
+    disk_entry = {
+        "nsd": get_nsd_name(each_ip, each_disk["device_name"]),
+        "filesystem": each_disk["fs_name"],
+        "device": each_disk["device_name"],
+        "failureGroup": failure_group,
+        "servers": each_ip,
+        "usage": usage,
+        "pool": each_disk["pool"]
+    }
+    if get_volume_size_bytes(each_disk):
+        disk_entry["size"] = get_volume_size_bytes(each_disk)
+    return disk_entry
+
+
+def get_disks_list(data_disk_map, desc_disk_map, nsd_layout="default", nsd_servers="owner"):
+    """ Initialize disk list.
+    :args: data_disk_map (dict), desc_disk_map (dict), nsd_layout (string),
+           nsd_servers (string)
     """
-    node_details = []
-    if cls_type == 'compute':
-        start_quorum_assign = quorum_count - 1
-        compute_instances = (interleave_nodes_by_fg(compute_cluster_details)
-                             if az_count > 1
-                             else [item["private_ip"] for item in compute_cluster_details])
-
-        for index, each_ip in enumerate(compute_instances):
-            if index <= start_quorum_assign and index <= (manager_count - 1):
-                if index == 0:
-                    set_node_details(compute_cluster_details[index]["dns"],
-                                     each_ip, key_file, "computenodegrp", user,
-                                     is_quorum_node=True, is_manager_node=True,
-                                     is_gui_server=True, is_collector_node=True,
-                                     is_nsd_server=False, is_admin_node=True)
-                elif index == 1:
-                    set_node_details(compute_cluster_details[index]["dns"], each_ip,
-                                     key_file, "computenodegrp", user,
-                                     is_quorum_node=True, is_manager_node=True,
-                                     is_gui_server=False, is_collector_node=True,
-                                     is_nsd_server=False, is_admin_node=False)
-                else:
-                    set_node_details(compute_cluster_details[index]["dns"], each_ip,
-                                     key_file, "computenodegrp", user,
-                                     is_quorum_node=True, is_manager_node=True,
-                                     is_gui_server=False, is_collector_node=False,
-                                     is_nsd_server=False, is_admin_node=False)
-            elif index <= start_quorum_assign and index > (manager_count - 1):
-                set_node_details(compute_cluster_details[index]["dns"], each_ip,
-                                 key_file, "computenodegrp", user,
-                                 is_quorum_node=True, is_manager_node=False,
-                                 is_gui_server=False, is_collector_node=False,
-                                 is_nsd_server=False, is_admin_node=False)
-            else:
-                set_node_details(compute_cluster_details[index]["dns"], each_ip,
-                                 key_file, "computenodegrp", user,
-                                 is_quorum_node=False, is_manager_node=False,
-                                 is_gui_server=False, is_collector_node=False,
-                                 is_nsd_server=False, is_admin_node=False)
-
-    elif cls_type == 'storage':
-        if az_count == 1:
-            # Storage/NSD nodes to be quorum nodes (quorum_count - 1 as index starts from 0)
-            start_quorum_assign = quorum_count - 1
-            storage_instances = [item["private_ip"]
-                                 for item in storage_cluster_details]
-            for index, each_ip in enumerate(storage_instances):
-                if index <= start_quorum_assign and index <= (manager_count - 1):
-                    if index == 0:
-                        set_node_details(storage_cluster_details[index]["dns"], each_ip,
-                                         key_file, "storagenodegrp", user,
-                                         is_quorum_node=True, is_manager_node=True,
-                                         is_gui_server=True, is_collector_node=True,
-                                         is_nsd_server=True, is_admin_node=True)
-                    elif index == 1:
-                        set_node_details(storage_cluster_details[index]["dns"], each_ip,
-                                         key_file, "storagenodegrp", user,
-                                         is_quorum_node=True, is_manager_node=True,
-                                         is_gui_server=False, is_collector_node=True,
-                                         is_nsd_server=True, is_admin_node=False)
-                    else:
-                        set_node_details(storage_cluster_details[index]["dns"], each_ip,
-                                         key_file, "storagenodegrp", user,
-                                         is_quorum_node=True, is_manager_node=False,
-                                         is_gui_server=False, is_collector_node=False,
-                                         is_nsd_server=True, is_admin_node=False)
-                elif index <= start_quorum_assign and index > (manager_count - 1):
-                    set_node_details(storage_cluster_details[index]["dns"], each_ip,
-                                     key_file, "storagenodegrp", user,
-                                     is_quorum_node=True, is_manager_node=False,
-                                     is_gui_server=False, is_collector_node=False,
-                                     is_nsd_server=True, is_admin_node=False)
-                else:
-                    set_node_details(storage_cluster_details[index]["dns"], each_ip,
-                                     key_file, "storagenodegrp", user,
-                                     is_quorum_node=False, is_manager_node=False,
-                                     is_gui_server=False, is_collector_node=False,
-                                     is_nsd_server=True, is_admin_node=False)
-        elif az_count > 1:
-            # Storage/NSD nodes to be quorum nodes (quorum_count - 2 as index starts from 0)
-            start_quorum_assign = quorum_count - 2
-            storage_desc_instances = [item["private_ip"]
-                                      for item in storage_cluster_desc_details]
-            for index, each_ip in enumerate(storage_desc_instances):
-                set_node_details(storage_cluster_desc_details[index]["dns"], each_ip,
-                                 key_file, "computedescnodegrp", user,
-                                 is_quorum_node=True, is_manager_node=False,
-                                 is_gui_server=False, is_collector_node=False,
-                                 is_nsd_server=True, is_admin_node=False)
-
-            storage_instances = interleave_nodes_by_fg(
-                storage_cluster_details)
-            for index, each_ip in enumerate(storage_instances):
-                if index <= start_quorum_assign and index <= (manager_count - 1):
-                    if index == 0:
-                        set_node_details(storage_cluster_details[index]["dns"], each_ip,
-                                         key_file, "storagenodegrp", user,
-                                         is_quorum_node=True, is_manager_node=True,
-                                         is_gui_server=True, is_collector_node=True,
-                                         is_nsd_server=True, is_admin_node=True)
-                    elif index == 1:
-                        set_node_details(storage_cluster_details[index]["dns"], each_ip,
-                                         key_file, "storagenodegrp", user,
-                                         is_quorum_node=True, is_manager_node=True,
-                                         is_gui_server=False, is_collector_node=True,
-                                         is_nsd_server=True, is_admin_node=True)
-                    else:
-                        set_node_details(storage_cluster_details[index]["dns"], each_ip,
-                                         key_file, "storagenodegrp", user,
-                                         is_quorum_node=True, is_manager_node=True,
-                                         is_gui_server=False, is_collector_node=False,
-                                         is_nsd_server=True, is_admin_node=True)
-                elif index <= start_quorum_assign and index > (manager_count - 1):
-                    set_node_details(storage_cluster_details[index]["dns"], each_ip,
-                                     key_file, "storagenodegrp", user,
-                                     is_quorum_node=True, is_manager_node=False,
-                                     is_gui_server=False, is_collector_node=False,
-                                     is_nsd_server=True, is_admin_node=True)
-                else:
-                    set_node_details(storage_cluster_details[index]["dns"], each_ip,
-                                     key_file, "storagenodegrp", user,
-                                     is_quorum_node=False, is_manager_node=False,
-                                     is_gui_server=False, is_collector_node=False,
-                                     is_nsd_server=True, is_admin_node=False)
-
-    elif cls_type == 'combined':
-        storage_desc_instances = [item["private_ip"]
-                                  for item in storage_cluster_desc_details]
-        for index, each_ip in enumerate(storage_desc_instances):
-            set_node_details(storage_cluster_desc_details[index]["dns"], each_ip,
-                             key_file, "computedescnodegrp", user,
-                             is_quorum_node=True, is_manager_node=False,
-                             is_gui_server=False, is_collector_node=False,
-                             is_nsd_server=True, is_admin_node=False)
-
-        if az_count > 1:
-            # Storage/NSD nodes to be quorum nodes (quorum_count - 2 as index starts from 0)
-            start_quorum_assign = quorum_count - 2
-            storage_instances = interleave_nodes_by_fg(storage_cluster_details)
-        else:
-            # Storage/NSD nodes to be quorum nodes (quorum_count - 1 as index starts from 0)
-            start_quorum_assign = quorum_count - 1
-            storage_instances = [item["private_ip"]
-                                 for item in storage_cluster_details]
-
-        for index, each_ip in enumerate(storage_instances):
-            if index <= start_quorum_assign and index <= (manager_count - 1):
-                if index == 0:
-                    set_node_details(storage_cluster_details[index]["dns"], each_ip,
-                                     key_file, "storagenodegrp", user,
-                                     is_quorum_node=True, is_manager_node=True,
-                                     is_gui_server=True, is_collector_node=True,
-                                     is_nsd_server=True, is_admin_node=True)
-                elif index == 1:
-                    set_node_details(storage_cluster_details[index]["dns"], each_ip,
-                                     key_file, "storagenodegrp", user,
-                                     is_quorum_node=True, is_manager_node=True,
-                                     is_gui_server=False, is_collector_node=True,
-                                     is_nsd_server=True, is_admin_node=True)
-                else:
-                    set_node_details(storage_cluster_details[index]["dns"], each_ip,
-                                     key_file, "storagenodegrp", user,
-                                     is_quorum_node=True, is_manager_node=True,
-                                     is_gui_server=False, is_collector_node=False,
-                                     is_nsd_server=True, is_admin_node=True)
-            elif index <= start_quorum_assign and index > (manager_count - 1):
-                set_node_details(storage_cluster_details[index]["dns"], each_ip,
-                                 key_file, "storagenodegrp", user,
-                                 is_quorum_node=True, is_manager_node=False,
-                                 is_gui_server=False, is_collector_node=False,
-                                 is_nsd_server=True, is_admin_node=True)
-            else:
-                set_node_details(storage_cluster_details[index]["dns"], each_ip,
-                                 key_file, "storagenodegrp", user,
-                                 is_quorum_node=False, is_manager_node=False,
-                                 is_gui_server=False, is_collector_node=False,
-                                 is_nsd_server=True, is_admin_node=False)
-
-        if az_count > 1:
-            if len([item["private_ip"] for item in storage_cluster_details]) - len([item["private_ip"] for item in storage_cluster_desc_details]) >= quorum_count:
-                quorums_left = 0
-            else:
-                quorums_left = quorum_count - \
-                    len([item["private_ip"] for item in storage_cluster_details]) - \
-                    len([item["private_ip"]
-                        for item in storage_cluster_desc_details])
-        else:
-            if len([item["private_ip"] for item in storage_cluster_details]) > quorum_count:
-                quorums_left = 0
-            else:
-                quorums_left = quorum_count - \
-                    len([item["private_ip"]
-                        for item in storage_cluster_details])
-
-        # Additional quorums assign to compute nodes
-        if quorums_left > 0:
-            compute_instances = interleave_nodes_by_fg(compute_cluster_details)
-            for each_instance in compute_instances[0:quorums_left]:
-                set_node_details(each_instance["dns"], each_instance["private_ip"],
-                                 key_file, "computenodegrp", user,
-                                 is_quorum_node=True, is_manager_node=False,
-                                 is_gui_server=False, is_collector_node=False,
-                                 is_nsd_server=False, is_admin_node=True)
-
-            for each_instance in compute_instances[quorums_left:]:
-                set_node_details(each_instance["dns"], each_instance["private_ip"],
-                                 key_file, "computenodegrp", user,
-                                 is_quorum_node=False, is_manager_node=False,
-                                 is_gui_server=False, is_collector_node=False,
-                                 is_nsd_server=False, is_admin_node=False)
-
-        if quorums_left == 0:
-            compute_instances = (interleave_nodes_by_fg(compute_cluster_details)
-                                 if az_count > 1
-                                 else [item["private_ip"] for item in compute_cluster_details])
-
-            for index, each_ip in enumerate(compute_instances):
-                set_node_details(compute_cluster_details[index]["dns"], each_ip,
-                                 key_file, "computenodegrp", user,
-                                 is_quorum_node=False, is_manager_node=False,
-                                 is_gui_server=False, is_collector_node=False,
-                                 is_nsd_server=False, is_admin_node=False)
-    return node_details
-
-
-def get_disks_list(data_disk_map, desc_disk_map):
-    """ Initialize disk list. """
 
     zones_ip_map = {}
     # Map zones to failure groups
@@ -416,10 +177,15 @@ def get_disks_list(data_disk_map, desc_disk_map):
 
     failure_group1, failure_group2 = [], []
     zones = list(zones_ip_map.keys())
-    if len(zones) == 1:
+    node_capacity = get_node_capacity(data_disk_map)
+    if len(zones) == 1 and any(node_capacity.values()):
+        # Single AZ with known volume sizes, split by capacity
+        failure_group1, failure_group2 = split_by_capacity(zones_ip_map[zones[0]],
+                                                           node_capacity)
+    elif len(zones) == 1:
         # Single AZ, just split list equally
         num_storage_nodes = len(zones_ip_map[zones[0]])
-        print(num_storage_nodes)
+        LOGGER.debug("Single zone storage nodes: %s", num_storage_nodes)
         mid_index = num_storage_nodes//2
         failure_group1 = zones_ip_map[zones[0]][:mid_index]
         failure_group2 = zones_ip_map[zones[0]][mid_index:]
@@ -428,69 +194,53 @@ def get_disks_list(data_disk_map, desc_disk_map):
         failure_group1 = zones_ip_map[zones[0]]
         failure_group2 = zones_ip_map[zones[1]]
 
-    # Prepare dict of disks / NSD list
-    # "nsd": "nsd1",
-    # "device": "/dev/xvdf",
-    # "size": 536870912000,
-    # "failureGroup": "1",
-    # "filesystem": "FS1",
-    # "servers": "ip-10-0-3-10.ap-south-1.compute.internal",
-    # "usage": "dataAndMetadata",
-    # "pool": "system"
-
-    disks_list = []
+    disks_list, disk_types = [], {}
     for each_ip, disk_details in data_disk_map.items():
         if each_ip in failure_group1:
             for _, each_disk in disk_details["disks"].items():
-                # disks_list.append({"device": each_disk,
-                #                    "failureGroup": 1, "servers": each_ip,
-                #                    "usage": "dataAndMetadata", "pool": "system"})
-
-                # TODO: FIX Include disk "size"
-                disks_list.append({
-                    "nsd": "nsd_" + each_ip.replace(".", "_") + "_" + os.path.basename(each_disk["device_name"]),
-                    "filesystem": each_disk["fs_name"],
-                    "device": each_disk["device_name"],
-                    "failureGroup": 1,
-                    "servers": each_ip,
-                    "usage": "dataAndMetadata",
-                    "pool": each_disk["pool"]
-                })
+                disks_list.append(get_disk_entry(each_ip, each_disk, 1, "dataAndMetadata"))
 
         if each_ip in failure_group2:
             for _, each_disk in disk_details["disks"].items():
-                # disks_list.append({"device": each_disk,
-                #                    "failureGroup": 2, "servers": each_ip,
-                #                    "usage": "dataAndMetadata", "pool": "system"})
-
-                # TODO: FIX Include disk "size"
-                disks_list.append({
-                    "nsd": "nsd_" + each_ip.replace(".", "_") + "_" + os.path.basename(each_disk["device_name"]),
-                    "filesystem": each_disk["fs_name"],
-                    "device": each_disk["device_name"],
-                    "failureGroup": 2,
-                    "servers": each_ip,
-                    "usage": "dataAndMetadata",
-                    "pool": each_disk["pool"]
-                })
+                disks_list.append(get_disk_entry(each_ip, each_disk, 2, "dataAndMetadata"))
+
+        for _, each_disk in disk_details["disks"].items():
+            disk_types[get_nsd_name(each_ip, each_disk["device_name"])] = each_disk.get("type")
+
+    if nsd_layout == "performance":
+        apply_performance_layout(disks_list, disk_types)
+
+    if nsd_servers == "rotated":
+        # Backup servers need the volume attached, only multi-attach volumes qualify
+        shared_nsds = set(get_nsd_name(each_ip, each_disk["device_name"])
+                          for each_ip, disk_details in data_disk_map.items()
+                          for each_disk in disk_details["disks"].values() if each_disk.get("multi_attach"))
+        shared_count = assign_nsd_servers(disks_list, {each_ip: disk_details["zone"]
+                                                       for each_ip, disk_details in data_disk_map.items()},
+                                          shared_nsds)
+        if shared_count < len(disks_list):
+            LOGGER.warning("--nsd_servers rotated: %s of %s data disks are not multi-attach volumes, "
+                           "they keep their owner as only NSD server.",
+                           len(disks_list) - shared_count, len(disks_list))
 
     # Append "descOnly" disk details
     if len(desc_disk_map.keys()):
         for each_ip, disk_details in desc_disk_map.items():
             for _, each_disk in disk_details["disks"].items():
-                disks_list.append({
-                    "nsd": "nsd_" + each_ip.replace(".", "_") + "_" + os.path.basename(each_disk["device_name"]),
-                    "filesystem": each_disk["fs_name"],
-                    "device": each_disk["device_name"],
-                    "failureGroup": 3,
-                    "servers": each_ip,
-                    "usage": "descOnly",
-                    "pool": each_disk["pool"]
-                })
+                disks_list.append(get_disk_entry(each_ip, each_disk, 3, "descOnly"))
 
     return disks_list
 
 
+def get_placement_policies(disks_list):
+    """ Return placement policy per filesystem having dataOnly pools """
+    data_pools = {}
+    for each_disk in disks_list:
+        if each_disk["usage"] == "dataOnly":
+            data_pools.setdefault(each_disk["filesystem"], set()).add(each_disk["pool"])
+    return {fs_name: get_placement_policy(pools) for fs_name, pools in data_pools.items()}
+
+
 def initialize_scale_storage_details(fs_details):
     """ Initialize storage details."""
 
@@ -511,20 +261,19 @@ def initialize_scale_storage_details(fs_details):
 
     storage = []
     for fs_name, fs_config in fs_details.items():
-        with open(fs_config, 'r') as file:
-            fs_data = json.load(file)
-            storage.append({"filesystem": fs_name,
-                            "defaultMountPoint": fs_data["filesystem_config_params"][fs_name]["mount_point"],
-                            "blockSize": fs_data["filesystem_config_params"][fs_name]["block_size"],
-                            "defaultDataReplicas": fs_data["filesystem_config_params"][fs_name]["data_replicas"],
-                            "maxDataReplicas": fs_data["filesystem_config_params"][fs_name]["max_data_replicas"],
-                            "defaultMetadataReplicas": fs_data["filesystem_config_params"][fs_name]["metadata_replicas"],
-                            "maxMetadataReplicas": fs_data["filesystem_config_params"][fs_name]["max_metadata_replicas"],
-                            "scale_fal_enable": False,
-                            "logfileset": ".audit_log",
-                            "automaticMountOption": True,
-                            "retention": "365"
-                            })
+        fs_params = get_filesystem_params(fs_config, fs_name)
+        storage.append({"filesystem": fs_name,
+                        "defaultMountPoint": fs_params["mount_point"],
+                        "blockSize": fs_params["block_size"],
+                        "defaultDataReplicas": fs_params["data_replicas"],
+                        "maxDataReplicas": fs_params["max_data_replicas"],
+                        "defaultMetadataReplicas": fs_params["metadata_replicas"],
+                        "maxMetadataReplicas": fs_params["max_metadata_replicas"],
+                        "scale_fal_enable": False,
+                        "logfileset": ".audit_log",
+                        "automaticMountOption": True,
+                        "retention": "365"
+                        })
 
     return storage
 
@@ -535,6 +284,9 @@ if __name__ == "__main__":
                                                  'install and configuration.')
     PARSER.add_argument('--tf_inv_path', required=True,
                         help='Terraform inventory file path')
+    PARSER.add_argument('--tf_stream_threshold_mb', default=STREAM_THRESHOLD / 1024 / 1024, type=float,
+                        help='inventories of this size (MiB) and larger are read incrementally, '
+                             'smaller ones by json.load')
     PARSER.add_argument('--install_infra_path', required=True,
                         help='Spectrum Scale install infra clone parent path')
     PARSER.add_argument('--instance_private_key', required=True,
@@ -557,16 +309,102 @@ if __name__ == "__main__":
                         help='Spectrum Scale GUI password')
     PARSER.add_argument('--disk_type', help='Disk type')
     PARSER.add_argument('--enable_mrot_conf', required=True)
+    PARSER.add_argument('--nsd_layout', default='default',
+                        choices=['default', 'performance'],
+                        help='performance places metadata on the fastest volumes '
+                             'and data in a separate pool')
+    PARSER.add_argument('--nsd_servers', default='owner',
+                        choices=['owner', 'rotated'],
+                        help='rotated adds the other NSD servers of the failure group '
+                             'as backup servers of multi-attach volumes (disk multi_attach: true)')
     PARSER.add_argument('--verbose', action='store_true',
-                        help='print log messages')
+                        help='print log messages, stage timings and topology summary')
+    PARSER.add_argument('--dump_content', action='store_true',
+                        help='also log full terraform input and generated file content')
+    PARSER.add_argument('--log_format', choices=LOG_FORMATS, default="text",
+                        help='log as text or json lines')
+    PARSER.add_argument('--workload_hints',
+                        help='json file of filesystem (or "*") to workload hints (avg_file_size, '
+                             'file_count, read_ratio) used to recommend filesystem sizing')
+    PARSER.add_argument('--benchmark_playbook', action='store_true',
+                        help='writes filesystem acceptance benchmark playbook and inventory for clients')
+    PARSER.add_argument('--benchmark_clients', type=int,
+                        help='number of clients running the benchmark (default: all)')
+    PARSER.add_argument('--benchmark_mount_point',
+                        help='mount point benchmarked (default: first filesystem)')
+    PARSER.add_argument('--preflight_playbook', action='store_true',
+                        help='writes pre-flight disk read and network probe playbook and inventory '
+                             'for NSD servers')
+    PARSER.add_argument('--preflight_report',
+                        help='pre-flight report, slow volumes are left out and slow hosts are '
+                             'placed after other nodes')
+    PARSER.add_argument('--latency_probe_playbook', action='store_true',
+                        help='writes round trip time probe playbook and inventory between quorum '
+                             'candidates')
+    PARSER.add_argument('--latency_matrix',
+                        help='latency matrix json (probe output or supplied), quorum and manager '
+                             'nodes are the lowest latency set')
+    PARSER.add_argument('--image_manifest',
+                        help='json file of instance name/ip (or "*") to image details (image, '
+                             'scale_version baked in), sets scale_packages_baked per node')
+    PARSER.add_argument('--fact_cache', action='store_true',
+                        help='pre-seeds ansible jsonfile fact cache from terraform instance details')
+    PARSER.add_argument('--quorum_mode', default='node',
+                        choices=['node', 'tiebreaker'],
+                        help='tiebreaker uses up to 3 quorum nodes along with tiebreaker disks')
+    PARSER.add_argument('--zone_nodeclasses', action='store_true',
+                        help='adds nodes to zone scoped node classes (ex: storagenodegrp_us-east-1a)')
+    PARSER.add_argument('--zone_config_overrides',
+                        help='json file of zone (or "*") to scale config parameters applied '
+                             'to zone scoped node classes')
+    PARSER.add_argument('--workload_profile', default='default',
+                        choices=['default', 'metadata', 'throughput'],
+                        help='Workload hint used to scale manager node count')
+    PARSER.add_argument('--gui_placement', default='quorum',
+                        choices=['quorum', 'dedicated'],
+                        help='Place GUI/admin/collector roles on the first quorum node '
+                             'or on a non-quorum, non-manager node')
+    PARSER.add_argument('--sensors_per_collector', default=2000, type=int,
+                        help='Target perfmon sensors ingested per collector node')
+    PARSER.add_argument('--skip_topology_validation', action='store_true',
+                        help='skips generated topology invariant checks')
+    PARSER.add_argument('--inventory_formats', nargs='+', default=["json"], choices=INVENTORY_FORMATS,
+                        help='inventory formats rendered from the cluster model, json cluster '
+                             'definition is always written')
+    PARSER.add_argument('--ces_protocols', nargs='+', default=["nfs", "smb"], choices=["nfs", "smb"],
+                        help='protocols served by protocol (CES) nodes of the inventory')
 
     ARGUMENTS = PARSER.parse_args()
+    setup_logging(ARGUMENTS.verbose, ARGUMENTS.log_format, ARGUMENTS.dump_content)
+    start_time = time.time()
 
     # Step-1: Read the inventory file
-    TF = read_json_file(ARGUMENTS.tf_inv_path)
-
-    if ARGUMENTS.verbose:
-        print("Parsed terraform output: %s" % json.dumps(TF, indent=4))
+    TF = read_json_file(ARGUMENTS.tf_inv_path, int(ARGUMENTS.tf_stream_threshold_mb * 1024 * 1024))
+    if CONTENT_LOGGER.isEnabledFor(logging.DEBUG):
+        CONTENT_LOGGER.debug("Parsed terraform output: %s", json.dumps(TF))
+    stage_time = log_stage(LOGGER, "read_inventory", start_time,
+                           compute=len(TF['compute_cluster_details']),
+                           storage=len(TF['storage_cluster_details']),
+                           desc=len(TF['storage_cluster_desc_details']),
+                           volumes=sum(len(disk_details["disks"]) for disk_details in
+                                       TF['storage_cluster_with_data_volume_mapping'].values()))
+
+    # Leave pre-flight outliers out of quorum/manager placement and failure groups
+    if ARGUMENTS.preflight_report:
+        slow_hosts, slow_devices = read_preflight_report(ARGUMENTS.preflight_report)
+        for each_key in ['storage_cluster_with_data_volume_mapping', 'storage_cluster_desc_data_volume_mapping']:
+            for each_ip, disk_details in TF[each_key].items():
+                slow_disks = [each_disk for each_disk, each_details in disk_details["disks"].items()
+                              if each_details["device_name"] in slow_devices.get(each_ip, set())]
+                if slow_disks:
+                    LOGGER.info("Excluding slow volumes on %s: %s", each_ip, ", ".join(sorted(slow_disks)))
+                for each_disk in slow_disks:
+                    del disk_details["disks"][each_disk]
+        for each_key in ['compute_cluster_details', 'storage_cluster_details']:
+            for each_instance in TF[each_key]:
+                if each_instance["private_ip"] in slow_hosts:
+                    LOGGER.info("Slow host %s placed after other nodes", each_instance["private_ip"])
+                    each_instance["slow"] = True
 
     # Step-2: Identify the cluster type
     if len([item["private_ip"] for item in TF['storage_cluster_details']]) == 0 and \
@@ -634,7 +472,7 @@ if __name__ == "__main__":
             scale_config = initialize_scale_config_details(
                 "computedescnodegrp", "pagepool", pagepool_size)
 
-    print("Identified cluster type: %s" % cluster_type)
+    LOGGER.info("Identified cluster type: %s", cluster_type)
 
     # Step-3: Identify if tie breaker needs to be counted for storage
     if len(TF['vpc_availability_zones']) > 1:
@@ -646,24 +484,22 @@ if __name__ == "__main__":
         total_node_count = len([item["private_ip"] for item in TF['compute_cluster_details']]) + \
             len([item["private_ip"] for item in TF['storage_cluster_details']])
 
-    if ARGUMENTS.verbose:
-        print("Total node count: ", total_node_count)
+    LOGGER.debug("Total node count: %s", total_node_count)
 
     # Determine total number of quorum, manager nodes to be in the cluster
     # manager designates the node as part of the pool of nodes from which
     # file system managers and token managers are selected.
-    quorum_count, manager_count = 0, 2
-    if total_node_count < 4:
-        quorum_count = total_node_count
-    elif 4 <= total_node_count < 10:
-        quorum_count = 3
-    elif 10 <= total_node_count < 19:
-        quorum_count = 5
+    # Tiebreaker disks need NSDs, compute only cluster keeps node quorum
+    use_tiebreaker = ARGUMENTS.quorum_mode == "tiebreaker" and cluster_type in ['storage', 'combined']
+    if use_tiebreaker:
+        quorum_count = get_tiebreaker_quorum_count(total_node_count)
     else:
-        quorum_count = 7
+        quorum_count = get_quorum_count(total_node_count)
+    manager_count = get_manager_count(total_node_count, ARGUMENTS.workload_profile)
+    collector_count = get_collector_count(total_node_count, ARGUMENTS.sensors_per_collector)
 
-    if ARGUMENTS.verbose:
-        print("Total quorum count: ", quorum_count)
+    LOGGER.debug("Total quorum count: %s, manager count: %s, collector count: %s",
+                 quorum_count, manager_count, collector_count)
 
     # Define cluster details
     if TF['resource_prefix']:
@@ -684,43 +520,263 @@ if __name__ == "__main__":
     initialize_callhome_details()
 
     # Step-5: Create hosts
-    initialize_node_details(len(TF['vpc_availability_zones']), cluster_type,
-                            TF['compute_cluster_details'],
-                            TF['storage_cluster_details'],
-                            TF['storage_cluster_desc_details'],
-                            quorum_count, "root", ARGUMENTS.instance_private_key)
-
+    compute_instances = order_instances_by_zone(TF['compute_cluster_details'])
+    storage_instances = order_instances_by_zone(TF['storage_cluster_details'])
+    latency_matrix = read_latency_matrix(ARGUMENTS.latency_matrix) if ARGUMENTS.latency_matrix else None
+    node_details = get_cluster_nodes(len(TF['vpc_availability_zones']), cluster_type,
+                                     compute_instances, storage_instances, TF['storage_cluster_desc_details'],
+                                     quorum_count, manager_count, collector_count, latency_matrix)
+    if latency_matrix:
+        quorum_latency = get_worst_latency(latency_matrix, [each_node.ip for each_node in node_details
+                                                            if each_node.is_quorum])
+        if quorum_latency is None:
+            LOGGER.warning("Latency matrix does not cover all quorum nodes, placement order kept.")
+        else:
+            LOGGER.info("Quorum worst round trip time: %.3f ms", quorum_latency[0])
+
+    # Small tiebreaker quorum, take remaining managers from non-quorum nodes
+    if use_tiebreaker:
+        promote_managers(node_details, NODE_ROLE_KEYS, manager_count)
+
+    # Place GUI/admin/collector roles off the quorum managers
+    dedicated_gui_nodes = get_gui_nodes(TF.get('gui_cluster_details', []))
+    node_details.extend(dedicated_gui_nodes)
+    if ARGUMENTS.gui_placement == "dedicated" or dedicated_gui_nodes:
+        if relocate_gui_roles(node_details, NODE_ROLE_KEYS, dedicated_gui_nodes) is None:
+            LOGGER.warning("No non-quorum, non-manager node available, GUI stays on quorum node.")
+    # CES protocol nodes of storage cluster, spread across zones
+    if cluster_type in ['storage', 'combined']:
+        node_details.extend(get_protocol_nodes(order_instances_by_zone(TF.get('protocol_cluster_details', [])),
+                                               ARGUMENTS.ces_protocols))
+    # Cluster definition keeps fully qualified daemon node names
+    for each_node in node_details:
+        each_node.daemon_nodename = each_node.name
+    stage_time = log_stage(LOGGER, "hosts", stage_time, nodes=len(node_details))
+
+    # Pre-flight disk and network probes of NSD servers
+    if ARGUMENTS.preflight_playbook and cluster_type in ['storage', 'combined']:
+        host_names, disk_map = {}, {}
+        for each_key in ['storage_cluster_details', 'storage_cluster_desc_details']:
+            for each_instance in TF[each_key]:
+                host_names[each_instance['private_ip']] = each_instance['dns']
+        for each_key in ['storage_cluster_with_data_volume_mapping', 'storage_cluster_desc_data_volume_mapping']:
+            for each_ip, disk_details in TF[each_key].items():
+                disk_map[each_ip] = [(each_details["device_name"], each_details.get("type"))
+                                     for each_details in disk_details["disks"].values()]
+        ssh_common_args = get_ssh_common_args(ARGUMENTS.bastion_user, ARGUMENTS.bastion_ip,
+                                              ARGUMENTS.bastion_ssh_private_key)
+        preflight_path = "%s/%s" % (ARGUMENTS.install_infra_path.rstrip('/'), "ibm-spectrum-scale-install-infra")
+        add_artifact("%s/preflight_inventory.ini" % preflight_path,
+                     prepare_preflight_inventory(host_names, "root", ARGUMENTS.instance_private_key,
+                                                 ssh_common_args))
+        add_artifact("%s/preflight_playbook.yaml" % preflight_path,
+                     prepare_preflight_playbook("scale_nodes", get_preflight_nodes(host_names, disk_map),
+                                                os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                             "scale_preflight.py")))
+
+    # Round trip time probes between quorum candidates
+    if ARGUMENTS.latency_probe_playbook:
+        latency_candidates = get_latency_candidates(storage_instances if cluster_type in ['storage', 'combined']
+                                                    else compute_instances)
+        if cluster_type != 'compute':
+            latency_candidates = latency_candidates + TF['storage_cluster_desc_details']
+        host_names = {each_instance['private_ip']: each_instance['dns'] for each_instance in latency_candidates}
+        latency_path = "%s/%s" % (ARGUMENTS.install_infra_path.rstrip('/'), "ibm-spectrum-scale-install-infra")
+        add_artifact("%s/latency_inventory.ini" % latency_path,
+                     prepare_preflight_inventory(host_names, "root", ARGUMENTS.instance_private_key,
+                                                 get_ssh_common_args(ARGUMENTS.bastion_user, ARGUMENTS.bastion_ip,
+                                                                     ARGUMENTS.bastion_ssh_private_key)))
+        add_artifact("%s/latency_playbook.yaml" % latency_path,
+                     prepare_latency_playbook("scale_nodes", get_latency_nodes(host_names),
+                                              os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                           "scale_preflight.py")))
+
+    # OS and architecture from terraform instance details
+    instances = {}
+    for each_key in ['compute_cluster_details', 'storage_cluster_details',
+                     'storage_cluster_desc_details', 'gui_cluster_details', 'protocol_cluster_details']:
+        for each_instance in TF.get(each_key, []):
+            instances[each_instance['private_ip']] = each_instance
+    for each_node in node_details:
+        each_node.os = get_node_os(instances.get(each_node.ip, {}))
+        each_node.arch = get_node_arch(instances.get(each_node.ip, {}))
+
+    # Hosts from images with baked Scale packages skip install roles
+    if ARGUMENTS.image_manifest:
+        image_manifest = read_json_file(ARGUMENTS.image_manifest)
+        host_images = {each_node.name: get_host_image(image_manifest, [each_node.name, each_node.ip])
+                       for each_node in node_details}
+        for baked_version, hosts in sorted(get_image_groups(host_images, TF['scale_version']).items()):
+            LOGGER.info(get_image_group_summary(baked_version, len(hosts), TF['scale_version']))
+        for each_node in node_details:
+            each_node.packages_baked = is_scale_baked(host_images[each_node.name], TF['scale_version'])
+
+    # Pre-seed ansible fact cache, nodes then gather only a minimal subset
+    if ARGUMENTS.fact_cache:
+        write_fact_cache("%s/%s/%s" % (ARGUMENTS.install_infra_path.rstrip('/'),
+                                       "ibm-spectrum-scale-install-infra", FACT_CACHE_DIR),
+                         {each_node.name: get_instance_facts(instances.get(each_node.ip, {}))
+                          for each_node in node_details})
+
+    if cluster_type in ['compute', 'storage']:
+        for each_node in node_details:
+            if each_node.is_gui:
+                add_artifact("%s/%s_cluster_gui_details.json" % (str(pathlib.PurePath(ARGUMENTS.tf_inv_path).parent),
+                                                                 cluster_type),
+                             json.dumps({'%s_cluster_gui_ip_address' % cluster_type: each_node.ip},
+                                        indent=4))
+
+    # Add nodes to zone scoped node classes with zone overrides
+    if ARGUMENTS.zone_nodeclasses:
+        node_zones = {}
+        for each_key in ['compute_cluster_details', 'storage_cluster_details', 'storage_cluster_desc_details',
+                         'protocol_cluster_details']:
+            for each_instance in TF.get(each_key, []):
+                node_zones[each_instance['private_ip']] = each_instance.get('zone')
+        zone_labels = get_zone_labels(list(node_zones.values()), TF['vpc_availability_zones'])
+        zone_classes = {}
+        for each_node in node_details:
+            if each_node.ip in node_zones and node_zones[each_node.ip] in zone_labels:
+                zone = zone_labels[node_zones[each_node.ip]]
+                each_node.zone_class = get_zone_nodeclass(each_node.node_class, zone)
+                zone_classes[each_node.zone_class] = zone
+        zone_overrides = read_json_file(ARGUMENTS.zone_config_overrides) \
+            if ARGUMENTS.zone_config_overrides else {}
+        CLUSTER_DEFINITION_JSON['scale_config'].extend(get_zone_config_details(zone_classes, zone_overrides))
+
+    CLUSTER_DEFINITION_JSON['scale_cluster'].update(get_perfmon_federation_details(
+        [each_node.name for each_node in node_details if each_node.is_collector]))
+
+    tiebreaker_disks = []
     if cluster_type in ['storage', 'combined']:
         disks_list = get_disks_list(TF['storage_cluster_with_data_volume_mapping'],
-                                    TF['storage_cluster_desc_data_volume_mapping'])
+                                    TF['storage_cluster_desc_data_volume_mapping'],
+                                    ARGUMENTS.nsd_layout,
+                                    ARGUMENTS.nsd_servers)
         scale_storage = initialize_scale_storage_details(
             TF['filesystem_details'])
 
+        # Write placement policy for filesystems with separate data pool
+        for fs_name, fs_policy in get_placement_policies(disks_list).items():
+            policy_path = "%s/%s/vars/%s_placement.policy" % (ARGUMENTS.install_infra_path.rstrip('/'),
+                                                             "ibm-spectrum-scale-install-infra", fs_name)
+            add_artifact(policy_path, fs_policy)
+            for each_fs in scale_storage:
+                if each_fs["filesystem"] == fs_name:
+                    each_fs["placementPolicyFile"] = policy_path
+
+        # Recommend filesystem sizing from workload hints
+        if ARGUMENTS.workload_hints:
+            hints_map = read_json_file(ARGUMENTS.workload_hints)
+            for each_fs in scale_storage:
+                hints = get_workload_hints(hints_map, each_fs["filesystem"])
+                if not hints.get("avg_file_size"):
+                    continue
+                fs_disks = [each_disk for each_disk in disks_list
+                            if each_disk["filesystem"] == each_fs["filesystem"]]
+                settings, notes = get_fs_advice(hints, total_node_count, int(each_fs["defaultMetadataReplicas"]),
+                                                sum(each_disk.get("size", 0) for each_disk in fs_disks
+                                                    if each_disk["usage"] in ["metadataOnly", "dataAndMetadata"]),
+                                                any(each_disk["usage"] == "metadataOnly" for each_disk in fs_disks))
+                each_fs.update(settings)
+                for each_note in notes:
+                    LOGGER.info("Filesystem %s: %s", each_fs["filesystem"], each_note)
+
+        if use_tiebreaker:
+            tiebreaker_disks = select_tiebreaker_disks(disks_list)
+            CLUSTER_DEFINITION_JSON['scale_cluster']['tiebreaker_disks'] = ";".join(tiebreaker_disks)
+
         CLUSTER_DEFINITION_JSON.update({"scale_filesystem": scale_storage})
         CLUSTER_DEFINITION_JSON.update({"scale_disks": disks_list})
 
-    if ARGUMENTS.verbose:
-        print("Content of scale_clusterdefinition.json: ",
-              json.dumps(CLUSTER_DEFINITION_JSON, indent=4))
-
-    # Write json content
-    if ARGUMENTS.verbose:
-        print("Writing cloud infrastructure details to: ",
-              ARGUMENTS.install_infra_path.rstrip('/') + SCALE_CLUSTER_DEFINITION_PATH)
-
-    # Remove cluster definition file if it already exists
-    if os.path.exists(ARGUMENTS.install_infra_path.rstrip('/') + SCALE_CLUSTER_DEFINITION_PATH):
-        os.remove(ARGUMENTS.install_infra_path.rstrip(
-            '/') + SCALE_CLUSTER_DEFINITION_PATH)
-
-    # Create vars directory if missing
-    if not os.path.exists(ARGUMENTS.install_infra_path.rstrip('/') + SCALE_CLUSTER_DEFINITION_PATH):
-        os.makedirs(os.path.dirname(ARGUMENTS.install_infra_path.rstrip(
-            '/') + SCALE_CLUSTER_DEFINITION_PATH), exist_ok=True)
-
-    with open(ARGUMENTS.install_infra_path.rstrip('/') + SCALE_CLUSTER_DEFINITION_PATH, 'w') as json_fh:
-        json.dump(CLUSTER_DEFINITION_JSON, json_fh, indent=4)
-
-    if ARGUMENTS.verbose:
-        print("Completed writing cloud infrastructure details to: ",
-              ARGUMENTS.install_infra_path.rstrip('/') + SCALE_CLUSTER_DEFINITION_PATH)
+        # CES shared root on the first filesystem, export IPs balanced across protocol nodes
+        if any(each_node.protocols for each_node in node_details) and scale_storage:
+            scale_protocols, node_ips, unplaced_ips = get_protocol_config(
+                node_details, TF.get('ces_private_ips', []), scale_storage[0]["filesystem"],
+                scale_storage[0]["defaultMountPoint"])
+            for each_group in scale_protocols["scale_ces_groups"]:
+                LOGGER.info("CES group %s: %s protocol nodes, %s export IPs", each_group["group_name"],
+                            len(each_group["node_list"]), len(each_group["export_ip_pool"]))
+            if unplaced_ips:
+                LOGGER.warning("CES IPs without protocol node in their subnet left out: %s", ", ".join(unplaced_ips))
+            if any(not each_ips for each_ips in node_ips.values()):
+                LOGGER.warning("Protocol nodes without CES IP: %s",
+                               ", ".join(each_name for each_name, each_ips in node_ips.items() if not each_ips))
+            CLUSTER_DEFINITION_JSON.update({"scale_protocols": scale_protocols})
+
+    # Acceptance benchmark from compute nodes (storage nodes if none)
+    if ARGUMENTS.benchmark_playbook:
+        mount_point = ARGUMENTS.benchmark_mount_point or \
+            next((each_fs["defaultMountPoint"] for each_fs in CLUSTER_DEFINITION_JSON.get("scale_filesystem", [])),
+                 None)
+        clients = [each_node for each_node in node_details if each_node.node_class == "computenodegrp"] or \
+            [each_node for each_node in node_details if each_node.is_nsd]
+        if mount_point is None:
+            LOGGER.warning("No filesystem mount point known, skipping benchmark playbook.")
+        else:
+            benchmark_path = "%s/%s" % (ARGUMENTS.install_infra_path.rstrip('/'), "ibm-spectrum-scale-install-infra")
+            clients = get_benchmark_clients(clients, ARGUMENTS.benchmark_clients)
+            add_artifact("%s/benchmark_inventory.ini" % benchmark_path,
+                         prepare_preflight_inventory(
+                             {each_node.ip: each_node.name for each_node in clients}, "root",
+                             ARGUMENTS.instance_private_key,
+                             get_ssh_common_args(ARGUMENTS.bastion_user, ARGUMENTS.bastion_ip,
+                                                 ARGUMENTS.bastion_ssh_private_key)))
+            add_artifact("%s/benchmark_playbook.yaml" % benchmark_path,
+                         prepare_benchmark_playbook("scale_nodes", mount_point,
+                                                    os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                 "scale_benchmark.py")))
+            # Expected performance of the benchmarked filesystem data volumes
+            fs_name = next((each_fs["filesystem"] for each_fs in CLUSTER_DEFINITION_JSON.get("scale_filesystem", [])
+                            if each_fs["defaultMountPoint"] == mount_point), None)
+            volume_types = {}
+            for each_key in ['storage_cluster_with_data_volume_mapping', 'storage_cluster_desc_data_volume_mapping']:
+                for each_ip, disk_details in TF.get(each_key, {}).items():
+                    for each_details in disk_details["disks"].values():
+                        volume_types[(each_ip, each_details["device_name"])] = each_details.get("type")
+            expected = get_expected_performance(
+                [volume_types.get((each_disk["servers"].split(",")[0], each_disk["device"]))
+                 for each_disk in CLUSTER_DEFINITION_JSON.get("scale_disks", [])
+                 if each_disk["filesystem"] == fs_name and each_disk["usage"] in ["dataOnly", "dataAndMetadata"]],
+                next((each_fs["defaultDataReplicas"] for each_fs in CLUSTER_DEFINITION_JSON.get("scale_filesystem", [])
+                      if each_fs["filesystem"] == fs_name), 1))
+            if expected:
+                add_artifact("%s/%s" % (benchmark_path, BENCHMARK_EXPECTED), json.dumps(expected, indent=4))
+            else:
+                LOGGER.info("Volume types unknown, benchmark report has no expected numbers.")
+
+    # Write json content, other inventory formats rendered from the same cluster model
+    cluster_model = ClusterModel(cluster_type, node_details, CLUSTER_DEFINITION_JSON['scale_cluster'], "root",
+                                 ARGUMENTS.instance_private_key,
+                                 get_ssh_proxy_args(ARGUMENTS.bastion_user, ARGUMENTS.bastion_ip,
+                                                    ARGUMENTS.bastion_ssh_private_key))
+    cluster_model.config = CLUSTER_DEFINITION_JSON['scale_config']
+    cluster_model.callhome_params = CLUSTER_DEFINITION_JSON['scale_callhome_params']
+    cluster_model.filesystems = CLUSTER_DEFINITION_JSON.get('scale_filesystem')
+    cluster_model.disks = CLUSTER_DEFINITION_JSON.get('scale_disks')
+    cluster_model.protocols = CLUSTER_DEFINITION_JSON.get('scale_protocols')
+    for each_format in ARGUMENTS.inventory_formats:
+        if each_format != "json":
+            add_artifact("%s/%s/scale_inventory.%s" % (ARGUMENTS.install_infra_path.rstrip('/'),
+                                                       "ibm-spectrum-scale-install-infra", each_format),
+                         INVENTORY_RENDERERS[each_format](cluster_model))
+    stage_time = log_stage(LOGGER, "render", stage_time)
+
+    # Validate rendered topology before anything is written
+    if not ARGUMENTS.skip_topology_validation:
+        nodes, disks = get_json_topology(get_cluster_definition(cluster_model))
+        validate_topology(nodes, disks, TF, tiebreaker_disks)
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            topology_summary = get_topology_summary(nodes, disks, TF)
+            LOGGER.debug("Topology summary: %s", json.dumps(topology_summary), extra={"summary": topology_summary})
+        stage_time = log_stage(LOGGER, "validate", stage_time, nodes=len(nodes), disks=len(disks))
+
+    # Cluster definition is streamed to a temp file, then renamed if changed
+    add_artifact(ARGUMENTS.install_infra_path.rstrip('/') + SCALE_CLUSTER_DEFINITION_PATH,
+                 writer=lambda json_path: write_json_stream(json_path, get_cluster_definition(cluster_model)))
+    written = commit_artifacts(os.path.join(os.path.dirname(ARGUMENTS.install_infra_path.rstrip('/') +
+                                                            SCALE_CLUSTER_DEFINITION_PATH), ARTIFACT_MANIFEST))
+    if CONTENT_LOGGER.isEnabledFor(logging.DEBUG):
+        with open(ARGUMENTS.install_infra_path.rstrip('/') + SCALE_CLUSTER_DEFINITION_PATH) as json_fh:
+            CONTENT_LOGGER.debug("Content of scale_clusterdefinition.json: %s", json_fh.read())
+    log_stage(LOGGER, "write", stage_time, artifacts=len(written))
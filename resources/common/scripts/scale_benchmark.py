@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright IBM Corporation 2018
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import argparse
+import glob
+import json
+import os
+import statistics
+import time
+
+# Baseline throughput (MB/s) and IOPS per volume of the volume type.
+VOLUME_TYPE_PERFORMANCE = {"nvme": (2000, 200000), "local-ssd": (700, 170000),
+                           "UltraSSD_LRS": (2000, 160000), "io2": (1000, 64000), "io1": (1000, 64000),
+                           "pd-extreme": (2400, 120000), "gp3": (125, 3000), "Premium_LRS": (200, 5000),
+                           "pd-ssd": (480, 30000), "gp2": (250, 3000), "pd-balanced": (240, 6000),
+                           "StandardSSD_LRS": (100, 500), "st1": (500, 500), "pd-standard": (120, 750),
+                           "Standard_LRS": (60, 500), "sc1": (250, 250)}
+# Workloads run on every client (fio job name, rw mode, block size, size per job, jobs, iodepth)
+FIO_WORKLOADS = [("seq_write", "seq", "write", "4M", "1G", 4, 4),
+                 ("seq_read", "seq", "read", "4M", "1G", 4, 4),
+                 ("rand_write", "rand", "randwrite", "4k", "256M", 4, 16),
+                 ("rand_read", "rand", "randread", "4k", "256M", 4, 16)]
+FIO_RUNTIME = 60
+METADATA_FILE_COUNT = 2000
+# Measured results below this fraction of the expected value are flagged
+EXPECTED_THRESHOLD = 0.7
+BENCHMARK_RESULTS_DIR = "benchmark"
+BENCHMARK_REPORT = "benchmark_report.json"
+BENCHMARK_EXPECTED = "benchmark_expected.json"
+
+
+def get_expected_performance(volume_types, data_replicas):
+    """ Estimate cluster throughput and IOPS from the data volumes.
+    Reads are served by every volume, writes are divided by data replicas.
+    NSD server and client network limits are not included, the estimate is
+    the volume bound upper limit.
+    :args: volume_types (list of volume type per data volume), data_replicas (int)
+    :return: expected (dict) or None if a volume type is unknown
+    """
+    if not volume_types or any(each_type not in VOLUME_TYPE_PERFORMANCE for each_type in volume_types):
+        return None
+    read_mbps = sum(VOLUME_TYPE_PERFORMANCE[each_type][0] for each_type in volume_types)
+    iops = sum(VOLUME_TYPE_PERFORMANCE[each_type][1] for each_type in volume_types)
+    data_replicas = max(int(data_replicas), 1)
+    return {"seq_read": {"mbps": read_mbps}, "seq_write": {"mbps": read_mbps / data_replicas},
+            "rand_read": {"iops": iops}, "rand_write": {"iops": iops / data_replicas}}
+
+
+def get_benchmark_clients(clients, sample_count=None):
+    """ Return benchmark clients, a sample keeps the placement order.
+    :args: clients (list of ClusterNode, zone interleaved), sample_count (int)
+    """
+    return clients[:sample_count] if sample_count else clients
+
+
+def get_fio_command(directory, workload):
+    """ Return fio command line of the workload """
+    _, job_name, rw_mode, block_size, size, jobs, iodepth = workload
+    return "fio --name=%s --directory=%s --rw=%s --bs=%s --size=%s --numjobs=%s --iodepth=%s " \
+        "--ioengine=libaio --direct=1 --runtime=%s --group_reporting --output-format=json" % (
+            job_name, directory, rw_mode, block_size, size, jobs, iodepth, FIO_RUNTIME)
+
+
+def prepare_benchmark_playbook(hosts_config, mount_point, benchmark_script,
+                               file_count=METADATA_FILE_COUNT, expected=BENCHMARK_EXPECTED):
+    """ Write to playbook, coordinated benchmark from all clients """
+    directory = "%s/.scale_benchmark/{{ inventory_hostname }}" % mount_point.rstrip('/')
+    fio_tasks = ""
+    for workload in FIO_WORKLOADS:
+        fio_tasks = fio_tasks + """
+  - name: Run {name} workload
+    shell: {command}
+    register: {name}
+""".format(name=workload[0], command=get_fio_command(directory, workload))
+    results = ", ".join("'%s': %s.stdout | from_json" % (workload[0], workload[0]) for workload in FIO_WORKLOADS)
+
+    content = """---
+# Acceptance benchmark: every workload runs from all clients at the same
+# time (one task per workload), results are aggregated on the controller.
+# Ansible runs a task on --forks hosts at a time (default 5), run with
+# --forks of at least the client count so the clients load the filesystem together.
+- name: Filesystem benchmark
+  hosts: {hosts_config}
+  gather_facts: false
+  any_errors_fatal: true
+  tasks:
+  - name: Check every client runs a workload at the same time
+    assert:
+      that: ansible_forks | int >= ansible_play_hosts_all | length
+      fail_msg: "Run the benchmark with --forks {{{{ ansible_play_hosts_all | length }}}} or more"
+    run_once: true
+
+  - name: Create benchmark results directory
+    file:
+      path: "{{{{ playbook_dir }}}}/{results_dir}"
+      state: directory
+    delegate_to: localhost
+    run_once: true
+
+  - name: Create benchmark directory
+    file:
+      path: {directory}
+      state: directory
+{fio_tasks}
+  - name: Run metadata workload
+    script: {benchmark_script} --metadata_dir {directory}/md --file_count {file_count}
+    args:
+      executable: python3
+    register: metadata
+
+  - name: Remove benchmark directory
+    file:
+      path: {directory}
+      state: absent
+
+  - name: Save benchmark results
+    copy:
+      content: "{{{{ {{'host': inventory_hostname, {results}, 'metadata': metadata.stdout | from_json}} | to_json }}}}"
+      dest: "{{{{ playbook_dir }}}}/{results_dir}/{{{{ inventory_hostname }}}}.json"
+    delegate_to: localhost
+
+- name: Benchmark report
+  hosts: localhost
+  gather_facts: false
+  connection: local
+  tasks:
+  - name: Aggregate benchmark results
+    command: python3 {benchmark_script} --results_dir {{{{ playbook_dir }}}}/{results_dir} --report_path {{{{ playbook_dir }}}}/{report} --expected_path {{{{ playbook_dir }}}}/{expected}
+    register: benchmark_report
+
+  - name: Show benchmark report
+    debug:
+      var: benchmark_report.stdout_lines
+""".format(hosts_config=hosts_config, directory=directory, fio_tasks=fio_tasks, results=results,
+           benchmark_script=benchmark_script, file_count=file_count, results_dir=BENCHMARK_RESULTS_DIR,
+           report=BENCHMARK_REPORT, expected=expected)
+    return content
+
+
+def get_percentile(values, percent):
+    """ Return percentile (nearest rank) of the values """
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100.0))] if ordered else None
+
+
+def run_metadata_workload(metadata_dir, file_count):
+    """ Create, stat and delete file_count files, return ops/s and latency (ms) per operation """
+    os.makedirs(metadata_dir, exist_ok=True)
+    paths = [os.path.join(metadata_dir, "f%s" % idx) for idx in range(file_count)]
+    operations = [("create", lambda path: os.close(os.open(path, os.O_CREAT | os.O_WRONLY, 0o644))),
+                  ("stat", os.stat), ("delete", os.unlink)]
+    result = {}
+    for op_name, operation in operations:
+        latencies = []
+        start = time.time()
+        for each_path in paths:
+            op_start = time.time()
+            operation(each_path)
+            latencies.append((time.time() - op_start) * 1000)
+        elapsed = time.time() - start
+        result[op_name] = {"ops": file_count / elapsed if elapsed else None,
+                           "p50_ms": get_percentile(latencies, 50), "p99_ms": get_percentile(latencies, 99)}
+    os.rmdir(metadata_dir)
+    return result
+
+
+def get_fio_summary(fio_result):
+    """ Return throughput (MB/s), IOPS and latency percentiles (ms) of a fio json result """
+    job = fio_result["jobs"][0]
+    direction = job["read"] if job["read"]["io_bytes"] else job["write"]
+    percentiles = direction.get("clat_ns", {}).get("percentile", {})
+    return {"mbps": direction["bw"] * 1024 / 1000000.0, "iops": direction["iops"],
+            "p50_ms": percentiles.get("50.000000", 0) / 1000000.0,
+            "p99_ms": percentiles.get("99.000000", 0) / 1000000.0}
+
+
+def build_benchmark_report(results, expected=None, threshold=EXPECTED_THRESHOLD):
+    """ Aggregate per client results into cluster wide results.
+    Throughput, IOPS and metadata ops/s are summed across clients. Raw
+    latency samples are not available, cluster p50 is the median of the
+    client p50 and cluster p99 the worst client p99.
+    :args: results (list of per client results), expected (dict), threshold (float)
+    :return: report (dict)
+    """
+    clients = {}
+    for each_result in results:
+        clients[each_result["host"]] = {workload[0]: get_fio_summary(each_result[workload[0]])
+                                        for workload in FIO_WORKLOADS}
+        clients[each_result["host"]].update(each_result["metadata"])
+
+    cluster = {}
+    workload_names = [workload[0] for workload in FIO_WORKLOADS] + ["create", "stat", "delete"]
+    for each_workload in workload_names:
+        summaries = [client[each_workload] for client in clients.values() if each_workload in client]
+        if not summaries:
+            continue
+        cluster[each_workload] = {"p50_ms": statistics.median(summary["p50_ms"] for summary in summaries),
+                                  "p99_ms": max(summary["p99_ms"] for summary in summaries)}
+        for each_metric in ["mbps", "iops", "ops"]:
+            if each_metric in summaries[0]:
+                cluster[each_workload][each_metric] = sum(summary[each_metric] or 0 for summary in summaries)
+
+    comparison = {}
+    for each_workload, metrics in (expected or {}).items():
+        for each_metric, expected_value in metrics.items():
+            measured = cluster.get(each_workload, {}).get(each_metric)
+            if measured is None or not expected_value:
+                continue
+            comparison["%s_%s" % (each_workload, each_metric)] = {
+                "measured": measured, "expected": expected_value, "ratio": measured / expected_value,
+                "below_expected": measured < expected_value * threshold}
+    return {"clients": clients, "cluster": cluster, "expected": comparison}
+
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser(description='Aggregate filesystem benchmark results or run the '
+                                                 'metadata workload on a client.')
+    PARSER.add_argument('--results_dir', help='directory of per client result json files')
+    PARSER.add_argument('--report_path', help='report json file to write')
+    PARSER.add_argument('--expected_path', help='expected performance json file')
+    PARSER.add_argument('--metadata_dir', help='runs metadata workload in the directory')
+    PARSER.add_argument('--file_count', default=METADATA_FILE_COUNT, type=int,
+                        help='files created, stat-ed and deleted by the metadata workload')
+    ARGUMENTS = PARSER.parse_args()
+
+    if ARGUMENTS.metadata_dir:
+        print(json.dumps(run_metadata_workload(ARGUMENTS.metadata_dir, ARGUMENTS.file_count)))
+    else:
+        RESULTS = []
+        for each_file in sorted(glob.glob(os.path.join(ARGUMENTS.results_dir, "*.json"))):
+            with open(each_file) as result_fh:
+                RESULTS.append(json.load(result_fh))
+        EXPECTED = None
+        if ARGUMENTS.expected_path and os.path.exists(ARGUMENTS.expected_path):
+            with open(ARGUMENTS.expected_path) as expected_fh:
+                EXPECTED = json.load(expected_fh)
+
+        REPORT = build_benchmark_report(RESULTS, EXPECTED)
+        with open(ARGUMENTS.report_path, 'w') as report_fh:
+            json.dump(REPORT, report_fh, indent=4)
+
+        for each_workload, metrics in REPORT["cluster"].items():
+            print("%s: %s" % (each_workload, ", ".join("%s %.3f" % (each_metric, value)
+                                                        for each_metric, value in sorted(metrics.items()))))
+        for each_key, comparison in sorted(REPORT["expected"].items()):
+            if comparison["below_expected"]:
+                print("%s below expected: %.1f of %.1f" % (each_key, comparison["measured"], comparison["expected"]))
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright IBM Corporation 2018
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+import configparser
+import io
+import json
+import re
+from scale_facts import DEFAULT_ARCH, DEFAULT_OS
+from scale_output import get_yaml_content
+from scale_placement import get_ces_groups, get_collector_positions, order_instances_by_latency
+
+# Role name to ClusterNode attribute, see relocate_gui_roles/promote_managers
+NODE_ROLE_KEYS = {'quorum': 'is_quorum', 'manager': 'is_manager', 'gui': 'is_gui',
+                  'admin': 'is_admin', 'collector': 'is_collector', 'class': 'node_class'}
+# Cluster definition node flags not derived from the model
+JSON_NODE_DEFAULTS = {"is_object_store": False, "is_nfs": False, "is_smb": False, "is_hdfs": False,
+                      "is_protocol_node": False, "is_ems_node": False, "is_callhome_node": False,
+                      "is_broker_node": False, "is_node_offline": False, "is_node_reachable": True,
+                      "is_node_excluded": False, "is_mestor_node": False}
+INVENTORY_FORMATS = ["ini", "json", "yaml"]
+
+
+class ClusterNode:
+    """ Node of the cluster model, roles are assigned once for every inventory format """
+    __slots__ = ('name', 'ip', 'node_class', 'zone', 'is_quorum', 'is_manager', 'is_gui', 'is_collector',
+                 'is_nsd', 'is_admin', 'daemon_nodename', 'zone_class', 'packages_baked', 'os', 'arch',
+                 'protocols')
+
+    def __init__(self, name, ip, node_class, zone=None, is_quorum=False, is_manager=False, is_gui=False,
+                 is_collector=False, is_nsd=False, is_admin=False):
+        self.name = name
+        self.ip = ip
+        self.node_class = node_class
+        self.zone = zone
+        self.is_quorum = is_quorum
+        self.is_manager = is_manager
+        self.is_gui = is_gui
+        self.is_collector = is_collector
+        self.is_nsd = is_nsd
+        self.is_admin = is_admin
+        self.daemon_nodename = get_daemon_nodename(name)
+        self.zone_class = None
+        self.packages_baked = None
+        self.os = None
+        self.arch = None
+        self.protocols = ()
+
+    # Item access by role key, placement helpers work on nodes of any format
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+
+
+class ClusterModel:
+    """ Cluster nodes along with cluster wide variables and connection details,
+    config, filesystems, disks and protocols are part of the cluster definition
+    """
+    __slots__ = ('cluster_type', 'nodes', 'cluster_vars', 'user', 'key_file', 'ssh_args', 'cluster_config',
+                 'config', 'callhome_params', 'filesystems', 'disks', 'protocols')
+
+    def __init__(self, cluster_type, nodes, cluster_vars, user, key_file, ssh_args=""):
+        self.cluster_type = cluster_type
+        self.nodes = nodes
+        self.cluster_vars = cluster_vars
+        self.user = user
+        self.key_file = key_file
+        self.ssh_args = ssh_args
+        self.cluster_config = {}
+        self.config = []
+        self.callhome_params = {"is_enabled": False}
+        self.filesystems = None
+        self.disks = None
+        self.protocols = None
+
+
+def get_ssh_proxy_args(bastion_user, bastion_ip, bastion_key_file):
+    """ Return ssh options connecting through the bastion, empty without one """
+    if bastion_key_file is None:
+        return ""
+    return "-o ControlMaster=auto -o ControlPersist=30m -o UserKnownHostsFile=/dev/null " \
+        "-o StrictHostKeyChecking=no -o ProxyCommand=\"ssh -p 22 -o StrictHostKeyChecking=no " \
+        "-o UserKnownHostsFile=/dev/null -W %%h:%%p %s@%s -i %s\"" % (bastion_user, bastion_ip, bastion_key_file)
+
+
+def get_daemon_nodename(name):
+    """ Return short host name, ip addresses are kept as is """
+    if re.match(r'^\d{1,3}(\.\d{1,3}){3}$', name):
+        return name
+    return name.split('.')[0]
+
+
+def get_tier_nodes(instances, node_class, start_quorum_assign, manager_count, collector_count,
+                   is_nsd, admin_quorum, latency_matrix=None, fixed_quorum=()):
+    """ Assign roles to one tier of instances by placement position.
+    First positions are quorum managers (the first one also GUI and admin),
+    then quorum nodes up to start_quorum_assign, collectors are spread by
+    get_collector_positions. With a latency matrix the quorum positions
+    are taken by the lowest latency set (order_instances_by_latency).
+    :args: instances (list of dict with dns, private_ip, zone, ordered),
+           node_class (string), start_quorum_assign (int, last quorum index),
+           manager_count (int), collector_count (int), is_nsd (bool),
+           admin_quorum (bool, quorum nodes are admin nodes),
+           latency_matrix (dict), fixed_quorum (list of ips of other quorum nodes)
+    """
+    if latency_matrix:
+        instances = order_instances_by_latency(instances, latency_matrix, start_quorum_assign + 1, fixed_quorum)
+    nodes = []
+    collector_positions = get_collector_positions([each_instance.get('zone') for each_instance in instances],
+                                                  manager_count, collector_count)
+    for index, each_instance in enumerate(instances):
+        is_quorum = index <= start_quorum_assign
+        nodes.append(ClusterNode(each_instance['dns'], each_instance['private_ip'], node_class,
+                                 each_instance.get('zone'), is_quorum=is_quorum,
+                                 is_manager=is_quorum and index <= manager_count - 1, is_gui=is_quorum and index == 0,
+                                 is_collector=index in collector_positions, is_nsd=is_nsd,
+                                 is_admin=is_quorum and (index == 0 or admin_quorum)))
+    return nodes
+
+
+def get_cluster_nodes(az_count, cluster_type, compute_instances, storage_instances, desc_instances,
+                      quorum_count, manager_count, collector_count, latency_matrix=None):
+    """ Build cluster nodes with quorum, manager, GUI, collector and admin roles.
+    Instances are expected in placement order (order_instances_by_zone).
+    Multi-AZ and combined clusters keep quorum descOnly nodes, storage
+    quorum nodes are admin nodes there. Quorums not covered by storage
+    nodes go to the first compute nodes of a combined cluster.
+    :args: az_count (int), cluster_type (string), compute_instances (list),
+           storage_instances (list), desc_instances (list of dict with dns,
+           private_ip, zone), quorum_count (int), manager_count (int),
+           collector_count (int), latency_matrix (dict, optional RTT matrix
+           for latency aware quorum placement)
+    :return: nodes (list of ClusterNode)
+    """
+    if cluster_type == 'compute':
+        return get_tier_nodes(compute_instances, "computenodegrp", quorum_count - 1, manager_count,
+                              collector_count, False, False, latency_matrix)
+    if cluster_type == 'storage' and az_count == 1:
+        return get_tier_nodes(storage_instances, "storagenodegrp", quorum_count - 1, manager_count,
+                              collector_count, True, False, latency_matrix)
+
+    nodes = [ClusterNode(each_instance['dns'], each_instance['private_ip'], "computedescnodegrp",
+                         each_instance.get('zone'), is_quorum=True, is_nsd=True)
+             for each_instance in desc_instances]
+    # Storage/NSD nodes to be quorum nodes, descOnly nodes take their share in multi-AZ
+    start_quorum_assign = quorum_count - 1 - len(desc_instances) if az_count > 1 else quorum_count - 1
+    nodes.extend(get_tier_nodes(storage_instances, "storagenodegrp", start_quorum_assign, manager_count,
+                                collector_count, True, True, latency_matrix,
+                                [each_instance['private_ip'] for each_instance in desc_instances]))
+    if cluster_type != 'combined':
+        return nodes
+
+    if az_count > 1:
+        if len(storage_instances) - len(desc_instances) >= quorum_count:
+            quorums_left = 0
+        else:
+            quorums_left = quorum_count - len(storage_instances) - len(desc_instances)
+    else:
+        quorums_left = quorum_count - len(storage_instances)
+    # Additional quorums assign to compute nodes, none if storage covers quorum
+    quorums_left = max(quorums_left, 0)
+    for index, each_instance in enumerate(compute_instances):
+        nodes.append(ClusterNode(each_instance['dns'], each_instance['private_ip'], "computenodegrp",
+                                 each_instance.get('zone'), is_quorum=index < quorums_left,
+                                 is_admin=index < quorums_left))
+    return nodes
+
+
+def get_gui_nodes(instances):
+    """ Return dedicated GUI nodes, roles are moved there by relocate_gui_roles """
+    return [ClusterNode(each_instance['dns'], each_instance['private_ip'], "guinodegrp", each_instance.get('zone'))
+            for each_instance in instances]
+
+
+def get_protocol_nodes(instances, protocols):
+    """ Return CES protocol nodes serving the protocols (ex: nfs, smb).
+    :args: instances (list of dict with dns, private_ip, zone, zone interleaved),
+           protocols (list)
+    """
+    nodes = []
+    for each_instance in instances:
+        each_node = ClusterNode(each_instance['dns'], each_instance['private_ip'], "protocolnodegrp",
+                                each_instance.get('zone'))
+        each_node.protocols = tuple(protocols)
+        nodes.append(each_node)
+    return nodes
+
+
+def get_protocol_config(nodes, ces_ips, filesystem, mount_point, zone_labels=None):
+    """ Return CES configuration of the protocol nodes, IPs allocated by get_ces_groups.
+    :args: nodes (list of ClusterNode), ces_ips (list), filesystem (CES shared
+           root filesystem), mount_point (string), zone_labels (dict of zone to
+           label used in CES group names)
+    :return: scale_protocols (dict), node_ips (dict of node name to CES ips),
+             unplaced_ips (list)
+    """
+    protocol_nodes = [each_node for each_node in nodes if each_node.protocols]
+    protocols = set(each_protocol for each_node in protocol_nodes for each_protocol in each_node.protocols)
+    groups, node_ips, unplaced_ips = get_ces_groups(
+        [{"name": each_node.name, "ip": each_node.ip,
+          "zone": (zone_labels or {}).get(each_node.zone, each_node.zone)} for each_node in protocol_nodes],
+        ces_ips)
+    scale_protocols = {"nfs": "nfs" in protocols, "smb": "smb" in protocols, "object": False,
+                       "export_ip_pool": [each_ip for each_group in groups for each_ip in each_group["export_ip_pool"]],
+                       "filesystem": filesystem, "mountpoint": mount_point, "scale_ces_groups": groups}
+    return scale_protocols, node_ips, unplaced_ips
+
+
+def get_host_vars(model, node):
+    """ Return inventory host variables of the node """
+    host_vars = {"scale_cluster_quorum": node.is_quorum, "scale_cluster_manager": node.is_manager,
+                 "scale_cluster_gui": node.is_gui, "scale_zimon_collector": node.is_collector,
+                 "is_nsd_server": node.is_nsd, "is_admin_node": node.is_admin,
+                 "ansible_user": model.user, "ansible_ssh_private_key_file": model.key_file,
+                 "ansible_python_interpreter": "/usr/bin/python3",
+                 "scale_nodeclass": [node.node_class, node.zone_class] if node.zone_class else node.node_class,
+                 "scale_daemon_nodename": node.daemon_nodename}
+    if node.packages_baked is not None:
+        host_vars["scale_packages_baked"] = node.packages_baked
+    if node.protocols:
+        host_vars["is_protocol_node"] = True
+    host_vars["ansible_ssh_common_args"] = model.ssh_args
+    return host_vars
+
+
+def get_ini_host_entry(model, node):
+    """ Return inventory ini host line of the node """
+    host_vars = get_host_vars(model, node)
+    if isinstance(host_vars["scale_nodeclass"], list):
+        host_vars["scale_nodeclass"] = "\"['%s']\"" % "','".join(host_vars["scale_nodeclass"])
+    if host_vars["ansible_ssh_common_args"]:
+        host_vars["ansible_ssh_common_args"] = "'%s'" % host_vars["ansible_ssh_common_args"]
+    return " ".join([node.name] + ["%s=%s" % each_var for each_var in host_vars.items()])
+
+
+def get_json_node(model, node):
+    """ Return cluster definition node details of the node """
+    json_node = {"fqdn": node.name, "ip_address": node.ip, "ansible_ssh_private_key_file": model.key_file,
+                 "scale_state": "present", "is_nsd_server": node.is_nsd, "is_quorum_node": node.is_quorum,
+                 "is_manager_node": node.is_manager, "scale_zimon_collector": node.is_collector,
+                 "is_gui_server": node.is_gui, "is_admin_node": node.is_admin,
+                 "scale_nodeclass": [node.node_class, node.zone_class] if node.zone_class else node.node_class,
+                 "os": node.os or DEFAULT_OS, "arch": node.arch or DEFAULT_ARCH}
+    json_node.update(JSON_NODE_DEFAULTS)
+    if node.protocols:
+        json_node.update({"is_protocol_node": True, "is_nfs": "nfs" in node.protocols,
+                          "is_smb": "smb" in node.protocols})
+    json_node["scale_daemon_nodename"] = node.daemon_nodename
+    json_node["upgrade_prompt"] = False
+    if node.packages_baked is not None:
+        json_node["scale_packages_baked"] = node.packages_baked
+    return json_node
+
+
+def get_model_nodes(model, host_names=None):
+    """ Return model nodes, restricted to host_names (kept in that order) """
+    if host_names is None:
+        return model.nodes
+    nodes = {each_node.name: each_node for each_node in model.nodes}
+    return [nodes[each_name] for each_name in host_names]
+
+
+def render_ini_inventory(model, host_names=None):
+    """ Render inventory ini, scale_nodes hosts and cluster variables """
+    config = configparser.ConfigParser(allow_no_value=True)
+    config['all:vars'] = model.cluster_vars
+    config_content = io.StringIO()
+    config.write(config_content)
+    return '[scale_nodes]' + "\n" + "".join(get_ini_host_entry(model, each_node) + "\n"
+                                            for each_node in get_model_nodes(model, host_names)) + \
+        config_content.getvalue()
+
+
+def get_native_value(value):
+    """ Return bool of ini style boolean strings ("True", "false"), value otherwise """
+    if isinstance(value, str) and value.lower() in ["true", "false"]:
+        return value.lower() == "true"
+    return value
+
+
+def get_cluster_definition(model, host_names=None):
+    """ Return cluster definition (scale_clusterdefinition.json) of the model,
+    node_details is a generator consumed once by the writer. scale_disks is
+    the disk layout list, it is read by tiebreaker, placement and benchmark
+    steps before the write and stays in memory.
+    """
+    scale_cluster = dict(model.cluster_vars, **model.cluster_config)
+    cluster_definition = {"scale_cluster": {each_key: get_native_value(each_value)
+                                            for each_key, each_value in scale_cluster.items()},
+                          "scale_callhome_params": model.callhome_params,
+                          "node_details": (get_json_node(model, each_node)
+                                           for each_node in get_model_nodes(model, host_names)),
+                          "scale_config": model.config}
+    if model.filesystems is not None:
+        cluster_definition["scale_filesystem"] = [{each_key: get_native_value(each_value)
+                                                   for each_key, each_value in each_fs.items()}
+                                                  for each_fs in model.filesystems]
+    if model.disks is not None:
+        cluster_definition["scale_disks"] = model.disks
+    if model.protocols:
+        cluster_definition["scale_protocols"] = model.protocols
+    return cluster_definition
+
+
+def render_json_inventory(model, host_names=None):
+    """ Render cluster definition json """
+    return json.dumps(get_cluster_definition(model, host_names), indent=4, default=list)
+
+
+def render_yaml_inventory(model, host_names=None):
+    """ Render ansible yaml inventory, scale_nodes hosts and cluster variables """
+    return get_yaml_content({"all": {"vars": model.cluster_vars,
+                                     "children": {"scale_nodes": {
+                                         "hosts": {each_node.name: get_host_vars(model, each_node)
+                                                   for each_node in get_model_nodes(model, host_names)}}}}})
+
+
+# Inventory format to renderer, every renderer takes (model, host_names=None)
+INVENTORY_RENDERERS = {"ini": render_ini_inventory, "json": render_json_inventory,
+                       "yaml": render_yaml_inventory}
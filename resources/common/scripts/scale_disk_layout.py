@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright IBM Corporation 2018
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import logging
+import os
+
+LOGGER = logging.getLogger("scale_disk_layout")
+
+# Relative volume performance (higher is faster) across cloud volume types.
+VOLUME_TYPE_RANK = {"nvme": 100, "local-ssd": 100, "UltraSSD_LRS": 90,
+                    "io2": 80, "io1": 80, "pd-extreme": 80,
+                    "gp3": 60, "Premium_LRS": 60, "pd-ssd": 60,
+                    "gp2": 50, "pd-balanced": 50, "StandardSSD_LRS": 40,
+                    "st1": 20, "pd-standard": 20, "Standard_LRS": 20,
+                    "sc1": 10}
+DATA_POOL_NAME = "data"
+# Maximum number of NSD servers per disk supported by mmcrnsd.
+MAX_NSD_SERVERS = 8
+# Upper bound of failure groups for locally-attached disks. Fewer, larger
+# failure groups keep restripe fan-out after a node loss efficient.
+MAX_LOCAL_FAILURE_GROUPS = 3
+# Maximum replicas supported by the filesystem.
+MAX_REPLICAS = 3
+# Tiebreaker disks, an odd count so that a majority is defined.
+TIEBREAKER_DISK_COUNT = 3
+
+
+def get_nsd_name(each_ip, device_name):
+    """ Return NSD name for the device attached to the node """
+    return "nsd_" + each_ip.replace(".", "_") + "_" + os.path.basename(device_name)
+
+
+def get_volume_rank(volume_type):
+    """ Return relative performance rank of the volume type (0 if unknown) """
+    return VOLUME_TYPE_RANK.get(volume_type, 0)
+
+
+def get_volume_size_bytes(disk_details):
+    """ Return volume size in bytes from size in GiB (None if unknown) """
+    if disk_details.get("size") in [None, ""]:
+        return None
+    return int(float(disk_details["size"]) * 1024 ** 3)
+
+
+def get_node_capacity(disk_map):
+    """ Return total volume size (bytes) per node.
+    :args: disk_map (dict of ip to {"zone", "disks"})
+    """
+    node_capacity = {}
+    for each_ip, disk_details in disk_map.items():
+        node_capacity[each_ip] = sum(get_volume_size_bytes(each_disk) or 0
+                                     for each_disk in disk_details["disks"].values())
+    return node_capacity
+
+
+def split_by_capacity(node_ips, node_capacity):
+    """ Split nodes into two failure groups with balanced capacity.
+    Largest node first into the failure group with less capacity, ties
+    alternate to keep node counts equal.
+    :args: node_ips (list), node_capacity (dict)
+    :return: failure_group1 (list), failure_group2 (list)
+    """
+    failure_group1, failure_group2 = [], []
+    capacity1, capacity2 = 0, 0
+    for each_ip in sorted(node_ips, key=lambda ip: node_capacity.get(ip, 0), reverse=True):
+        if (capacity1, len(failure_group1)) <= (capacity2, len(failure_group2)):
+            failure_group1.append(each_ip)
+            capacity1 += node_capacity.get(each_ip, 0)
+        else:
+            failure_group2.append(each_ip)
+            capacity2 += node_capacity.get(each_ip, 0)
+    # Preserve inventory order within each failure group
+    return ([ip for ip in node_ips if ip in failure_group1],
+            [ip for ip in node_ips if ip in failure_group2])
+
+
+def apply_performance_layout(disks_list, disk_types):
+    """ Place metadata on the fastest volume tier and data on the rest.
+    Fastest tier disks become metadataOnly in the system pool, others become
+    dataOnly in DATA_POOL_NAME (unless terraform assigned a pool). The layout
+    is applied per filesystem only if every failure group holding its data
+    also has fast tier disks, otherwise metadata replicas could not be placed.
+    :args: disks_list (list), disk_types (dict of nsd name to volume type)
+    :return: filesystems using a separate data pool (dict of fs name to pools)
+    """
+    data_pools = {}
+    for fs_name in sorted(set(each_disk["filesystem"] for each_disk in disks_list)):
+        fs_disks = [each_disk for each_disk in disks_list
+                    if each_disk["filesystem"] == fs_name and each_disk["usage"] == "dataAndMetadata"]
+        ranks = set(get_volume_rank(disk_types.get(each_disk["nsd"])) for each_disk in fs_disks)
+        if len(ranks) < 2:
+            continue
+        fastest_rank = max(ranks)
+        fast_fgs = set(each_disk["failureGroup"] for each_disk in fs_disks
+                       if get_volume_rank(disk_types.get(each_disk["nsd"])) == fastest_rank)
+        if fast_fgs != set(each_disk["failureGroup"] for each_disk in fs_disks):
+            LOGGER.warning("Filesystem %s: fastest volumes are not present in every failure group, "
+                           "keeping dataAndMetadata layout.", fs_name)
+            continue
+        for each_disk in fs_disks:
+            if get_volume_rank(disk_types.get(each_disk["nsd"])) == fastest_rank:
+                each_disk["usage"] = "metadataOnly"
+                each_disk["pool"] = "system"
+            else:
+                each_disk["usage"] = "dataOnly"
+                if each_disk["pool"] in [None, "system"]:
+                    each_disk["pool"] = DATA_POOL_NAME
+                data_pools.setdefault(fs_name, set()).add(each_disk["pool"])
+    return data_pools
+
+
+def get_placement_policy(data_pools):
+    """ Return placement policy placing new files in the data pool.
+    :args: data_pools (set of pool names)
+    """
+    default_pool = DATA_POOL_NAME if DATA_POOL_NAME in data_pools else sorted(data_pools)[0]
+    return "RULE 'default' SET POOL '%s'\n" % default_pool
+
+
+def get_nsd_servers(owner_ip, group_ips, disk_index, max_servers=MAX_NSD_SERVERS):
+    """ Return ordered NSD server list for a disk.
+    The owning node is primary. Backups are the other servers of the group,
+    rotated by disk index so that the disks of a failed server are spread
+    round-robin across the remaining servers.
+    :args: owner_ip (string), group_ips (list), disk_index (int), max_servers (int)
+    """
+    owner_index = group_ips.index(owner_ip)
+    peers = group_ips[owner_index + 1:] + group_ips[:owner_index]
+    if peers:
+        shift = disk_index % len(peers)
+        peers = peers[shift:] + peers[:shift]
+    return ",".join([owner_ip] + peers[:max_servers - 1])
+
+
+def assign_nsd_servers(disks_list, node_zones=None, shared_nsds=None):
+    """ Replace single NSD server of each shared data disk with rotated server list.
+    A backup server serves I/O only if the volume is attached to it as well
+    (ex: multi-attach volumes), single attach volumes keep their owner.
+    Servers are grouped per failure group and zone, hence backups never
+    cross a failure domain. descOnly disks keep their single server.
+    :args: disks_list (list), node_zones (dict of ip to zone),
+           shared_nsds (set of NSD names of volumes attached to every server
+           of their failure group)
+    :return: number of disks with backup servers (int)
+    """
+    node_zones = node_zones or {}
+    shared_nsds = shared_nsds or set()
+    group_ips, disk_index = {}, {}
+    for each_disk in disks_list:
+        if each_disk["usage"] == "descOnly" or each_disk.get("nsd") not in shared_nsds:
+            continue
+        group = group_ips.setdefault((each_disk["failureGroup"], node_zones.get(each_disk["servers"])), [])
+        if each_disk["servers"] not in group:
+            group.append(each_disk["servers"])
+
+    shared_count = 0
+    for each_disk in disks_list:
+        if each_disk["usage"] == "descOnly" or each_disk.get("nsd") not in shared_nsds:
+            continue
+        owner_ip = each_disk["servers"]
+        each_disk["servers"] = get_nsd_servers(owner_ip, group_ips[(each_disk["failureGroup"],
+                                                                    node_zones.get(owner_ip))],
+                                               disk_index.get(owner_ip, 0))
+        disk_index[owner_ip] = disk_index.get(owner_ip, 0) + 1
+        shared_count += 1
+    return shared_count
+
+
+def get_local_failure_groups(node_zones, max_failure_groups=MAX_LOCAL_FAILURE_GROUPS):
+    """ Map nodes with locally-attached disks to failure groups.
+    Multi zone, every zone forms a failure group (zones beyond the cap share
+    a failure group round-robin). Single zone, nodes are distributed
+    round-robin across up to max_failure_groups failure groups.
+    :args: node_zones (dict of ip to zone, ordered), max_failure_groups (int)
+    :return: failure groups (dict of ip to int)
+    """
+    zone_list = []
+    for zone in node_zones.values():
+        if zone not in zone_list:
+            zone_list.append(zone)
+
+    failure_groups = {}
+    if len(zone_list) > 1:
+        for each_ip, zone in node_zones.items():
+            failure_groups[each_ip] = zone_list.index(zone) % max_failure_groups + 1
+    else:
+        group_count = max(min(max_failure_groups, len(node_zones)), 1)
+        for idx, each_ip in enumerate(node_zones):
+            failure_groups[each_ip] = idx % group_count + 1
+    return failure_groups
+
+
+def get_replica_settings(failure_group_count, default_data_replicas=None, default_metadata_replicas=None,
+                         max_data_replicas=None, max_metadata_replicas=None):
+    """ Return replica settings matching the failure group count.
+    Unset default replicas are 2 data and 3 metadata so that losing a node
+    or zone leaves a replica, explicit values are kept. Every value is
+    capped at the failure group count since each replica needs its own
+    failure group, explicit values changed are logged.
+    :args: failure_group_count (int), replica overrides (int or None)
+    :return: default_data_replicas, default_metadata_replicas,
+             max_data_replicas, max_metadata_replicas
+    """
+    limit = max(min(failure_group_count, MAX_REPLICAS), 1)
+    requested = [default_data_replicas, default_metadata_replicas, max_data_replicas, max_metadata_replicas]
+    data_replicas = min(2 if default_data_replicas is None else int(default_data_replicas), limit)
+    metadata_replicas = min(3 if default_metadata_replicas is None else int(default_metadata_replicas), limit)
+    settings = [data_replicas, metadata_replicas,
+                max(min(MAX_REPLICAS if max_data_replicas is None else int(max_data_replicas), limit),
+                    data_replicas),
+                max(min(MAX_REPLICAS if max_metadata_replicas is None else int(max_metadata_replicas), limit),
+                    metadata_replicas)]
+    for setting_name, requested_value, value in zip(["defaultDataReplicas", "defaultMetadataReplicas",
+                                                     "maxDataReplicas", "maxMetadataReplicas"],
+                                                    requested, settings):
+        if requested_value is not None and int(requested_value) != value:
+            LOGGER.warning("%s %s changed to %s to match %s failure groups.",
+                           setting_name, requested_value, value, failure_group_count)
+    return tuple(settings)
+
+
+def select_tiebreaker_disks(disks_list, disk_count=TIEBREAKER_DISK_COUNT):
+    """ Select tiebreaker NSDs spread across failure groups and servers.
+    descOnly disks are preferred, then disks are picked round-robin across
+    failure groups, preferring servers not picked yet. Falls back to a
+    single disk if disk_count disks can not be found. Selected disks without
+    an NSD name are named after their primary server.
+    :args: disks_list (list), disk_count (int)
+    :return: tiebreaker NSD names (list)
+    """
+    fg_disks = {}
+    for each_disk in sorted(disks_list, key=lambda disk: disk["usage"] != "descOnly"):
+        fg_disks.setdefault(each_disk["failureGroup"], []).append(each_disk)
+
+    selected, used_servers = [], set()
+    while len(selected) < disk_count and any(fg_disks.values()):
+        for each_fg in list(fg_disks):
+            if not fg_disks[each_fg] or len(selected) == disk_count:
+                continue
+            candidates = [each_disk for each_disk in fg_disks[each_fg]
+                          if each_disk["servers"].split(",")[0] not in used_servers] or fg_disks[each_fg]
+            tiebreaker_disk = candidates[0]
+            fg_disks[each_fg].remove(tiebreaker_disk)
+            selected.append(tiebreaker_disk)
+            used_servers.add(tiebreaker_disk["servers"].split(",")[0])
+
+    if len(selected) < disk_count:
+        selected = selected[:1]
+    for each_disk in selected:
+        if not each_disk.get("nsd"):
+            each_disk["nsd"] = get_nsd_name(each_disk["servers"].split(",")[0], each_disk["device"])
+    return [each_disk["nsd"] for each_disk in selected]
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright IBM Corporation 2018
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import json
+import os
+import re
+from scale_output import add_artifact
+
+DEFAULT_OS = "rhel8"
+DEFAULT_ARCH = "x86_64"
+# Image name pattern, scale os prefix, ansible distribution, ansible os family
+OS_PATTERNS = [(r'(?:rhel|red\s*hat)\D*?(\d+)', "rhel", "RedHat", "RedHat"),
+               (r'rocky\D*?(\d+)', "rhel", "Rocky", "RedHat"),
+               (r'(?:sles|suse)\D*?(\d+)', "sles", "SLES", "Suse"),
+               (r'ubuntu\D*?(\d+)', "ubuntu", "Ubuntu", "Debian")]
+# Cloud architecture names to ansible_architecture
+ARCH_NAMES = {"x86_64": "x86_64", "amd64": "x86_64", "x64": "x86_64",
+              "arm64": "aarch64", "aarch64": "aarch64", "ppc64le": "ppc64le",
+              "s390x": "s390x"}
+# Fact subsets still gathered on the node, cheap and not known to terraform
+# (hostname, kernel version needed to build the GPL layer).
+MINIMAL_GATHER_SUBSET = ['!all', '!min', 'platform', 'distribution']
+FACT_CACHE_DIR = "fact_cache"
+
+
+def get_os_details(image_name):
+    """ Derive OS details from image name or description.
+    :args: image_name (string)
+    :return: dict with os, distribution, os_family, major_version or None
+    """
+    for pattern, os_prefix, distribution, os_family in OS_PATTERNS:
+        match = re.search(pattern, str(image_name or ""), re.IGNORECASE)
+        if match:
+            return {"os": "%s%s" % (os_prefix, match.group(1)), "distribution": distribution,
+                    "os_family": os_family, "major_version": match.group(1)}
+    return None
+
+
+def get_node_os(instance):
+    """ Return scale os name (ex: rhel8) of the instance """
+    if instance.get("os"):
+        return instance["os"]
+    os_details = get_os_details(instance.get("image_name"))
+    return os_details["os"] if os_details else DEFAULT_OS
+
+
+def get_node_arch(instance):
+    """ Return architecture (ex: x86_64, aarch64) of the instance """
+    arch = instance.get("arch")
+    if isinstance(arch, list):
+        arch = arch[0] if arch else None
+    return ARCH_NAMES.get(str(arch).lower(), DEFAULT_ARCH) if arch else DEFAULT_ARCH
+
+
+def get_instance_facts(instance):
+    """ Return ansible facts known from terraform for the instance.
+    :args: instance (dict with optional private_ip, zone, image_name, arch,
+           vcpus, memory_size)
+    """
+    facts = {}
+    if instance.get("arch"):
+        facts["ansible_architecture"] = get_node_arch(instance)
+    if instance.get("private_ip"):
+        facts["ansible_default_ipv4"] = {"address": instance["private_ip"]}
+        facts["ansible_all_ipv4_addresses"] = [instance["private_ip"]]
+    os_details = get_os_details(instance.get("image_name"))
+    if os_details:
+        facts["ansible_distribution"] = os_details["distribution"]
+        facts["ansible_distribution_major_version"] = os_details["major_version"]
+        facts["ansible_os_family"] = os_details["os_family"]
+    if instance.get("vcpus"):
+        facts["ansible_processor_vcpus"] = int(instance["vcpus"])
+    if instance.get("memory_size"):
+        facts["ansible_memtotal_mb"] = int(instance["memory_size"])
+    if instance.get("zone"):
+        facts["scale_zone"] = instance["zone"]
+    return facts
+
+
+def write_fact_cache(cache_path, host_facts):
+    """ Write ansible jsonfile fact cache (one file per host).
+    :args: cache_path (string), host_facts (dict of hostname to facts)
+    """
+    for hostname, facts in host_facts.items():
+        add_artifact(os.path.join(cache_path, hostname), json.dumps(facts, indent=4))
+
+
+def get_host_image(image_manifest, host_keys):
+    """ Return image details of the host, "*" applies to every host.
+    :args: image_manifest (dict of host name/ip or "*" to dict with image,
+           scale_version), host_keys (list of names/ips of the host)
+    """
+    image_details = dict(image_manifest.get("*", {}))
+    for each_key in host_keys:
+        if each_key in image_manifest:
+            image_details.update(image_manifest[each_key])
+            break
+    return image_details
+
+
+def is_scale_baked(image_details, scale_version):
+    """ Return True if the image has Scale packages of scale_version baked in """
+    return bool(image_details.get("scale_version")) and \
+        str(image_details["scale_version"]) == str(scale_version)
+
+
+def get_image_groups(host_images, scale_version):
+    """ Group hosts by Scale version baked in their image.
+    :args: host_images (dict of host to image details), scale_version (string)
+    :return: dict of baked version ("" if none) to list of hosts
+    """
+    image_groups = {}
+    for each_host, image_details in host_images.items():
+        image_groups.setdefault(str(image_details.get("scale_version") or ""), []).append(each_host)
+    return image_groups
+
+
+def get_image_group_summary(baked_version, host_count, scale_version):
+    """ Return image group summary line """
+    if baked_version == str(scale_version):
+        return "Image group %s: %s hosts, packages baked, install skipped." % (baked_version, host_count)
+    return "Image group %s: %s hosts, Scale %s packages installed." % (baked_version or "without Scale",
+                                                                      host_count, scale_version)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright IBM Corporation 2018
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+import json
+import logging
+import os
+import sys
+
+FS_CONFIG_KEYS = ["mount_point", "block_size", "data_replicas", "max_data_replicas",
+                  "metadata_replicas", "max_metadata_replicas"]
+LOGGER = logging.getLogger("scale_fs_config")
+# Parsed filesystem config per (path, mtime), each file is read once per process
+FS_CONFIG_CACHE = {}
+
+
+def load_filesystem_config(fs_config_file):
+    """ Parse and validate filesystem config file, memoized on path and mtime.
+    :args: fs_config_file (string)
+    :return: dict of filesystem name to params
+    """
+    try:
+        cache_key = (os.path.abspath(fs_config_file), os.stat(fs_config_file).st_mtime_ns)
+    except OSError:
+        LOGGER.error("Provided filesystem config file (%s) is not valid.", fs_config_file)
+        sys.exit(1)
+    if cache_key not in FS_CONFIG_CACHE:
+        try:
+            with open(fs_config_file) as fs_config_handler:
+                fs_config = json.load(fs_config_handler)["filesystem_config_params"]
+        except (OSError, KeyError, TypeError, json.decoder.JSONDecodeError):
+            LOGGER.error("Provided filesystem config file (%s) is not valid.", fs_config_file)
+            sys.exit(1)
+        for fs_name, fs_params in fs_config.items():
+            missing_keys = [each_key for each_key in FS_CONFIG_KEYS if each_key not in fs_params]
+            if missing_keys:
+                LOGGER.error("Filesystem %s in config file (%s) is missing: %s",
+                             fs_name, fs_config_file, ", ".join(missing_keys))
+                sys.exit(1)
+        FS_CONFIG_CACHE[cache_key] = fs_config
+    return FS_CONFIG_CACHE[cache_key]
+
+
+def read_filesystem_config(fs_config_file):
+    """ Read filesystem parameters (filesystem name to params) """
+    return {fs_name: dict(fs_params)
+            for fs_name, fs_params in load_filesystem_config(fs_config_file).items()}
+
+
+def get_filesystem_params(fs_config_file, fs_name):
+    """ Return parameters of a filesystem defined in the config file """
+    fs_config = load_filesystem_config(fs_config_file)
+    if fs_name not in fs_config:
+        LOGGER.error("Filesystem %s is not defined in config file (%s).", fs_name, fs_config_file)
+        sys.exit(1)
+    return dict(fs_config[fs_name])
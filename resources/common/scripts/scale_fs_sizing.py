@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright IBM Corporation 2018
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import math
+import re
+
+SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+# Subblock size per block size range (block size upper bound, subblock size)
+SUBBLOCK_SIZES = [(64 * 1024, 2 * 1024), (128 * 1024, 4 * 1024),
+                  (4 * 1024 ** 2, 8 * 1024), (16 * 1024 ** 2, 16 * 1024)]
+# Files up to this size fit into a 4K inode (data-in-inode)
+DATA_IN_INODE_SIZE = 3584
+# Directory blocks, indirect blocks and allocation maps on top of inodes
+METADATA_OVERHEAD = 0.1
+MIN_NUM_NODES = 32
+
+
+def parse_size(size):
+    """ Convert size string (ex: 4M, 512K) or number to bytes """
+    match = re.match(r'^\s*(\d+(?:\.\d+)?)\s*([KMGT]?)i?B?\s*$', str(size), re.IGNORECASE)
+    if not match:
+        raise ValueError("Invalid size: %s" % size)
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).upper()])
+
+
+def format_size(size_bytes):
+    """ Convert bytes to the largest exact unit (ex: 4194304 -> 4M) """
+    for unit in ["T", "G", "M", "K"]:
+        if size_bytes >= SIZE_UNITS[unit] and size_bytes % SIZE_UNITS[unit] == 0:
+            return "%s%s" % (size_bytes // SIZE_UNITS[unit], unit)
+    return str(size_bytes)
+
+
+def get_subblock_size(block_size):
+    """ Return subblock size (bytes) for the block size (bytes) """
+    for max_block_size, subblock_size in SUBBLOCK_SIZES:
+        if block_size <= max_block_size:
+            return subblock_size
+    return SUBBLOCK_SIZES[-1][1]
+
+
+def get_space_efficiency(file_size, block_size):
+    """ Return fraction of allocated space holding file data """
+    if file_size <= DATA_IN_INODE_SIZE:
+        return 1.0
+    if file_size >= block_size:
+        return 1.0
+    subblock_size = get_subblock_size(block_size)
+    return file_size / (math.ceil(file_size / subblock_size) * subblock_size)
+
+
+def recommend_block_size(avg_file_size, read_ratio):
+    """ Recommend data block size (bytes) for average file size and read ratio.
+    Small files favour small blocks to keep subblock waste and read-modify-
+    write low, large sequential reads favour large blocks for streaming.
+    """
+    if avg_file_size < 256 * 1024:
+        return 256 * 1024
+    if avg_file_size < 4 * 1024 ** 2:
+        return 1024 ** 2
+    if avg_file_size < 64 * 1024 ** 2 or read_ratio < 0.7:
+        return 4 * 1024 ** 2
+    return 16 * 1024 ** 2
+
+
+def recommend_inode_size(avg_file_size, file_count):
+    """ Recommend inode size, 4K keeps small files in the inode, 1K limits
+    metadata footprint for very large counts of large files.
+    """
+    if avg_file_size >= 1024 ** 2 and file_count >= 10 ** 9:
+        return 1024
+    return 4096
+
+
+def recommend_metadata_block_size(block_size, avg_file_size):
+    """ Recommend system pool block size for a separate metadata pool """
+    if avg_file_size < 1024 ** 2:
+        return min(block_size, 256 * 1024)
+    return min(block_size, 1024 ** 2)
+
+
+def get_num_nodes(node_count):
+    """ Estimate numNodes, leaving room for remote mounting and growth """
+    return max(MIN_NUM_NODES, int(math.ceil(node_count * 1.25)))
+
+
+def get_metadata_requirement(file_count, inode_size, metadata_replicas):
+    """ Estimate metadata space (bytes) for file_count files """
+    return int(file_count * inode_size * (1 + METADATA_OVERHEAD) * metadata_replicas)
+
+
+def get_fs_advice(hints, node_count, metadata_replicas, metadata_capacity=None,
+                  separate_metadata=False):
+    """ Recommend filesystem settings from workload hints.
+    :args: hints (dict with avg_file_size, optional file_count, read_ratio),
+           node_count (int), metadata_replicas (int),
+           metadata_capacity (int bytes of metadata capable volumes, None if unknown),
+           separate_metadata (bool, metadata is placed on metadataOnly disks)
+    :return: settings (dict of scale_storage keys), notes (list)
+    """
+    avg_file_size = parse_size(hints["avg_file_size"])
+    file_count = int(float(hints.get("file_count", 0)))
+    read_ratio = float(hints.get("read_ratio", 0.5))
+
+    block_size = recommend_block_size(avg_file_size, read_ratio)
+    inode_size = recommend_inode_size(avg_file_size, file_count)
+    settings = {"blockSize": format_size(block_size),
+                "inodeSize": inode_size,
+                "numNodes": get_num_nodes(node_count)}
+    notes = ["blockSize %s (subblock %s): average file %s uses %.0f%% of its allocated space."
+             % (format_size(block_size), format_size(get_subblock_size(block_size)),
+                format_size(avg_file_size), get_space_efficiency(avg_file_size, block_size) * 100)]
+    if avg_file_size >= block_size:
+        notes.append("Files span full blocks, sequential I/O is issued as %s requests per disk."
+                     % format_size(block_size))
+    else:
+        notes.append("Files are smaller than a block, I/O is bound by request rate rather than "
+                     "bandwidth, larger blocks would only add read-modify-write.")
+    if avg_file_size <= DATA_IN_INODE_SIZE and inode_size == 4096:
+        notes.append("Files fit into the 4K inode, data is read along with the metadata.")
+
+    if separate_metadata:
+        settings["metadataBlockSize"] = format_size(recommend_metadata_block_size(block_size, avg_file_size))
+        notes.append("metadataBlockSize %s for the metadata pool." % settings["metadataBlockSize"])
+
+    if file_count:
+        required = get_metadata_requirement(file_count, inode_size, metadata_replicas)
+        if metadata_capacity:
+            notes.append("Metadata for %s files with %s replicas needs ~%.1f GiB of %.1f GiB "
+                         "metadata capable capacity (%.0f%%)."
+                         % (file_count, metadata_replicas, required / 1024 ** 3,
+                            metadata_capacity / 1024 ** 3, required * 100.0 / metadata_capacity))
+            if required > metadata_capacity:
+                notes.append("Metadata capacity is insufficient, add metadata volumes or "
+                             "reduce the inode size.")
+        else:
+            notes.append("Metadata for %s files with %s replicas needs ~%.1f GiB."
+                         % (file_count, metadata_replicas, required / 1024 ** 3))
+    return settings, notes
+
+
+def get_workload_hints(hints_map, fs_name):
+    """ Return workload hints of the filesystem, "*" applies to every filesystem """
+    hints = dict(hints_map.get("*", {}))
+    hints.update(hints_map.get(fs_name, {}))
+    return hints
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright IBM Corporation 2018
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+import json
+import logging
+import sys
+import time
+
+LOG_FORMATS = ["text", "json"]
+# Full content of inputs and generated files, logged with --dump_content only
+CONTENT_LOGGER = logging.getLogger("content")
+# LogRecord attributes, remaining record attributes are extra fields
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """ Format records as one json object per line, extra fields included """
+
+    def format(self, record):
+        entry = {"time": round(record.created, 3), "level": record.levelname.lower(),
+                 "logger": record.name, "message": record.getMessage()}
+        entry.update({each_key: value for each_key, value in vars(record).items()
+                      if each_key not in RECORD_ATTRIBUTES})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def setup_logging(verbose=False, log_format="text", dump_content=False):
+    """ Configure logging of the scripts to stdout.
+    Info messages are always shown, --verbose adds debug summaries and
+    stage timings. Arguments are formatted only if the level is enabled.
+    :args: verbose (bool), log_format (text or json lines),
+           dump_content (bool, full inputs and generated files)
+    """
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonLinesFormatter() if log_format == "json" else logging.Formatter("%(message)s"))
+    root_logger = logging.getLogger()
+    root_logger.handlers = [handler]
+    root_logger.setLevel(logging.DEBUG if verbose or dump_content else logging.INFO)
+    CONTENT_LOGGER.setLevel(logging.DEBUG if dump_content else logging.INFO)
+
+
+def get_counts(values):
+    """ Return count per value, sorted by value """
+    counts = {}
+    for each_value in values:
+        counts[each_value] = counts.get(each_value, 0) + 1
+    return {each_value: counts[each_value] for each_value in sorted(counts, key=str)}
+
+
+def log_stage(logger, stage, start_time, **counts):
+    """ Log stage elapsed time and counts (debug), return current time.
+    :args: logger, stage (string), start_time (float, previous return value),
+           counts (keyword counts of the stage)
+    """
+    now = time.time()
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Stage %s completed in %.3fs%s", stage, now - start_time,
+                     "".join(" %s=%s" % each_count for each_count in counts.items()),
+                     extra={"stage": stage, "elapsed": round(now - start_time, 6), "counts": counts})
+    return now
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright IBM Corporation 2018
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+import types
+from scale_log import CONTENT_LOGGER
+
+try:
+    import yaml
+    # libyaml emitter when available, same output as the pure python one
+    YAML_DUMPER = getattr(yaml, "CDumper", yaml.Dumper)
+except ImportError:
+    # JSON writers do not need PyYAML
+    yaml = None
+
+LOGGER = logging.getLogger("scale_output")
+# Artifacts rendered in this run (path to content or writer, file mode)
+PENDING_ARTIFACTS = {}
+# Outputs of an earlier run, removed unless rendered again
+STALE_ARTIFACTS = set()
+ARTIFACT_WRITERS = 8
+ARTIFACT_MANIFEST = "artifact_manifest.json"
+
+
+def get_yaml_content(data):
+    """ Serialize data to block style yaml, returned as one string """
+    return yaml.dump(data, Dumper=YAML_DUMPER, default_flow_style=False)
+
+
+def write_json_stream(json_path, data):
+    """ Write dict to json file, list values one element per line.
+    Elements are encoded and written one at a time with the C encoder
+    (indented output falls back to the pure python encoder), hence large
+    node and disk lists are never encoded as one string. Generator values
+    are written as lists, their elements are built one at a time.
+    :args: json_path (string), data (dict)
+    """
+    encoder = json.JSONEncoder(separators=(", ", ": "))
+    with open(json_path, 'w') as json_fh:
+        json_fh.write("{")
+        for key_idx, (each_key, value) in enumerate(data.items()):
+            json_fh.write("%s\n    %s: " % ("," if key_idx else "", encoder.encode(each_key)))
+            if isinstance(value, (list, types.GeneratorType)):
+                item_idx = -1
+                for item_idx, each_item in enumerate(value):
+                    json_fh.write("%s\n        %s" % ("," if item_idx else "[", encoder.encode(each_item)))
+                json_fh.write("\n    ]" if item_idx >= 0 else "[]")
+            else:
+                json_fh.write(encoder.encode(value))
+        json_fh.write("\n}\n")
+
+
+def add_artifact(path, content=None, writer=None, mode=None):
+    """ Render an artifact, written by commit_artifacts.
+    :args: path (string), content (string) or writer (callable writing the
+           artifact to the path it is given), mode (file mode)
+    """
+    PENDING_ARTIFACTS[path] = (content, writer, mode)
+
+
+def get_pending_artifact(path):
+    """ Return rendered content of an artifact not written yet, None otherwise """
+    return PENDING_ARTIFACTS.get(path, (None, None, None))[0]
+
+
+def mark_stale(path):
+    """ Remove output of an earlier run unless it is rendered again """
+    STALE_ARTIFACTS.add(path)
+
+
+def get_file_hash(path):
+    """ Return sha256 of the file, None if it does not exist """
+    if not os.path.exists(path):
+        return None
+    file_hash = hashlib.sha256()
+    with open(path, 'rb') as file_fh:
+        for chunk in iter(lambda: file_fh.read(1024 * 1024), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def write_artifact(path, content=None, writer=None, mode=None):
+    """ Write artifact to a temp file and rename it in place.
+    An existing identical file is left untouched (mtime kept).
+    :return: sha256 (string), written (bool)
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = "%s.%s.tmp" % (path, os.getpid())
+    try:
+        if writer:
+            writer(temp_path)
+        else:
+            with open(temp_path, 'w') as file_fh:
+                file_fh.write(content)
+        new_hash = get_file_hash(temp_path)
+        if new_hash == get_file_hash(path) and \
+                (mode is None or os.stat(path).st_mode & 0o777 == mode):
+            os.remove(temp_path)
+            return new_hash, False
+        if mode is not None:
+            os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return new_hash, True
+
+
+def commit_artifacts(manifest_path=None, max_workers=ARTIFACT_WRITERS):
+    """ Write rendered artifacts concurrently, remove stale outputs.
+    Outputs listed in the previous manifest and not rendered in this run
+    are stale as well.
+    :args: manifest_path (string, records path and sha256 of every output)
+    :return: dict of path to written (bool)
+    """
+    if manifest_path and os.path.exists(manifest_path):
+        try:
+            with open(manifest_path) as manifest_fh:
+                STALE_ARTIFACTS.update(json.load(manifest_fh).get("artifacts", {}))
+        except (OSError, ValueError):
+            pass
+
+    for each_path, (content, _, _) in sorted(PENDING_ARTIFACTS.items()):
+        if content is not None:
+            CONTENT_LOGGER.debug("Content of %s:\n%s", each_path, content)
+
+    artifact_hashes, written = {}, {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(write_artifact, each_path, *details): each_path
+                   for each_path, details in PENDING_ARTIFACTS.items()}
+        for each_future in concurrent.futures.as_completed(futures):
+            artifact_hashes[futures[each_future]], written[futures[each_future]] = each_future.result()
+
+    removed = [each_path for each_path in STALE_ARTIFACTS - set(PENDING_ARTIFACTS) if os.path.exists(each_path)]
+    for each_path in removed:
+        os.remove(each_path)
+    LOGGER.debug("Artifacts: %s written, %s unchanged, %s stale removed",
+                 sum(written.values()), len(written) - sum(written.values()), len(removed),
+                 extra={"written": sum(written.values()), "unchanged": len(written) - sum(written.values()),
+                        "removed": len(removed)})
+
+    if manifest_path:
+        write_artifact(manifest_path, json.dumps(
+            {"artifacts": {each_path: artifact_hashes[each_path] for each_path in sorted(artifact_hashes)}},
+            indent=4) + "\n")
+    PENDING_ARTIFACTS.clear()
+    STALE_ARTIFACTS.clear()
+    return written
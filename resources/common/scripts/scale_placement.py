@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright IBM Corporation 2018
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import re
+
+# Number of nodes served by one manager node per workload profile. Metadata
+# heavy workloads put more load on token and filesystem managers.
+MANAGER_NODE_RATIO = {"default": 32, "metadata": 16, "throughput": 64}
+# Managers are assigned from quorum positions, hence capped at max quorum count.
+MAX_MANAGER_COUNT = 7
+# Estimated perfmon sensors reported per node and upper bound of federated collectors.
+SENSORS_PER_NODE = 20
+MAX_COLLECTOR_COUNT = 16
+# Quorum nodes used along with tiebreaker disks. The cluster stays up as
+# long as one quorum node and a majority of tiebreaker disks are reachable.
+TIEBREAKER_QUORUM_COUNT = 3
+# Quorum candidates probed for latency (all pairs), taken in placement order.
+LATENCY_PROBE_NODES = 32
+
+
+def get_quorum_count(total_node_count):
+    """ Determine total number of quorum nodes to be in the cluster """
+    if total_node_count < 4:
+        quorum_count = total_node_count
+    elif 4 <= total_node_count < 10:
+        quorum_count = 3
+    elif 10 <= total_node_count < 19:
+        quorum_count = 5
+    else:
+        quorum_count = 7
+    return quorum_count
+
+
+def get_tiebreaker_quorum_count(total_node_count):
+    """ Determine total number of quorum nodes with tiebreaker disks """
+    return min(total_node_count, TIEBREAKER_QUORUM_COUNT)
+
+
+def get_manager_count(total_node_count, workload_profile="default"):
+    """ Determine total number of manager nodes (min: 2, max: MAX_MANAGER_COUNT).
+    manager designates the node as part of the pool of nodes from which
+    file system managers and token managers are selected.
+    """
+    nodes_per_manager = MANAGER_NODE_RATIO.get(workload_profile,
+                                               MANAGER_NODE_RATIO["default"])
+    manager_count = -(-int(total_node_count) // nodes_per_manager)
+    return min(max(manager_count, 2), MAX_MANAGER_COUNT)
+
+
+def get_instance_weight(instance):
+    """ Return sort key representing instance shape (vcpus, memory) """
+    return (int(instance.get("vcpus") or 0), int(instance.get("memory_size") or 0))
+
+
+def get_subnet_zone(ip_address):
+    """ Derive zone identifier from subnet (third octet) of the ip address """
+    subnet = re.match(r'\d{1,3}\.\d{1,3}\.(\d{1,3})\.\d{1,3}', ip_address)
+    return subnet.group(1) if subnet else None
+
+
+def order_instances_by_zone(instances):
+    """ Order instances so that list position drives balanced role placement.
+    Instances are grouped by zone (first seen order), sorted largest shape
+    first within the zone and interleaved across zones. Quorum, manager and
+    GUI roles are assigned by position, hence every prefix of the result is
+    spread evenly across zones and prefers the largest instance shapes.
+    Instances flagged slow (pre-flight outliers) are moved to the end.
+    :args: instances (list of dict with private_ip, zone, optional vcpus/memory_size/slow)
+    :return: instances (list)
+    """
+    zone_instances, zone_list = {}, []
+    for each_instance in instances:
+        zone = each_instance.get("zone")
+        if zone not in zone_instances:
+            zone_instances[zone] = []
+            zone_list.append(zone)
+        zone_instances[zone].append(each_instance)
+
+    for zone in zone_list:
+        # sorted is stable, identical shapes keep the inventory order
+        zone_instances[zone] = sorted(zone_instances[zone],
+                                      key=get_instance_weight, reverse=True)
+
+    ordered_instances = []
+    max_len = max([len(each_zone) for each_zone in zone_instances.values()] or [0])
+    for idx in range(max_len):
+        for zone in zone_list:
+            if idx < len(zone_instances[zone]):
+                ordered_instances.append(zone_instances[zone][idx])
+    return [each_instance for each_instance in ordered_instances if not each_instance.get("slow")] + \
+        [each_instance for each_instance in ordered_instances if each_instance.get("slow")]
+
+
+def get_latency_candidates(instances, probe_count=LATENCY_PROBE_NODES):
+    """ Return instances probed for latency, first positions in placement order.
+    Instances are expected zone interleaved (order_instances_by_zone), any
+    prefix is spread across zones. Slow instances are left out.
+    :args: instances (list of dict), probe_count (int)
+    """
+    return [each_instance for each_instance in instances if not each_instance.get("slow")][:probe_count]
+
+
+def get_link(latency_matrix, node_a, node_b):
+    """ Return worst direction (rtt ms, bandwidth mbps) between two nodes.
+    :args: latency_matrix (dict of node to dict of peer to dict with rtt_ms,
+           optional mbps), node_a, node_b (string)
+    :return: (rtt, mbps) or None if the pair is not measured
+    """
+    links = [each_link for each_link in [latency_matrix.get(node_a, {}).get(node_b),
+                                          latency_matrix.get(node_b, {}).get(node_a)] if each_link]
+    if not links:
+        return None
+    return max(each_link["rtt_ms"] for each_link in links), \
+        min(each_link.get("mbps") or float("inf") for each_link in links)
+
+
+def get_worst_latency(latency_matrix, nodes):
+    """ Return worst pairwise (rtt ms, mbps) of the nodes, None if a pair is not measured """
+    worst_rtt, worst_mbps = 0.0, float("inf")
+    for idx, node_a in enumerate(nodes):
+        for node_b in nodes[idx + 1:]:
+            link = get_link(latency_matrix, node_a, node_b)
+            if link is None:
+                return None
+            worst_rtt, worst_mbps = max(worst_rtt, link[0]), min(worst_mbps, link[1])
+    return worst_rtt, worst_mbps
+
+
+def order_instances_by_latency(instances, latency_matrix, quorum_count, fixed_quorum=()):
+    """ Move the quorum set with the lowest worst-case latency to the front.
+    Quorum, manager and GUI roles are assigned by position. The zone spread
+    of the first quorum_count positions (order_instances_by_zone) is kept:
+    the set takes as many nodes per zone as the prefix it replaces. Sets
+    are built greedily from every measured seed node, lowest worst RTT wins
+    (higher worst bandwidth on a tie). The chosen nodes are ordered by their
+    worst RTT to the other quorum nodes, managers and GUI are the most
+    central ones. Instances stay as is if no complete set is measured.
+    :args: instances (list of dict with private_ip, zone, ordered),
+           latency_matrix (dict, see get_link), quorum_count (int, quorum
+           positions of the instances), fixed_quorum (list of ips of other
+           quorum nodes, ex: descOnly node)
+    :return: instances (list)
+    """
+    quorum_count = min(quorum_count, len(instances))
+    if quorum_count <= 0:
+        return instances
+    zone_quota = {}
+    for each_instance in instances[:quorum_count]:
+        zone_quota[each_instance.get("zone")] = zone_quota.get(each_instance.get("zone"), 0) + 1
+    candidates = [each_instance for each_instance in instances
+                  if not each_instance.get("slow") and each_instance["private_ip"] in latency_matrix]
+
+    best_score, best_set = None, None
+    for seed in candidates:
+        if not zone_quota.get(seed.get("zone")):
+            continue
+        chosen, chosen_ips, quota = [seed], {seed["private_ip"]}, dict(zone_quota)
+        quota[seed.get("zone")] -= 1
+        worst = get_worst_latency(latency_matrix, list(fixed_quorum) + [seed["private_ip"]])
+        while worst is not None and len(chosen) < quorum_count:
+            next_score, next_instance = None, None
+            for each_instance in candidates:
+                if each_instance["private_ip"] in chosen_ips or not quota.get(each_instance.get("zone")):
+                    continue
+                links = [get_link(latency_matrix, each_instance["private_ip"], each_ip)
+                         for each_ip in list(fixed_quorum) + [each_chosen["private_ip"] for each_chosen in chosen]]
+                if None in links:
+                    continue
+                score = (max([worst[0]] + [each_link[0] for each_link in links]),
+                         -min([worst[1]] + [each_link[1] for each_link in links]))
+                if next_score is None or score < next_score:
+                    next_score, next_instance = score, each_instance
+            if next_instance is None:
+                worst = None
+                break
+            chosen.append(next_instance)
+            chosen_ips.add(next_instance["private_ip"])
+            quota[next_instance.get("zone")] -= 1
+            worst = (next_score[0], -next_score[1])
+        if worst is not None and (best_score is None or (worst[0], -worst[1]) < best_score):
+            best_score, best_set = (worst[0], -worst[1]), chosen
+    if best_set is None:
+        return instances
+
+    quorum_ips = list(fixed_quorum) + [each_instance["private_ip"] for each_instance in best_set]
+    best_set = sorted(best_set, key=lambda instance: max(
+        [get_link(latency_matrix, instance["private_ip"], each_ip)[0]
+         for each_ip in quorum_ips if each_ip != instance["private_ip"]] or [0]))
+    return best_set + [each_instance for each_instance in instances if each_instance["private_ip"] not in quorum_ips]
+
+
+def get_zone_loss_violations(quorum_zones):
+    """ Return zones whose loss leaves quorum without majority.
+    :args: quorum_zones (list of zone per quorum node)
+    """
+    majority = len(quorum_zones) // 2 + 1
+    violations = []
+    for zone in sorted(set(quorum_zones), key=str):
+        if len(quorum_zones) - quorum_zones.count(zone) < majority:
+            violations.append(zone)
+    return violations
+
+
+def get_collector_count(total_node_count, sensors_per_collector):
+    """ Determine perfmon collector count (min: 2) from estimated sensor count """
+    sensor_count = int(total_node_count) * SENSORS_PER_NODE
+    collector_count = -(-sensor_count // int(sensors_per_collector))
+    return min(max(collector_count, 2), MAX_COLLECTOR_COUNT)
+
+
+def get_zone_round_robin(positions, zones):
+    """ Return positions taking one per zone in turn (zones in first seen order).
+    :args: positions (list), zones (list of zone per position of the tier)
+    """
+    zone_positions, zone_list = {}, []
+    for each_position in positions:
+        zone = zones[each_position]
+        if zone not in zone_positions:
+            zone_positions[zone] = []
+            zone_list.append(zone)
+        zone_positions[zone].append(each_position)
+    ordered_positions = []
+    for idx in range(max([len(each_zone) for each_zone in zone_positions.values()] or [0])):
+        for zone in zone_list:
+            if idx < len(zone_positions[zone]):
+                ordered_positions.append(zone_positions[zone][idx])
+    return ordered_positions
+
+
+def get_collector_positions(zones, manager_count, collector_count):
+    """ Return positions of perfmon collectors in the ordered instance list.
+    Collectors are taken round-robin per zone from non-manager positions,
+    hence the loss of one zone leaves collectors in the others. Manager
+    positions are used next, position 0 (quorum, manager and GUI) only if
+    nothing else is available.
+    :args: zones (list of zone per ordered instance, None without zones),
+           manager_count (int), collector_count (int)
+    """
+    instance_count = len(zones)
+    candidates = get_zone_round_robin(list(range(manager_count, instance_count)), zones) + \
+        get_zone_round_robin(list(range(1, min(manager_count, instance_count))), zones) + \
+        [0][:instance_count]
+    return set(candidates[:collector_count])
+
+
+def get_perfmon_federation_details(collector_nodes):
+    """ Return perfmon collector federation settings.
+    Sensors report to every collector candidate, colRedundancy keeps each
+    metric on two collectors so losing one collector does not lose data.
+    :args: collector_nodes (list)
+    """
+    return {'scale_zimon_collectors': ",".join(collector_nodes),
+            'scale_zimon_col_redundancy': min(len(collector_nodes), 2)}
+
+
+def relocate_gui_roles(nodes, role_keys, dedicated_nodes=None):
+    """ Move GUI, admin and collector roles off the quorum/manager node.
+    The roles move to the first dedicated GUI node if provided, otherwise to
+    the first non-quorum, non-manager node of the same node class.
+    :args: nodes (list of dict), role_keys (dict of role name to node key),
+           dedicated_nodes (list of dict, appended to nodes)
+    :return: gui node (dict) or None if the roles could not be moved
+    """
+    gui_nodes = [each_node for each_node in nodes if each_node[role_keys['gui']]]
+    if not gui_nodes:
+        return None
+    gui_node = gui_nodes[0]
+    if not gui_node[role_keys['quorum']] and not gui_node[role_keys['manager']]:
+        return gui_node
+
+    if dedicated_nodes:
+        target_node = dedicated_nodes[0]
+    else:
+        candidates = [each_node for each_node in nodes
+                      if each_node[role_keys['class']] == gui_node[role_keys['class']] and
+                      not each_node[role_keys['quorum']] and not each_node[role_keys['manager']]]
+        if not candidates:
+            return None
+        target_node = candidates[0]
+
+    # Keep collector count unchanged when the target already hosts a collector
+    if not target_node[role_keys['collector']]:
+        gui_node[role_keys['collector']] = False
+    gui_node[role_keys['gui']] = False
+    gui_node[role_keys['admin']] = False
+    target_node[role_keys['gui']] = True
+    target_node[role_keys['admin']] = True
+    target_node[role_keys['collector']] = True
+    return target_node
+
+
+def promote_managers(nodes, role_keys, manager_count):
+    """ Add non-quorum nodes to the manager pool up to manager_count.
+    Managers are normally taken from quorum positions. With a small quorum
+    (tiebreaker disks) the remaining managers are taken, in placement order,
+    from non-quorum nodes of the same node class as the existing managers.
+    :args: nodes (list of dict), role_keys (dict of role name to node key),
+           manager_count (int)
+    """
+    managers = [each_node for each_node in nodes if each_node[role_keys['manager']]]
+    if not managers:
+        return
+    for each_node in nodes:
+        if len(managers) >= manager_count:
+            break
+        if not each_node[role_keys['manager']] and not each_node[role_keys['quorum']] and \
+                each_node[role_keys['class']] == managers[0][role_keys['class']]:
+            each_node[role_keys['manager']] = True
+            managers.append(each_node)
+
+
+def get_zone_labels(zone_ids, availability_zones):
+    """ Map zone identifiers to availability zone names.
+    Subnet derived identifiers are mapped to availability zones in first
+    seen order when the counts match, otherwise identifiers are kept.
+    :args: zone_ids (list, None if zone is unknown), availability_zones (list)
+    :return: zone labels (dict of zone id to label)
+    """
+    zone_list = []
+    for zone in zone_ids:
+        if zone is not None and zone not in zone_list:
+            zone_list.append(zone)
+    if not zone_list:
+        return {None: availability_zones[0]} if len(availability_zones) == 1 else {}
+    if len(zone_list) == len(availability_zones):
+        return dict(zip(zone_list, availability_zones))
+    return {zone: zone for zone in zone_list}
+
+
+def get_zone_nodeclass(node_class, zone):
+    """ Return zone scoped node class name (ex: computenodegrp_us-east-1a) """
+    return "%s_%s" % (node_class, re.sub(r'[^A-Za-z0-9_-]', '_', str(zone)))
+
+
+def get_zone_config_details(zone_classes, zone_overrides):
+    """ Return scale_config entries for zone scoped node classes.
+    Parameters under "*" apply to every zone, zone specific ones win.
+    :args: zone_classes (dict of node class to zone),
+           zone_overrides (dict of zone to dict of param to value)
+    """
+    scale_config = []
+    for node_class, zone in zone_classes.items():
+        params = dict(zone_overrides.get("*", {}))
+        params.update(zone_overrides.get(zone, {}))
+        if params:
+            scale_config.append({"nodeclass": node_class,
+                                 "params": [{param_key: param_value}
+                                            for param_key, param_value in params.items()]})
+    return scale_config
+
+
+def get_ces_groups(protocol_nodes, ces_ips):
+    """ Allocate CES (export) IPs evenly among protocol nodes, grouped by subnet.
+    A CES IP can only move between nodes of its subnet (cloud secondary
+    address), protocol nodes of a subnet form a CES group. Every IP goes to
+    the group of its subnet and there to the node with the fewest IPs, node
+    IP counts within a group differ by one at most.
+    :args: protocol_nodes (list of dict with name, ip, zone, placement order),
+           ces_ips (list)
+    :return: groups (list of dict with group_name, node_list, export_ip_pool),
+             node_ips (dict of node name to list of CES ips),
+             unplaced_ips (list of CES ips without protocol node in their subnet)
+    """
+    subnet_nodes, subnet_list = {}, []
+    for each_node in protocol_nodes:
+        subnet = get_subnet_zone(each_node["ip"])
+        if subnet not in subnet_nodes:
+            subnet_nodes[subnet] = []
+            subnet_list.append(subnet)
+        subnet_nodes[subnet].append(each_node)
+
+    node_ips = {each_node["name"]: [] for each_node in protocol_nodes}
+    unplaced_ips = []
+    for each_ip in ces_ips:
+        nodes = subnet_nodes.get(get_subnet_zone(each_ip))
+        if not nodes:
+            unplaced_ips.append(each_ip)
+            continue
+        # min keeps the first node on a tie, placement order breaks ties
+        node = min(nodes, key=lambda each_node: len(node_ips[each_node["name"]]))
+        node_ips[node["name"]].append(each_ip)
+
+    groups, group_names = [], set()
+    for subnet in subnet_list:
+        group_name = get_zone_nodeclass("ces", subnet_nodes[subnet][0].get("zone") or subnet)
+        if group_name in group_names:
+            group_name = "%s_%s" % (group_name, subnet)
+        group_names.add(group_name)
+        groups.append({"group_name": group_name,
+                       "node_list": [each_node["name"] for each_node in subnet_nodes[subnet]],
+                       "export_ip_pool": [each_ip for each_node in subnet_nodes[subnet]
+                                          for each_ip in node_ips[each_node["name"]]]})
+    return groups, node_ips, unplaced_ips
+
+
+def get_install_shards(instances, shard_count):
+    """ Split instances into install shards grouped by zone.
+    Instances are ordered by zone (first seen order) and each shard takes
+    a contiguous slice, hence a shard spans as few zones as possible.
+    :args: instances (list of dict with name, zone), shard_count (int)
+    :return: shards (list of list of names)
+    """
+    zone_list = []
+    for each_instance in instances:
+        if each_instance.get("zone") not in zone_list:
+            zone_list.append(each_instance.get("zone"))
+    ordered = sorted(instances, key=lambda instance: zone_list.index(instance.get("zone")))
+    shard_size = -(-len(ordered) // max(int(shard_count), 1)) if ordered else 1
+    return [[each_instance["name"] for each_instance in ordered[idx:idx + shard_size]]
+            for idx in range(0, len(ordered), shard_size)]
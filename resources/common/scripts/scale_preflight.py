@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright IBM Corporation 2018
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+
+# Data read from every device (MiB) and network probe duration (seconds)
+PREFLIGHT_READ_MB = 512
+PREFLIGHT_PROBE_SECONDS = 5
+PREFLIGHT_PROBE_PORT = 5201
+# Results below this fraction of the median of their group are outliers
+OUTLIER_THRESHOLD = 0.7
+PREFLIGHT_RESULTS_DIR = "preflight"
+PREFLIGHT_REPORT = "preflight_report.json"
+# Echo requests per peer of the latency probe (0.2s apart)
+LATENCY_PING_COUNT = 10
+LATENCY_RESULTS_DIR = "latency"
+LATENCY_MATRIX = "latency_matrix.json"
+
+
+def get_preflight_nodes(host_names, disk_map):
+    """ Prepare per host pre-flight details.
+    Every NSD server probes the next one (ring), hence each NIC is measured
+    sending and receiving while all probes run in parallel.
+    :args: host_names (dict of ip to inventory host, ordered),
+           disk_map (dict of ip to list of (device, volume type))
+    :return: dict of inventory host to dict with ip, devices, types, peer
+    """
+    nsd_ips = [each_ip for each_ip in host_names if disk_map.get(each_ip)]
+    preflight_nodes = {}
+    for each_ip, each_host in host_names.items():
+        devices = disk_map.get(each_ip, [])
+        peer = None
+        if each_ip in nsd_ips and len(nsd_ips) > 1:
+            peer = nsd_ips[(nsd_ips.index(each_ip) + 1) % len(nsd_ips)]
+        preflight_nodes[each_host] = {"ip": each_ip,
+                                      "devices": [each_device for each_device, _ in devices],
+                                      "types": {each_device: volume_type for each_device, volume_type in devices},
+                                      "peer": peer}
+    return preflight_nodes
+
+
+def prepare_preflight_playbook(hosts_config, preflight_nodes, report_script,
+                               read_mb=PREFLIGHT_READ_MB, probe_seconds=PREFLIGHT_PROBE_SECONDS):
+    """ Write to playbook, pre-flight disk read and network probes """
+    content = """---
+# Pre-flight: read test on every NSD device (direct I/O, read only) and
+# network throughput between NSD servers, run in parallel across hosts
+- name: Pre-flight disk and network probes
+  hosts: {hosts_config}
+  gather_facts: false
+  vars:
+    preflight_nodes: {preflight_nodes}
+    node: "{{{{ preflight_nodes[inventory_hostname] | default({{'ip': inventory_hostname, 'devices': [], 'types': {{}}, 'peer': none}}) }}}}"
+  tasks:
+  - name: Create pre-flight results directory
+    file:
+      path: "{{{{ playbook_dir }}}}/{results_dir}"
+      state: directory
+    delegate_to: localhost
+    run_once: true
+
+  - name: Read NSD devices
+    shell: start=$(date +%s%N); dd if={{{{ item }}}} of=/dev/null bs=1M count={read_mb} iflag=direct status=none && end=$(date +%s%N) && awk -v s=$start -v e=$end 'BEGIN {{ printf "%.1f", {read_mb} * 1000000000 / (e - s) }}'
+    loop: "{{{{ node.devices }}}}"
+    register: disk_read
+    failed_when: false
+
+  - name: Start network probe server
+    shell: iperf3 -s -D -1 -p {probe_port}
+    register: probe_server
+    failed_when: false
+    when: node.peer
+
+  - name: Probe network throughput to peer
+    shell: iperf3 -c {{{{ node.peer }}}} -p {probe_port} -t {probe_seconds} -J
+    register: net_probe
+    failed_when: false
+    when: node.peer
+
+  - name: Save pre-flight results
+    copy:
+      content: "{{{{ {{'ip': node.ip, 'types': node.types, 'peer': node.peer, 'disks': dict(disk_read.results | default([]) | map(attribute='item') | zip(disk_read.results | default([]) | map(attribute='stdout') | map('default', ''))), 'network': (((net_probe.stdout | from_json).end.sum_received.bits_per_second / 1000000) | round(1)) if (net_probe.rc | default(1)) == 0 else none}} | to_json }}}}"
+      dest: "{{{{ playbook_dir }}}}/{results_dir}/{{{{ node.ip }}}}.json"
+    delegate_to: localhost
+
+- name: Pre-flight report
+  hosts: localhost
+  gather_facts: false
+  connection: local
+  tasks:
+  - name: Flag slow devices and hosts
+    command: python3 {report_script} --results_dir {{{{ playbook_dir }}}}/{results_dir} --report_path {{{{ playbook_dir }}}}/{report}
+    register: preflight_report
+
+  - name: Show pre-flight report
+    debug:
+      var: preflight_report.stdout_lines
+""".format(hosts_config=hosts_config, preflight_nodes=json.dumps(preflight_nodes),
+           report_script=report_script, read_mb=read_mb, probe_seconds=probe_seconds,
+           probe_port=PREFLIGHT_PROBE_PORT, results_dir=PREFLIGHT_RESULTS_DIR, report=PREFLIGHT_REPORT)
+    return content
+
+
+def prepare_preflight_inventory(host_names, user, key_file, ssh_common_args=""):
+    """ Write to inventory, NSD servers for the pre-flight playbook """
+    content = "[scale_nodes]\n"
+    for each_ip, each_host in host_names.items():
+        content = content + "%s ansible_host=%s ansible_user=%s ansible_ssh_private_key_file=%s " \
+            "ansible_python_interpreter=/usr/bin/python3 ansible_ssh_common_args=%s\n" % (
+                each_host, each_ip, user, key_file, ssh_common_args)
+    return content
+
+
+def get_latency_nodes(host_names):
+    """ Prepare per host latency probe details, every host probes all others.
+    :args: host_names (dict of ip to inventory host)
+    :return: dict of inventory host to dict with ip, peers (list of ips)
+    """
+    return {each_host: {"ip": each_ip, "peers": [peer_ip for peer_ip in host_names if peer_ip != each_ip]}
+            for each_ip, each_host in host_names.items()}
+
+
+def prepare_latency_playbook(hosts_config, latency_nodes, matrix_script, ping_count=LATENCY_PING_COUNT):
+    """ Write to playbook, round trip time probes between quorum candidates """
+    content = """---
+# Latency probe: every quorum candidate pings all other candidates, hosts
+# probe in parallel, the matrix drives latency aware quorum placement
+- name: Latency probes between quorum candidates
+  hosts: {hosts_config}
+  gather_facts: false
+  vars:
+    latency_nodes: {latency_nodes}
+    node: "{{{{ latency_nodes[inventory_hostname] }}}}"
+  tasks:
+  - name: Create latency results directory
+    file:
+      path: "{{{{ playbook_dir }}}}/{results_dir}"
+      state: directory
+    delegate_to: localhost
+    run_once: true
+
+  - name: Probe round trip time to peers
+    shell: ping -c {ping_count} -i 0.2 -q {{{{ item }}}} | awk -F/ '/^rtt/ {{ print $5 }}'
+    loop: "{{{{ node.peers }}}}"
+    register: rtt_probe
+    failed_when: false
+
+  - name: Save latency results
+    copy:
+      content: "{{{{ {{'ip': node.ip, 'rtt': dict(rtt_probe.results | map(attribute='item') | zip(rtt_probe.results | map(attribute='stdout') | map('default', '')))}} | to_json }}}}"
+      dest: "{{{{ playbook_dir }}}}/{results_dir}/{{{{ node.ip }}}}.json"
+    delegate_to: localhost
+
+- name: Latency matrix
+  hosts: localhost
+  gather_facts: false
+  connection: local
+  tasks:
+  - name: Build latency matrix
+    command: python3 {matrix_script} --latency_dir {{{{ playbook_dir }}}}/{results_dir} --latency_matrix_path {{{{ playbook_dir }}}}/{matrix}
+    register: latency_matrix
+
+  - name: Show latency matrix summary
+    debug:
+      var: latency_matrix.stdout_lines
+""".format(hosts_config=hosts_config, latency_nodes=json.dumps(latency_nodes), matrix_script=matrix_script,
+           ping_count=ping_count, results_dir=LATENCY_RESULTS_DIR, matrix=LATENCY_MATRIX)
+    return content
+
+
+def build_latency_matrix(results):
+    """ Build latency matrix from per host probe results, unreachable peers are left out.
+    :args: results (list of dict with ip, rtt (dict of peer ip to average ms))
+    :return: dict of ip to dict of peer ip to dict with rtt_ms
+    """
+    matrix = {}
+    for each_result in results:
+        for peer_ip, value in each_result.get("rtt", {}).items():
+            if to_float(value) is not None:
+                matrix.setdefault(each_result["ip"], {})[peer_ip] = {"rtt_ms": to_float(value)}
+    return matrix
+
+
+def read_latency_matrix(matrix_path):
+    """ Read latency matrix (probe output or supplied file).
+    Entries are rtt in ms or dict with rtt_ms and optional mbps.
+    :return: dict of node to dict of peer to dict with rtt_ms, mbps
+    """
+    with open(matrix_path) as json_fh:
+        matrix = json.load(json_fh)
+    latency_matrix = {}
+    for each_node, peers in matrix.items():
+        for peer, link in peers.items():
+            link = link if isinstance(link, dict) else {"rtt_ms": link}
+            if to_float(link.get("rtt_ms")) is not None:
+                latency_matrix.setdefault(each_node, {})[peer] = {"rtt_ms": to_float(link["rtt_ms"]),
+                                                                  "mbps": to_float(link.get("mbps"))}
+    return latency_matrix
+
+
+def to_float(value):
+    """ Convert measured value to float (None if not measured) """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def get_outliers(values, threshold=OUTLIER_THRESHOLD):
+    """ Return keys whose value is below threshold times the median.
+    Unmeasured (None) values are left out of the median and not flagged.
+    :args: values (dict of key to float or None), threshold (float)
+    """
+    measured = {each_key: value for each_key, value in values.items() if value is not None}
+    if len(measured) < 2:
+        return []
+    median = statistics.median(measured.values())
+    return sorted(each_key for each_key, value in measured.items() if value < median * threshold)
+
+
+def build_preflight_report(results, threshold=OUTLIER_THRESHOLD):
+    """ Build pre-flight report from per host results.
+    Devices are compared with devices of the same volume type. A host is
+    slow if both its probe to the peer and the probe it receives are
+    outliers, a single slow probe flags both of its ends.
+    :args: results (list of dict with ip, types, peer, disks, network)
+    :return: report (dict)
+    """
+    device_groups, network = {}, {}
+    for each_result in results:
+        for each_device, value in each_result.get("disks", {}).items():
+            volume_type = each_result.get("types", {}).get(each_device)
+            device_groups.setdefault(volume_type, {})[(each_result["ip"], each_device)] = \
+                to_float(value) if value != "" else 0.0
+        if each_result.get("peer"):
+            network[each_result["ip"]] = to_float(each_result.get("network"))
+
+    slow_devices = {}
+    for volume_type, values in device_groups.items():
+        for each_ip, each_device in get_outliers(values, threshold):
+            slow_devices.setdefault(each_ip, []).append(each_device)
+
+    peers = {each_result["ip"]: each_result.get("peer") for each_result in results}
+    slow_probes = set(get_outliers(network, threshold))
+    # Host sending and receiving slowly is at fault, otherwise both ends
+    slow_hosts = set(each_ip for each_ip in slow_probes
+                     if any(peer == each_ip and sender in slow_probes for sender, peer in peers.items()))
+    for each_ip in slow_probes:
+        if each_ip not in slow_hosts and peers[each_ip] not in slow_hosts:
+            slow_hosts.update([each_ip, peers[each_ip]])
+
+    return {"disks": {"%s:%s" % each_key: value for values in device_groups.values()
+                      for each_key, value in values.items()},
+            "network": network,
+            "slow_devices": slow_devices,
+            "slow_hosts": sorted(slow_hosts)}
+
+
+def read_preflight_report(report_path):
+    """ Read pre-flight report.
+    :return: slow hosts (set of ip), slow devices (dict of ip to set of devices)
+    """
+    with open(report_path) as json_fh:
+        report = json.load(json_fh)
+    return set(report.get("slow_hosts", [])), \
+        {each_ip: set(devices) for each_ip, devices in report.get("slow_devices", {}).items()}
+
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser(description='Build pre-flight report from disk and network probe '
+                                                 'results, flags outliers. Builds latency matrix from '
+                                                 'latency probe results.')
+    PARSER.add_argument('--results_dir',
+                        help='directory of per host result json files')
+    PARSER.add_argument('--report_path',
+                        help='report json file to write')
+    PARSER.add_argument('--threshold', default=OUTLIER_THRESHOLD, type=float,
+                        help='fraction of the median below which results are flagged')
+    PARSER.add_argument('--latency_dir',
+                        help='directory of per host latency probe json files')
+    PARSER.add_argument('--latency_matrix_path',
+                        help='latency matrix json file to write')
+    ARGUMENTS = PARSER.parse_args()
+
+    if ARGUMENTS.latency_dir:
+        if not ARGUMENTS.latency_matrix_path:
+            PARSER.error("--latency_matrix_path is required along with --latency_dir")
+        RESULTS = []
+        for each_file in sorted(glob.glob(os.path.join(ARGUMENTS.latency_dir, "*.json"))):
+            with open(each_file) as result_fh:
+                RESULTS.append(json.load(result_fh))
+        MATRIX = build_latency_matrix(RESULTS)
+        with open(ARGUMENTS.latency_matrix_path, 'w') as matrix_fh:
+            json.dump(MATRIX, matrix_fh, indent=4)
+        RTTS = [link["rtt_ms"] for peers in MATRIX.values() for link in peers.values()]
+        print("Latency matrix: %s nodes, %s pairs measured%s" % (
+            len(MATRIX), len(RTTS), ", worst rtt %.3f ms" % max(RTTS) if RTTS else ""))
+        sys.exit(0)
+    if not ARGUMENTS.results_dir or not ARGUMENTS.report_path:
+        PARSER.error("--results_dir and --report_path are required")
+
+    RESULTS = []
+    for each_file in sorted(glob.glob(os.path.join(ARGUMENTS.results_dir, "*.json"))):
+        with open(each_file) as result_fh:
+            RESULTS.append(json.load(result_fh))
+
+    REPORT = build_preflight_report(RESULTS, ARGUMENTS.threshold)
+    with open(ARGUMENTS.report_path, 'w') as report_fh:
+        json.dump(REPORT, report_fh, indent=4)
+
+    for each_ip, devices in sorted(REPORT["slow_devices"].items()):
+        print("Slow devices on %s: %s" % (each_ip, ", ".join(devices)))
+    for each_ip in REPORT["slow_hosts"]:
+        print("Slow network on %s" % each_ip)
+    if not REPORT["slow_devices"] and not REPORT["slow_hosts"]:
+        print("No outliers found.")
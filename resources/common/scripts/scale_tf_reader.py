@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright IBM Corporation 2018
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+# Bytes read from the inventory file at a time
+CHUNK_SIZE = 1024 * 1024
+# Smaller inventories are decoded by json.load, faster while memory is no
+# concern. From ~10 MiB on the incremental reader halves peak memory.
+STREAM_THRESHOLD = 8 * 1024 * 1024
+# Strings up to this length (zones, pools, volume types) are shared
+INTERN_MAX_LENGTH = 64
+WHITESPACE = " \t\n\r"
+NUMBER_CHARACTERS = "0123456789.eE+-"
+
+
+def intern_pairs(pairs):
+    """ Build object with interned keys and short string values.
+    Elements are decoded one at a time, hence the decoder key memo is not
+    shared across elements; interning keeps one copy of repeated strings.
+    """
+    return {sys.intern(each_key): sys.intern(value) if isinstance(value, str) and len(value) <= INTERN_MAX_LENGTH
+            else value for each_key, value in pairs}
+
+
+def iter_json_object(json_fh, chunk_size=CHUNK_SIZE):
+    """ Incrementally decode a json object from a file.
+    Top level arrays and objects are decoded one element at a time from a
+    bounded buffer, the file content is never held as one string.
+    :args: json_fh (text file object), chunk_size (int)
+    :return: generator of (top level key, value)
+    """
+    decoder = json.JSONDecoder(object_pairs_hook=intern_pairs)
+    state = {"buf": "", "pos": 0, "eof": False}
+
+    def fill():
+        """ Read next chunk, drop consumed content """
+        if state["eof"]:
+            return False
+        chunk = json_fh.read(chunk_size)
+        state["buf"] = state["buf"][state["pos"]:] + chunk
+        state["pos"] = 0
+        state["eof"] = not chunk
+        return bool(chunk)
+
+    def peek():
+        """ Return next non whitespace character ("" at end of file) """
+        while True:
+            buf, pos = state["buf"], state["pos"]
+            while pos < len(buf) and buf[pos] in WHITESPACE:
+                pos += 1
+            state["pos"] = pos
+            if pos < len(buf):
+                return buf[pos]
+            if not fill():
+                return ""
+
+    def expect(character):
+        """ Consume expected character """
+        if peek() != character:
+            raise json.JSONDecodeError("Expecting '%s'" % character, state["buf"], state["pos"])
+        state["pos"] += 1
+
+    def decode():
+        """ Decode next value, read more when it is cut at the buffer end """
+        peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(state["buf"], state["pos"])
+                # A number may continue in the next chunk
+                if state["eof"] or (end < len(state["buf"]) and state["buf"][end] not in NUMBER_CHARACTERS):
+                    state["pos"] = end
+                    return value
+            except json.JSONDecodeError:
+                if state["eof"]:
+                    raise
+            fill()
+
+    def iter_items(closing):
+        """ Yield elements of an array or (key, value) of an object """
+        if peek() == closing:
+            state["pos"] += 1
+            return
+        while True:
+            if closing == "}":
+                each_key = decode()
+                expect(":")
+                yield sys.intern(each_key), decode()
+            else:
+                yield decode()
+            if peek() == closing:
+                state["pos"] += 1
+                return
+            expect(",")
+
+    def expect_end():
+        """ Consume closing brace, only whitespace may follow """
+        expect("}")
+        if peek() != "":
+            raise json.JSONDecodeError("Extra data", state["buf"], state["pos"])
+
+    expect("{")
+    if peek() == "}":
+        expect_end()
+        return
+    while True:
+        each_key = decode()
+        expect(":")
+        opening = peek()
+        if opening == "[":
+            state["pos"] += 1
+            yield sys.intern(each_key), list(iter_items("]"))
+        elif opening == "{":
+            state["pos"] += 1
+            yield sys.intern(each_key), dict(iter_items("}"))
+        else:
+            yield sys.intern(each_key), decode()
+        if peek() == "}":
+            expect_end()
+            return
+        expect(",")
+
+
+def load_json_stream(json_fh, chunk_size=CHUNK_SIZE, stream_threshold=STREAM_THRESHOLD):
+    """ Load a json object from a file, incrementally (see iter_json_object)
+    from stream_threshold bytes on, by json.load below it.
+    :raises: ValueError (json.JSONDecodeError) on invalid json or trailing data
+    """
+    try:
+        file_size = os.fstat(json_fh.fileno()).st_size
+    except (AttributeError, OSError, ValueError):
+        file_size = stream_threshold
+    if file_size < stream_threshold:
+        return json.load(json_fh)
+    return dict(iter_json_object(json_fh, chunk_size))
+
+
+def measure(loader, json_path):
+    """ Return run time (seconds) and peak traced memory (bytes) of loader """
+    tracemalloc.start()
+    start = time.time()
+    with open(json_path) as json_fh:
+        loader(json_fh)
+    elapsed = time.time() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser(description='Benchmark incremental terraform inventory reader '
+                                                 'against json.load.')
+    PARSER.add_argument('--tf_inv_path', required=True,
+                        help='Terraform inventory file path')
+    ARGUMENTS = PARSER.parse_args()
+
+    with open(ARGUMENTS.tf_inv_path) as check_fh:
+        if load_json_stream(check_fh, stream_threshold=0) != json.load(open(ARGUMENTS.tf_inv_path)):
+            print("Incremental reader result differs from json.load.")
+            sys.exit(1)
+    print("Inventory size: %.1f MiB" % (os.path.getsize(ARGUMENTS.tf_inv_path) / 1048576.0))
+    for loader_name, loader in [("json.load", json.load),
+                                ("incremental", lambda json_fh: load_json_stream(json_fh, stream_threshold=0))]:
+        ELAPSED, PEAK = measure(loader, ARGUMENTS.tf_inv_path)
+        print("%-12s %.2fs, peak memory %.1f MiB" % (loader_name, ELAPSED, PEAK / 1048576.0))
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright IBM Corporation 2018
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prepare_remote_mount_inv import get_mount_filesystems, get_mount_waves, \
+    prepare_mount_wave_coordinator  # noqa: E402
+
+COMP_TF = {"compute_cluster_filesystem_mountpoint": "/gpfs/fs1"}
+STRG_TF = {"storage_cluster_filesystem_mountpoint": "/gpfs/data"}
+
+
+def get_pairing(compute_gui_ip, storage_gui_ip):
+    """ Return mount details of one pairing """
+    return {"compute_gui_ip": compute_gui_ip, "storage_gui_ip": storage_gui_ip}
+
+
+class MountWaveTest(unittest.TestCase):
+    """ Grouping of remote mount pairings into concurrent waves """
+
+    def test_independent_pairings_share_a_wave(self):
+        waves = get_mount_waves({"remote_mount_1": get_pairing("10.0.1.5", "10.0.2.5"),
+                                 "remote_mount_2": get_pairing("10.0.1.6", "10.0.2.6")})
+        self.assertEqual(waves, [["remote_mount_1", "remote_mount_2"]])
+
+    def test_shared_cluster_keeps_order(self):
+        waves = get_mount_waves({"remote_mount_1": get_pairing("10.0.1.5", "10.0.2.5"),
+                                 "remote_mount_2": get_pairing("10.0.1.6", "10.0.2.6"),
+                                 "remote_mount_3": get_pairing("10.0.1.5", "10.0.2.6"),
+                                 "remote_mount_4": get_pairing("10.0.1.7", "10.0.2.5")})
+        self.assertEqual(waves, [["remote_mount_1", "remote_mount_2"], ["remote_mount_3", "remote_mount_4"]])
+
+    def test_same_storage_cluster_is_serial(self):
+        waves = get_mount_waves({"remote_mount_1": get_pairing("10.0.1.5", "10.0.2.5"),
+                                 "remote_mount_2": get_pairing("10.0.1.6", "10.0.2.5"),
+                                 "remote_mount_3": get_pairing("10.0.1.7", "10.0.2.5")})
+        self.assertEqual(waves, [["remote_mount_1"], ["remote_mount_2"], ["remote_mount_3"]])
+
+    def test_coordinator_runs_waves_in_order(self):
+        content = prepare_mount_wave_coordinator([["remote_mount_1", "remote_mount_2"], ["remote_mount_3"]])
+        self.assertLess(content.index("run_wave remote_mount_1 remote_mount_2 || exit 1"),
+                        content.index("run_wave remote_mount_3 || exit 1"))
+
+
+class MountFilesystemTest(unittest.TestCase):
+    """ Filesystems of a remote mount pairing """
+
+    def test_default_mounts_storage_filesystem(self):
+        self.assertEqual(get_mount_filesystems(COMP_TF, STRG_TF),
+                         [{"compute_fs_mnt": "/gpfs/fs1", "compute_fs_name": "fs1", "storage_fs_name": "data"}])
+
+    def test_filesystem_map_defaults(self):
+        filesystems = get_mount_filesystems(COMP_TF, STRG_TF, [
+            {"storage_fs_name": "data"},
+            {"storage_fs_name": "scratch", "compute_fs_name": "tmp", "compute_fs_mnt": "/mnt/tmp"}])
+        self.assertEqual(filesystems, [
+            {"compute_fs_mnt": "/gpfs/data", "compute_fs_name": "data", "storage_fs_name": "data"},
+            {"compute_fs_mnt": "/mnt/tmp", "compute_fs_name": "tmp", "storage_fs_name": "scratch"}])
+
+    def test_filesystem_map_requires_storage_name(self):
+        with self.assertRaises(SystemExit):
+            get_mount_filesystems(COMP_TF, STRG_TF, [{"compute_fs_name": "fs1"}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright IBM Corporation 2018
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prepare_scale_inv_ini import get_disk_stanza, get_nsd_stanza, get_stanza_nsd_name, \
+    get_zone_instances  # noqa: E402
+from scale_cluster_model import get_gui_nodes  # noqa: E402
+from scale_placement import order_instances_by_zone  # noqa: E402
+
+
+class ZoneInstanceTest(unittest.TestCase):
+    """ Instance details of the ini terraform inventory """
+
+    def test_zones_only_with_multiple_azs(self):
+        instances = get_zone_instances(1, ["s0", "s1"], ["10.0.1.10", "10.0.2.10"])
+        self.assertEqual([each_instance["zone"] for each_instance in instances], [None, None])
+
+    def test_shape_lists_drive_order(self):
+        instances = get_zone_instances(2, ["s0", "s1", "s2", "s3"],
+                                       ["10.0.1.10", "10.0.1.11", "10.0.2.10", "10.0.2.11"],
+                                       instance_vcpus=[4, 16, 8, 8], instance_memory_sizes=[16384, 65536])
+        self.assertEqual(instances[1]["memory_size"], 65536)
+        self.assertIsNone(instances[2]["memory_size"])
+        self.assertEqual([each_instance["dns"] for each_instance in order_instances_by_zone(instances)],
+                         ["s1", "s2", "s0", "s3"])
+
+    def test_slow_hosts_flagged(self):
+        instances = get_zone_instances(2, ["s0", "s1"], ["10.0.1.10", "10.0.2.10"], set(["10.0.1.10"]))
+        self.assertEqual([each_instance["slow"] for each_instance in instances], [True, False])
+
+    def test_dedicated_gui_nodes_carry_ip(self):
+        nodes = get_gui_nodes(get_zone_instances(2, ["g0", "g1"], ["10.0.1.20", "10.0.2.20"]))
+        self.assertEqual([(each_node.name, each_node.ip) for each_node in nodes],
+                         [("g0", "10.0.1.20"), ("g1", "10.0.2.20")])
+
+
+class NsdStanzaTest(unittest.TestCase):
+    """ NSD stanzas of the concurrent filesystem play """
+
+    def test_stanza_per_disk(self):
+        disks = [{"device": "/dev/xvdf", "servers": "10.0.1.10,10.0.1.11", "usage": "dataAndMetadata",
+                  "failureGroup": 1, "pool": "system"},
+                 {"device": "/dev/xvdg", "nsd": "nsd_2", "servers": "10.0.2.10", "usage": "descOnly",
+                  "failureGroup": 3, "pool": "system"}]
+        self.assertEqual([get_stanza_nsd_name(each_disk) for each_disk in disks], ["nsd_10_0_1_10_xvdf", "nsd_2"])
+        self.assertEqual(get_disk_stanza(disks[1]), "%nsd: device=/dev/xvdg\n  nsd=nsd_2\n  servers=10.0.2.10\n"
+                                                    "  usage=descOnly\n  failureGroup=3\n  pool=system\n")
+        self.assertEqual(get_nsd_stanza(disks), get_disk_stanza(disks[0]) + get_disk_stanza(disks[1]))
+
+
+if __name__ == "__main__":
+    unittest.main()
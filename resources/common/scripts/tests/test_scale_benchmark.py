@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright IBM Corporation 2018
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scale_benchmark import FIO_WORKLOADS, build_benchmark_report, get_benchmark_clients, \
+    get_expected_performance, get_percentile, prepare_benchmark_playbook  # noqa: E402
+
+
+def get_fio_result(bw_kib, iops, p50_ns, p99_ns, read=True):
+    """ Return fio json result of one job """
+    direction = {"io_bytes": 1, "bw": bw_kib, "iops": iops,
+                 "clat_ns": {"percentile": {"50.000000": p50_ns, "99.000000": p99_ns}}}
+    idle = {"io_bytes": 0, "bw": 0, "iops": 0}
+    return {"jobs": [{"read": direction if read else idle, "write": idle if read else direction}]}
+
+
+def get_client_result(host, bw_kib, p99_ns):
+    """ Return benchmark result of one client """
+    result = {workload[0]: get_fio_result(bw_kib, 1000, 1000000, p99_ns, "read" in workload[0])
+              for workload in FIO_WORKLOADS}
+    result.update({"host": host, "metadata": {"create": {"ops": 500.0, "p50_ms": 1.0, "p99_ms": 4.0}}})
+    return result
+
+
+class ExpectedPerformanceTest(unittest.TestCase):
+    """ Volume bound performance estimate """
+
+    def test_writes_divided_by_replicas(self):
+        expected = get_expected_performance(["gp3", "gp3", "io2"], 2)
+        self.assertEqual(expected["seq_read"], {"mbps": 1250})
+        self.assertEqual(expected["seq_write"], {"mbps": 625.0})
+        self.assertEqual(expected["rand_write"], {"iops": 35000.0})
+
+    def test_unknown_volume_type(self):
+        self.assertIsNone(get_expected_performance(["gp3", "unknown"], 2))
+        self.assertIsNone(get_expected_performance([], 2))
+
+
+class BenchmarkReportTest(unittest.TestCase):
+    """ Cluster wide benchmark results """
+
+    def test_cluster_aggregation(self):
+        report = build_benchmark_report([get_client_result("c0", 100000, 2000000),
+                                         get_client_result("c1", 50000, 8000000)])
+        self.assertAlmostEqual(report["cluster"]["seq_read"]["mbps"], 150000 * 1024 / 1000000.0)
+        self.assertEqual(report["cluster"]["seq_read"]["iops"], 2000)
+        self.assertEqual(report["cluster"]["seq_read"]["p50_ms"], 1.0)
+        self.assertEqual(report["cluster"]["seq_read"]["p99_ms"], 8.0)
+        self.assertEqual(report["cluster"]["create"], {"ops": 1000.0, "p50_ms": 1.0, "p99_ms": 4.0})
+
+    def test_below_expected_flagged(self):
+        report = build_benchmark_report([get_client_result("c0", 100000, 2000000)],
+                                        {"seq_read": {"mbps": 200}, "rand_read": {"iops": 1200},
+                                         "seq_write": {"mbps": 0}})
+        self.assertTrue(report["expected"]["seq_read_mbps"]["below_expected"])
+        self.assertFalse(report["expected"]["rand_read_iops"]["below_expected"])
+        self.assertNotIn("seq_write_mbps", report["expected"])
+
+    def test_percentile_and_sample(self):
+        self.assertEqual(get_percentile([5, 1, 3, 2, 4], 50), 3)
+        self.assertIsNone(get_percentile([], 99))
+        self.assertEqual(get_benchmark_clients(["c0", "c1", "c2"], 2), ["c0", "c1"])
+        self.assertEqual(get_benchmark_clients(["c0", "c1", "c2"]), ["c0", "c1", "c2"])
+
+
+class BenchmarkPlaybookTest(unittest.TestCase):
+    """ Coordinated benchmark play """
+
+    def test_forks_checked_and_expected_path(self):
+        content = prepare_benchmark_playbook("scale_nodes", "/gpfs/fs1/", "/s/scale_benchmark.py",
+                                             expected="storage_benchmark_expected.json")
+        self.assertIn("that: ansible_forks | int >= ansible_play_hosts_all | length", content)
+        self.assertIn("--expected_path {{ playbook_dir }}/storage_benchmark_expected.json", content)
+        self.assertIn("--directory=/gpfs/fs1/.scale_benchmark/{{ inventory_hostname }}", content)
+
+
+if __name__ == "__main__":
+    unittest.main()
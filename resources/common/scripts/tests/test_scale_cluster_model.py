@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright IBM Corporation 2018
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scale_cluster_model import ClusterModel, ClusterNode, get_cluster_definition, get_ssh_proxy_args, \
+    render_ini_inventory, render_json_inventory, render_yaml_inventory  # noqa: E402
+from scale_output import write_json_stream  # noqa: E402
+
+# Inventory ini as written by the generator before the cluster model, kept byte identical
+GOLDEN_INI = """[scale_nodes]
+c0.demo.com scale_cluster_quorum=True scale_cluster_manager=True scale_cluster_gui=True \
+scale_zimon_collector=True is_nsd_server=False is_admin_node=True ansible_user=root \
+ansible_ssh_private_key_file=/k ansible_python_interpreter=/usr/bin/python3 scale_nodeclass=computenodegrp \
+scale_daemon_nodename=c0 ansible_ssh_common_args=
+c1.demo.com scale_cluster_quorum=False scale_cluster_manager=False scale_cluster_gui=False \
+scale_zimon_collector=False is_nsd_server=False is_admin_node=False ansible_user=root \
+ansible_ssh_private_key_file=/k ansible_python_interpreter=/usr/bin/python3 scale_nodeclass=computenodegrp \
+scale_daemon_nodename=c1 ansible_ssh_common_args=
+[all:vars]
+scale_cluster_clustername = demo
+enable_mrot = False
+
+"""
+
+
+def get_model(ssh_args=""):
+    """ Return two node compute cluster model """
+    nodes = [ClusterNode("c0.demo.com", "10.0.1.10", "computenodegrp", is_quorum=True, is_manager=True,
+                         is_gui=True, is_collector=True, is_admin=True),
+             ClusterNode("c1.demo.com", "10.0.2.10", "computenodegrp")]
+    return ClusterModel("compute", nodes, {"scale_cluster_clustername": "demo", "enable_mrot": "False"},
+                        "root", "/k", ssh_args)
+
+
+class InventoryRendererTest(unittest.TestCase):
+    """ Inventory formats rendered from one cluster model """
+
+    def test_ini_golden(self):
+        self.assertEqual(render_ini_inventory(get_model()), GOLDEN_INI)
+
+    def test_ini_quoting(self):
+        model = get_model(get_ssh_proxy_args("ubuntu", "1.2.3.4", "/b"))
+        model.nodes[1].zone_class = "zone_1"
+        content = render_ini_inventory(model, ["c1.demo.com"])
+        self.assertIn(" scale_nodeclass=\"['computenodegrp','zone_1']\" ", content)
+        self.assertIn(" ansible_ssh_common_args='-o ControlMaster=auto", content)
+        self.assertNotIn("c0.demo.com", content)
+
+    def test_json_cluster_definition(self):
+        model = get_model()
+        model.disks = [{"device": "/dev/xvdf", "nsd": "nsd_1", "servers": "10.0.1.10"}]
+        definition = json.loads(render_json_inventory(model))
+        self.assertEqual(definition["scale_cluster"], {"scale_cluster_clustername": "demo", "enable_mrot": False})
+        self.assertEqual([each_node["ip_address"] for each_node in definition["node_details"]],
+                         ["10.0.1.10", "10.0.2.10"])
+        self.assertTrue(definition["node_details"][0]["is_gui_server"])
+        self.assertEqual(definition["scale_disks"], model.disks)
+        self.assertNotIn("scale_protocols", definition)
+
+    def test_streamed_json_matches_rendered(self):
+        model = get_model()
+        model.filesystems = [{"filesystem": "fs1", "automount": "true"}]
+        model.disks = [{"device": "/dev/xvdf", "nsd": "nsd_%s" % each_idx} for each_idx in range(3)]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_path = os.path.join(tmp_dir, "scale_clusterdefinition.json")
+            write_json_stream(json_path, get_cluster_definition(model))
+            with open(json_path) as json_fh:
+                self.assertEqual(json.load(json_fh), json.loads(render_json_inventory(model)))
+
+    def test_yaml_inventory(self):
+        inventory = yaml.safe_load(render_yaml_inventory(get_model()))
+        hosts = inventory["all"]["children"]["scale_nodes"]["hosts"]
+        self.assertEqual(list(hosts), ["c0.demo.com", "c1.demo.com"])
+        self.assertIs(hosts["c0.demo.com"]["scale_cluster_quorum"], True)
+        self.assertEqual(inventory["all"]["vars"]["scale_cluster_clustername"], "demo")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright IBM Corporation 2018
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scale_disk_layout import apply_performance_layout, assign_nsd_servers, get_local_failure_groups, \
+    get_nsd_servers, get_replica_settings, select_tiebreaker_disks, split_by_capacity  # noqa: E402
+
+
+def get_disk(server, failure_group, device="/dev/xvdf", usage="dataAndMetadata", nsd=None):
+    """ Return disk entry of the disk list """
+    return {"device": device, "failureGroup": failure_group, "servers": server, "usage": usage,
+            "pool": "system", "filesystem": "fs1", "nsd": nsd}
+
+
+class NsdServerTest(unittest.TestCase):
+    """ Rotated NSD server lists """
+
+    def test_backups_rotate_per_disk(self):
+        group_ips = ["10.0.1.10", "10.0.1.11", "10.0.1.12"]
+        self.assertEqual(get_nsd_servers("10.0.1.10", group_ips, 0), "10.0.1.10,10.0.1.11,10.0.1.12")
+        self.assertEqual(get_nsd_servers("10.0.1.10", group_ips, 1), "10.0.1.10,10.0.1.12,10.0.1.11")
+
+    def test_server_list_capped(self):
+        group_ips = ["10.0.1.%s" % each_idx for each_idx in range(12)]
+        self.assertEqual(len(get_nsd_servers("10.0.1.0", group_ips, 0, 8).split(",")), 8)
+
+    def test_backups_stay_in_failure_group_and_zone(self):
+        disks_list = [get_disk("10.0.1.10", 1, nsd="a"), get_disk("10.0.1.11", 1, nsd="b"),
+                      get_disk("10.0.2.10", 1, nsd="c"), get_disk("10.0.1.12", 2, nsd="d"),
+                      get_disk("10.0.9.5", 3, usage="descOnly", nsd="e")]
+        shared_count = assign_nsd_servers(disks_list, {"10.0.1.10": "1", "10.0.1.11": "1", "10.0.2.10": "2",
+                                                       "10.0.1.12": "1"}, set(["a", "b", "c", "d", "e"]))
+        self.assertEqual(shared_count, 4)
+        self.assertEqual([each_disk["servers"] for each_disk in disks_list],
+                         ["10.0.1.10,10.0.1.11", "10.0.1.11,10.0.1.10", "10.0.2.10", "10.0.1.12", "10.0.9.5"])
+
+    def test_single_attach_volumes_keep_owner(self):
+        disks_list = [get_disk("10.0.1.10", 1, nsd="a"), get_disk("10.0.1.11", 1, nsd="b"),
+                      get_disk("10.0.1.12", 1, nsd="c")]
+        self.assertEqual(assign_nsd_servers(disks_list, shared_nsds=set(["a", "c"])), 2)
+        self.assertEqual([each_disk["servers"] for each_disk in disks_list],
+                         ["10.0.1.10,10.0.1.12", "10.0.1.11", "10.0.1.12,10.0.1.10"])
+        self.assertEqual(assign_nsd_servers(disks_list), 0)
+
+
+class FailureGroupTest(unittest.TestCase):
+    """ Failure groups of locally-attached disks and capacity split """
+
+    def test_zone_failure_groups(self):
+        self.assertEqual(get_local_failure_groups({"10.0.1.10": "1", "10.0.2.10": "2", "10.0.1.11": "1",
+                                                   "10.0.3.10": "3", "10.0.4.10": "4"}),
+                         {"10.0.1.10": 1, "10.0.2.10": 2, "10.0.1.11": 1, "10.0.3.10": 3, "10.0.4.10": 1})
+
+    def test_single_zone_round_robin(self):
+        self.assertEqual(get_local_failure_groups({"10.0.1.10": None, "10.0.1.11": None, "10.0.1.12": None,
+                                                   "10.0.1.13": None}),
+                         {"10.0.1.10": 1, "10.0.1.11": 2, "10.0.1.12": 3, "10.0.1.13": 1})
+        self.assertEqual(get_local_failure_groups({"10.0.1.10": None}), {"10.0.1.10": 1})
+
+    def test_split_by_capacity(self):
+        node_ips = ["a", "b", "c", "d"]
+        failure_group1, failure_group2 = split_by_capacity(node_ips, {"a": 400, "b": 100, "c": 200, "d": 100})
+        self.assertEqual((failure_group1, failure_group2), (["a"], ["b", "c", "d"]))
+
+    def test_split_equal_capacity_alternates(self):
+        self.assertEqual(split_by_capacity(["a", "b", "c", "d"], {}), (["a", "c"], ["b", "d"]))
+
+
+class ReplicaSettingTest(unittest.TestCase):
+    """ Replica settings matching the failure groups """
+
+    def test_unset_defaults_survive_a_lost_failure_group(self):
+        self.assertEqual(get_replica_settings(3), (2, 3, 3, 3))
+        self.assertEqual(get_replica_settings(2), (2, 2, 2, 2))
+
+    def test_explicit_values_kept(self):
+        self.assertEqual(get_replica_settings(3, 1, 1, 2, 2), (1, 1, 2, 2))
+
+    def test_explicit_values_capped_and_logged(self):
+        with self.assertLogs("scale_disk_layout", "WARNING") as logs:
+            self.assertEqual(get_replica_settings(2, 3, 3, 3, 1), (2, 2, 2, 2))
+        self.assertIn("WARNING:scale_disk_layout:defaultDataReplicas 3 changed to 2 to match 2 failure groups.",
+                      logs.output)
+        self.assertEqual(len(logs.output), 4)
+
+
+class PerformanceLayoutTest(unittest.TestCase):
+    """ Metadata on the fastest volume tier """
+
+    def test_fast_tier_holds_metadata(self):
+        disks_list = [get_disk("a", 1, nsd="a1"), get_disk("a", 1, nsd="a2"),
+                      get_disk("b", 2, nsd="b1"), get_disk("b", 2, nsd="b2")]
+        data_pools = apply_performance_layout(disks_list, {"a1": "nvme", "a2": "gp3", "b1": "nvme", "b2": "gp3"})
+        self.assertEqual(data_pools, {"fs1": set(["data"])})
+        self.assertEqual([each_disk["usage"] for each_disk in disks_list],
+                         ["metadataOnly", "dataOnly", "metadataOnly", "dataOnly"])
+
+    def test_fast_tier_missing_in_failure_group(self):
+        disks_list = [get_disk("a", 1, nsd="a1"), get_disk("a", 1, nsd="a2"), get_disk("b", 2, nsd="b1")]
+        self.assertEqual(apply_performance_layout(disks_list, {"a1": "nvme", "a2": "gp3", "b1": "gp3"}), {})
+        self.assertEqual(set(each_disk["usage"] for each_disk in disks_list), set(["dataAndMetadata"]))
+
+
+class TiebreakerDiskTest(unittest.TestCase):
+    """ Tiebreaker NSD selection """
+
+    def test_desc_only_preferred_and_spread(self):
+        disks_list = [get_disk("a", 1, nsd="a1"), get_disk("a", 1, nsd="a2"), get_disk("b", 2, nsd="b1"),
+                      get_disk("c", 3, usage="descOnly")]
+        self.assertEqual(select_tiebreaker_disks(disks_list), ["nsd_c_xvdf", "a1", "b1"])
+
+    def test_distinct_servers_within_failure_group(self):
+        disks_list = [get_disk("a", 1, nsd="a1"), get_disk("a", 1, nsd="a2"), get_disk("b", 1, nsd="b1")]
+        self.assertEqual(select_tiebreaker_disks(disks_list), ["a1", "b1", "a2"])
+
+    def test_single_disk_fallback(self):
+        disks_list = [get_disk("a", 1, nsd="a1"), get_disk("b", 2, nsd="b1")]
+        self.assertEqual(select_tiebreaker_disks(disks_list), ["a1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
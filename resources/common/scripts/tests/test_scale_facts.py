@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright IBM Corporation 2018
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scale_facts import get_image_groups, get_instance_facts, get_node_arch, get_node_os, \
+    get_os_details, is_scale_baked  # noqa: E402
+
+
+class InstanceFactTest(unittest.TestCase):
+    """ Ansible facts known from terraform """
+
+    def test_os_from_image_name(self):
+        self.assertEqual(get_os_details("RHEL-8.8.0_HVM-20230503-x86_64"),
+                         {"os": "rhel8", "distribution": "RedHat", "os_family": "RedHat", "major_version": "8"})
+        self.assertEqual(get_os_details("ubuntu-jammy-22.04-amd64")["os"], "ubuntu22")
+        self.assertIsNone(get_os_details("custom-image"))
+        self.assertEqual(get_node_os({"image_name": "custom-image"}), "rhel8")
+
+    def test_arch_names(self):
+        self.assertEqual(get_node_arch({"arch": ["arm64"]}), "aarch64")
+        self.assertEqual(get_node_arch({}), "x86_64")
+
+    def test_facts_of_known_fields_only(self):
+        self.assertEqual(get_instance_facts({"private_ip": "10.0.1.10", "vcpus": "8", "memory_size": None,
+                                             "zone": "us-east-1a"}),
+                         {"ansible_default_ipv4": {"address": "10.0.1.10"},
+                          "ansible_all_ipv4_addresses": ["10.0.1.10"], "ansible_processor_vcpus": 8,
+                          "scale_zone": "us-east-1a"})
+
+
+class ImageGroupTest(unittest.TestCase):
+    """ Hosts grouped by Scale packages baked in their image """
+
+    def test_baked_version_must_match(self):
+        self.assertTrue(is_scale_baked({"scale_version": "5.1.9.0"}, "5.1.9.0"))
+        self.assertFalse(is_scale_baked({"scale_version": "5.1.8.0"}, "5.1.9.0"))
+        self.assertFalse(is_scale_baked({}, "5.1.9.0"))
+
+    def test_groups(self):
+        self.assertEqual(get_image_groups({"a": {"scale_version": "5.1.9.0"}, "b": {}, "c": {}}, "5.1.9.0"),
+                         {"5.1.9.0": ["a"], "": ["b", "c"]})
+
+
+if __name__ == "__main__":
+    unittest.main()
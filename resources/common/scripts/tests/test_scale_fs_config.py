@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright IBM Corporation 2018
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scale_fs_config import get_filesystem_params, read_filesystem_config  # noqa: E402
+
+FS_PARAMS = {"mount_point": "/gpfs/fs1", "block_size": "4M", "data_replicas": 2, "max_data_replicas": 3,
+             "metadata_replicas": 2, "max_metadata_replicas": 3}
+
+
+class FilesystemConfigTest(unittest.TestCase):
+    """ Filesystem config file parsing """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.config_path = os.path.join(self.tmp_dir.name, "fs_config.json")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write_config(self, fs_config):
+        with open(self.config_path, "w") as config_fh:
+            json.dump({"filesystem_config_params": fs_config}, config_fh)
+
+    def test_params_are_copies(self):
+        self.write_config({"fs1": FS_PARAMS})
+        params = get_filesystem_params(self.config_path, "fs1")
+        params["block_size"] = "1M"
+        self.assertEqual(read_filesystem_config(self.config_path)["fs1"]["block_size"], "4M")
+
+    def test_missing_keys_rejected(self):
+        self.write_config({"fs1": {"mount_point": "/gpfs/fs1"}})
+        with self.assertRaises(SystemExit):
+            read_filesystem_config(self.config_path)
+
+    def test_unknown_filesystem_rejected(self):
+        self.write_config({"fs1": FS_PARAMS})
+        with self.assertRaises(SystemExit):
+            get_filesystem_params(self.config_path, "fs2")
+
+
+if __name__ == "__main__":
+    unittest.main()
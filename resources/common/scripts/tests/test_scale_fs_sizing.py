@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright IBM Corporation 2018
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scale_fs_sizing import format_size, get_fs_advice, get_num_nodes, get_space_efficiency, \
+    get_workload_hints, parse_size  # noqa: E402
+
+
+class SizeTest(unittest.TestCase):
+    """ Size parsing and formatting """
+
+    def test_parse_size(self):
+        self.assertEqual(parse_size("4M"), 4 * 1024 ** 2)
+        self.assertEqual(parse_size("512KiB"), 512 * 1024)
+        self.assertEqual(parse_size(1000), 1000)
+        with self.assertRaises(ValueError):
+            parse_size("four")
+
+    def test_format_size(self):
+        self.assertEqual(format_size(4 * 1024 ** 2), "4M")
+        self.assertEqual(format_size(1536 * 1024), "1536K")
+        self.assertEqual(format_size(1000), "1000")
+
+
+class FsAdviceTest(unittest.TestCase):
+    """ Filesystem settings from workload hints """
+
+    def test_small_files(self):
+        settings, notes = get_fs_advice({"avg_file_size": "2K", "file_count": 1000}, 4, 2)
+        self.assertEqual(settings, {"blockSize": "256K", "inodeSize": 4096, "numNodes": 32})
+        self.assertIn("Files fit into the 4K inode, data is read along with the metadata.", notes)
+
+    def test_large_sequential_reads(self):
+        settings, _ = get_fs_advice({"avg_file_size": "1G", "read_ratio": 0.9}, 100, 2)
+        self.assertEqual(settings["blockSize"], "16M")
+        self.assertEqual(settings["numNodes"], get_num_nodes(100))
+        self.assertEqual(get_num_nodes(100), 125)
+
+    def test_separate_metadata_block_size(self):
+        settings, _ = get_fs_advice({"avg_file_size": "8M"}, 4, 2, separate_metadata=True)
+        self.assertEqual((settings["blockSize"], settings["metadataBlockSize"]), ("4M", "1M"))
+
+    def test_metadata_capacity_check(self):
+        _, notes = get_fs_advice({"avg_file_size": "64K", "file_count": 10 ** 6}, 4, 2,
+                                 metadata_capacity=1024 ** 3)
+        self.assertIn("Metadata capacity is insufficient, add metadata volumes or reduce the inode size.", notes)
+        _, notes = get_fs_advice({"avg_file_size": "64K", "file_count": 10 ** 6}, 4, 2,
+                                 metadata_capacity=100 * 1024 ** 3)
+        self.assertNotIn("Metadata capacity is insufficient, add metadata volumes or reduce the inode size.", notes)
+
+    def test_space_efficiency(self):
+        self.assertEqual(get_space_efficiency(1024, 4 * 1024 ** 2), 1.0)
+        self.assertAlmostEqual(get_space_efficiency(9 * 1024, 4 * 1024 ** 2), 9.0 / 16)
+
+    def test_workload_hints_override(self):
+        self.assertEqual(get_workload_hints({"*": {"avg_file_size": "1M", "read_ratio": 0.5},
+                                             "fs1": {"avg_file_size": "4K"}}, "fs1"),
+                         {"avg_file_size": "4K", "read_ratio": 0.5})
+
+
+if __name__ == "__main__":
+    unittest.main()
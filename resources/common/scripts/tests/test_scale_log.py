@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright IBM Corporation 2018
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import io
+import json
+import logging
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scale_log import JsonLinesFormatter, get_counts, log_stage  # noqa: E402
+
+
+class LogTest(unittest.TestCase):
+    """ Structured log output """
+
+    def test_json_lines_extra_fields(self):
+        stream = io.StringIO()
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(JsonLinesFormatter())
+        logger = logging.getLogger("test_scale_log")
+        logger.handlers = [handler]
+        logger.propagate = False
+        logger.setLevel(logging.DEBUG)
+        log_stage(logger, "hosts", 0.0, nodes=3)
+        entry = json.loads(stream.getvalue())
+        self.assertEqual((entry["level"], entry["stage"], entry["counts"]), ("debug", "hosts", {"nodes": 3}))
+        self.assertTrue(entry["message"].startswith("Stage hosts completed in "))
+
+    def test_counts_sorted(self):
+        self.assertEqual(list(get_counts([2, 1, 2, None]).items()), [(1, 1), (2, 2), (None, 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
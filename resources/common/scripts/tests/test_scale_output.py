@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright IBM Corporation 2018
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scale_output import add_artifact, commit_artifacts, get_file_hash, get_pending_artifact, \
+    mark_stale, write_json_stream  # noqa: E402
+
+
+class ArtifactTest(unittest.TestCase):
+    """ Deferred artifact writes """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.manifest_path = os.path.join(self.tmp_dir.name, "artifact_manifest.json")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def get_path(self, name):
+        return os.path.join(self.tmp_dir.name, name)
+
+    def test_pending_content_before_commit(self):
+        add_artifact(self.get_path("a.ini"), "[scale_nodes]\n")
+        self.assertEqual(get_pending_artifact(self.get_path("a.ini")), "[scale_nodes]\n")
+        self.assertFalse(os.path.exists(self.get_path("a.ini")))
+        commit_artifacts()
+        self.assertIsNone(get_pending_artifact(self.get_path("a.ini")))
+        with open(self.get_path("a.ini")) as file_fh:
+            self.assertEqual(file_fh.read(), "[scale_nodes]\n")
+
+    def test_identical_content_skipped(self):
+        add_artifact(self.get_path("a.ini"), "one\n")
+        self.assertEqual(commit_artifacts(), {self.get_path("a.ini"): True})
+        os.utime(self.get_path("a.ini"), (0, 0))
+        add_artifact(self.get_path("a.ini"), "one\n")
+        self.assertEqual(commit_artifacts(), {self.get_path("a.ini"): False})
+        self.assertEqual(os.stat(self.get_path("a.ini")).st_mtime, 0)
+        add_artifact(self.get_path("a.ini"), "two\n")
+        self.assertEqual(commit_artifacts(), {self.get_path("a.ini"): True})
+
+    def test_mode_change_rewrites(self):
+        add_artifact(self.get_path("run.sh"), "#!/bin/bash\n")
+        commit_artifacts()
+        add_artifact(self.get_path("run.sh"), "#!/bin/bash\n", mode=0o755)
+        self.assertEqual(commit_artifacts(), {self.get_path("run.sh"): True})
+        self.assertEqual(os.stat(self.get_path("run.sh")).st_mode & 0o777, 0o755)
+
+    def test_writer_artifact(self):
+        add_artifact(self.get_path("a.json"), writer=lambda json_path: write_json_stream(json_path, {"a": 1}))
+        commit_artifacts()
+        with open(self.get_path("a.json")) as json_fh:
+            self.assertEqual(json.load(json_fh), {"a": 1})
+
+    def test_manifest_and_stale_removal(self):
+        add_artifact(self.get_path("a.ini"), "a\n")
+        add_artifact(self.get_path("b.ini"), "b\n")
+        commit_artifacts(self.manifest_path)
+        with open(self.manifest_path) as manifest_fh:
+            self.assertEqual(json.load(manifest_fh), {"artifacts": {
+                self.get_path("a.ini"): get_file_hash(self.get_path("a.ini")),
+                self.get_path("b.ini"): get_file_hash(self.get_path("b.ini"))}})
+        # b.ini is not rendered again, listed in the manifest hence removed
+        add_artifact(self.get_path("a.ini"), "a\n")
+        commit_artifacts(self.manifest_path)
+        self.assertTrue(os.path.exists(self.get_path("a.ini")))
+        self.assertFalse(os.path.exists(self.get_path("b.ini")))
+
+    def test_marked_stale_removed(self):
+        with open(self.get_path("old.ini"), "w") as file_fh:
+            file_fh.write("old\n")
+        mark_stale(self.get_path("old.ini"))
+        commit_artifacts()
+        self.assertFalse(os.path.exists(self.get_path("old.ini")))
+
+
+class JsonStreamWriterTest(unittest.TestCase):
+    """ Streamed json writer """
+
+    def test_lists_and_generators(self):
+        data = {"node_details": (each_idx for each_idx in range(3)), "scale_disks": [],
+                "scale_cluster": {"name": "c"}, "count": 2}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_path = os.path.join(tmp_dir, "a.json")
+            write_json_stream(json_path, data)
+            with open(json_path) as json_fh:
+                content = json_fh.read()
+        self.assertEqual(json.loads(content), {"node_details": [0, 1, 2], "scale_disks": [],
+                                               "scale_cluster": {"name": "c"}, "count": 2})
+        self.assertIn("\n        1,", content)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright IBM Corporation 2018
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scale_placement import get_collector_positions, get_manager_count, get_quorum_count, \
+    order_instances_by_zone  # noqa: E402
+
+
+def get_instance(private_ip, zone, vcpus=None, slow=False):
+    """ Return instance details used for placement ordering """
+    return {"private_ip": private_ip, "zone": zone, "vcpus": vcpus, "slow": slow}
+
+
+class RoleCountTest(unittest.TestCase):
+    """ Quorum and manager counts by cluster size """
+
+    def test_quorum_count(self):
+        self.assertEqual([get_quorum_count(each_count) for each_count in [1, 3, 4, 9, 10, 18, 19, 500]],
+                         [1, 3, 3, 3, 5, 5, 7, 7])
+
+    def test_manager_count_bounds(self):
+        self.assertEqual(get_manager_count(1), 2)
+        self.assertEqual(get_manager_count(65), 3)
+        self.assertEqual(get_manager_count(10000), 7)
+
+    def test_manager_count_by_workload(self):
+        self.assertEqual(get_manager_count(64, "metadata"), 4)
+        self.assertEqual(get_manager_count(64, "throughput"), 2)
+        self.assertEqual(get_manager_count(64, "unknown"), 2)
+
+
+class ZoneOrderTest(unittest.TestCase):
+    """ Zone interleaved instance order driving role placement """
+
+    def test_zones_interleaved(self):
+        instances = [get_instance("10.0.1.10", "1"), get_instance("10.0.1.11", "1"),
+                     get_instance("10.0.1.12", "1"), get_instance("10.0.2.10", "2"),
+                     get_instance("10.0.3.10", "3")]
+        self.assertEqual([each_instance["private_ip"] for each_instance in order_instances_by_zone(instances)],
+                         ["10.0.1.10", "10.0.2.10", "10.0.3.10", "10.0.1.11", "10.0.1.12"])
+
+    def test_largest_shape_first_within_zone(self):
+        instances = [get_instance("10.0.1.10", "1", 4), get_instance("10.0.1.11", "1", 16),
+                     get_instance("10.0.2.10", "2", 8), get_instance("10.0.2.11", "2", 8)]
+        self.assertEqual([each_instance["private_ip"] for each_instance in order_instances_by_zone(instances)],
+                         ["10.0.1.11", "10.0.2.10", "10.0.1.10", "10.0.2.11"])
+
+    def test_slow_instances_last(self):
+        instances = [get_instance("10.0.1.10", "1", slow=True), get_instance("10.0.2.10", "2"),
+                     get_instance("10.0.1.11", "1")]
+        self.assertEqual([each_instance["private_ip"] for each_instance in order_instances_by_zone(instances)],
+                         ["10.0.2.10", "10.0.1.11", "10.0.1.10"])
+
+
+class CollectorPositionTest(unittest.TestCase):
+    """ Placement of perfmon collectors in the ordered instance list """
+
+    def test_collectors_spread_across_zones(self):
+        # Three zones interleaved, two managers at positions 0 and 1
+        zones = ["1", "2", "3", "1", "2", "3"]
+        positions = get_collector_positions(zones, 2, 2)
+        self.assertNotIn(0, positions)
+        self.assertEqual(len(set([zones[each_position] for each_position in positions])), 2)
+
+    def test_collectors_skip_managers_first(self):
+        positions = get_collector_positions(["1", "2", "1", "2", "1"], 3, 2)
+        self.assertEqual(positions, set([3, 4]))
+
+    def test_gui_node_used_last(self):
+        self.assertEqual(get_collector_positions(["1", "2"], 2, 2), set([0, 1]))
+        self.assertEqual(get_collector_positions(["1"], 1, 2), set([0]))
+        self.assertEqual(get_collector_positions([], 0, 2), set())
+
+    def test_collectors_without_zones(self):
+        self.assertEqual(get_collector_positions([None] * 6, 3, 2), set([3, 4]))
+
+
+if __name__ == "__main__":
+    unittest.main()
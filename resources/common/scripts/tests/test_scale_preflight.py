@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright IBM Corporation 2018
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scale_preflight import build_latency_matrix, build_preflight_report, get_latency_nodes, \
+    get_outliers, get_preflight_nodes  # noqa: E402
+
+
+def get_result(each_ip, peer, network, disks=None):
+    """ Return pre-flight result of one host """
+    return {"ip": each_ip, "peer": peer, "network": network, "disks": disks or {},
+            "types": {each_device: "gp3" for each_device in disks or {}}}
+
+
+class PreflightNodeTest(unittest.TestCase):
+    """ Pre-flight probe details """
+
+    def test_nsd_servers_probe_in_a_ring(self):
+        nodes = get_preflight_nodes({"10.0.1.10": "s0", "10.0.1.11": "s1", "10.0.1.12": "c0"},
+                                    {"10.0.1.10": [("/dev/xvdf", "gp3")], "10.0.1.11": [("/dev/xvdf", "io2")]})
+        self.assertEqual([nodes[each_host]["peer"] for each_host in ["s0", "s1", "c0"]],
+                         ["10.0.1.11", "10.0.1.10", None])
+        self.assertEqual(nodes["s1"]["types"], {"/dev/xvdf": "io2"})
+
+    def test_latency_peers(self):
+        self.assertEqual(get_latency_nodes({"10.0.1.10": "s0", "10.0.1.11": "s1"}),
+                         {"s0": {"ip": "10.0.1.10", "peers": ["10.0.1.11"]},
+                          "s1": {"ip": "10.0.1.11", "peers": ["10.0.1.10"]}})
+
+
+class PreflightReportTest(unittest.TestCase):
+    """ Outliers of pre-flight probe results """
+
+    def test_outliers_ignore_unmeasured(self):
+        self.assertEqual(get_outliers({"a": 100.0, "b": 95.0, "c": 40.0, "d": None}), ["c"])
+        self.assertEqual(get_outliers({"a": 100.0}), [])
+
+    def test_host_slow_sending_and_receiving(self):
+        # Ring a -> b -> c -> d -> a, probes from and to c are slow
+        report = build_preflight_report([get_result("a", "b", 1000), get_result("b", "c", 300),
+                                         get_result("c", "d", 300), get_result("d", "a", 1000)])
+        self.assertEqual(report["slow_hosts"], ["c"])
+
+    def test_single_slow_probe_flags_both_ends(self):
+        report = build_preflight_report([get_result("a", "b", 1000), get_result("b", "c", 1000),
+                                         get_result("c", "d", 300), get_result("d", "a", 1000)])
+        self.assertEqual(report["slow_hosts"], ["c", "d"])
+
+    def test_slow_devices_per_volume_type(self):
+        report = build_preflight_report([get_result("a", None, None, {"/dev/xvdf": 500, "/dev/xvdg": 480}),
+                                         get_result("b", None, None, {"/dev/xvdf": 100, "/dev/xvdg": ""})])
+        self.assertEqual(report["slow_devices"], {"b": ["/dev/xvdf", "/dev/xvdg"]})
+        self.assertEqual(report["disks"]["b:/dev/xvdg"], 0.0)
+        self.assertEqual(report["slow_hosts"], [])
+
+    def test_latency_matrix_skips_unreachable(self):
+        self.assertEqual(build_latency_matrix([{"ip": "a", "rtt": {"b": "0.412", "c": ""}}]),
+                         {"a": {"b": {"rtt_ms": 0.412}}})
+
+
+if __name__ == "__main__":
+    unittest.main()
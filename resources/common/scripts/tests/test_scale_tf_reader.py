@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright IBM Corporation 2018
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scale_tf_reader import iter_json_object, load_json_stream  # noqa: E402
+
+TF_INV = {"vpc_availability_zones": ["us-east-1a", "us-east-1b"],
+          "compute_cluster_instance_private_ips": ["10.0.1.%s" % each_idx for each_idx in range(50)],
+          "storage_cluster_with_data_volume_mapping": {"10.0.1.10": ["/dev/xvdf", "/dev/xvdg"]},
+          "bastion_instance_public_ip": None,
+          "scale_version": "5.1.9.0",
+          "total_memory": 123456789,
+          "ratio": -1.5e-3,
+          "enabled": True,
+          "empty_list": [],
+          "empty_map": {}}
+
+
+class JsonStreamTest(unittest.TestCase):
+    """ Incremental terraform inventory decoding """
+
+    def test_all_chunk_boundaries(self):
+        content = json.dumps(TF_INV, indent=2)
+        # Every cut position of small chunks, numbers and strings split across chunks
+        for chunk_size in [1, 2, 3, 5, 7, 64]:
+            self.assertEqual(dict(iter_json_object(io.StringIO(content), chunk_size)), TF_INV)
+
+    def test_number_at_chunk_end(self):
+        content = '{"count": 12345, "size": 9876}'
+        for chunk_size in range(1, len(content) + 1):
+            self.assertEqual(dict(iter_json_object(io.StringIO(content), chunk_size)),
+                             {"count": 12345, "size": 9876})
+
+    def test_empty_object(self):
+        self.assertEqual(dict(iter_json_object(io.StringIO(" { } \n"), 2)), {})
+
+    def test_trailing_data_rejected(self):
+        for content in ['{"a": 1} {"b": 2}', '{"a": 1}]', '{}x']:
+            with self.assertRaises(ValueError):
+                dict(iter_json_object(io.StringIO(content), 4))
+
+    def test_invalid_json_rejected(self):
+        for content in ['{"a": 1', '{"a" 1}', '["a"]', '{"a": [1, 2}']:
+            with self.assertRaises(ValueError):
+                dict(iter_json_object(io.StringIO(content), 4))
+
+    def test_threshold_selects_loader(self):
+        content = json.dumps(TF_INV)
+        # StringIO has no file descriptor, hence it is streamed
+        self.assertEqual(load_json_stream(io.StringIO(content), 3), TF_INV)
+        with self.assertRaises(ValueError):
+            load_json_stream(io.StringIO(content + "x"), 3)
+        with tempfile.TemporaryFile("w+") as json_fh:
+            json_fh.write(content)
+            json_fh.seek(0)
+            self.assertEqual(load_json_stream(json_fh, 3, stream_threshold=len(content) + 1), TF_INV)
+            json_fh.seek(0)
+            self.assertEqual(load_json_stream(json_fh, 3, stream_threshold=len(content)), TF_INV)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright IBM Corporation 2018
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from validate_scale_inventory import check_topology, get_ini_topology, get_node_aliases, \
+    read_ini_topology  # noqa: E402
+
+TF_INV = {"vpc_availability_zones": ["us-east-1a", "us-east-1b", "us-east-1c"],
+          "storage_cluster_instance_names": ["s0.demo.com", "s1.demo.com", "s2.demo.com", "s3.demo.com",
+                                             "s4.demo.com"],
+          "storage_cluster_instance_private_ips": ["10.0.1.10", "10.0.1.11", "10.0.2.12", "10.0.3.13",
+                                                   "10.0.1.14"]}
+
+
+def get_host_line(name, quorum, manager):
+    """ Return inventory ini host line """
+    return "%s scale_cluster_quorum=%s scale_cluster_manager=%s scale_cluster_gui=%s scale_zimon_collector=False " \
+        "is_nsd_server=True is_admin_node=%s scale_nodeclass=storagenodegrp scale_daemon_nodename=%s\n" % (
+            name, quorum, manager, name == "s0.demo.com", quorum, name.split('.')[0])
+
+
+class IniTopologyZoneTest(unittest.TestCase):
+    """ Zone checks of ini inventories, zones derived from the subnet """
+
+    def check_inventory(self, roles):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            inventory_path = os.path.join(tmp_dir, "storage_inventory.ini")
+            with open(inventory_path, "w") as inventory_fh:
+                inventory_fh.write("[scale_nodes]\n")
+                for each_name, (quorum, manager) in roles.items():
+                    inventory_fh.write(get_host_line(each_name, quorum, manager))
+            nodes, disks = read_ini_topology(inventory_path, None)
+        aliases, zones = get_node_aliases(TF_INV)
+        return check_topology(nodes, disks, aliases, zones)
+
+    def test_zones_from_subnets(self):
+        _, zones = get_node_aliases(TF_INV)
+        self.assertEqual(zones, {"10.0.1.10": "1", "10.0.1.11": "1", "10.0.2.12": "2", "10.0.3.13": "3",
+                                 "10.0.1.14": "1"})
+
+    def test_single_az_has_no_zones(self):
+        _, zones = get_node_aliases(dict(TF_INV, vpc_availability_zones=["us-east-1a"]))
+        self.assertEqual(zones, {})
+
+    def test_quorum_and_managers_in_one_zone(self):
+        errors, warnings = self.check_inventory({"s0.demo.com": (True, True), "s1.demo.com": (True, True),
+                                                 "s2.demo.com": (True, False), "s3.demo.com": (False, False),
+                                                 "s4.demo.com": (False, False)})
+        # Quorum in two zones can not survive either zone loss, reported as warning
+        self.assertIn("Loss of zone 1 leaves 1 of 3 quorum nodes, majority is lost.", warnings)
+        self.assertIn("All manager nodes are placed in zone 1.", errors)
+
+    def test_quorum_majority_in_one_of_three_zones(self):
+        errors, _ = self.check_inventory({"s0.demo.com": (True, True), "s1.demo.com": (True, False),
+                                          "s2.demo.com": (True, True), "s3.demo.com": (True, False),
+                                          "s4.demo.com": (True, False)})
+        self.assertIn("Loss of zone 1 leaves 2 of 5 quorum nodes, majority is lost.", errors)
+
+    def test_quorum_and_managers_spread(self):
+        errors, warnings = self.check_inventory({"s0.demo.com": (True, True), "s1.demo.com": (False, False),
+                                                 "s2.demo.com": (True, True), "s3.demo.com": (True, False),
+                                                 "s4.demo.com": (False, False)})
+        self.assertEqual(errors, [])
+        self.assertEqual(warnings, [])
+
+    def test_rendered_content_before_write(self):
+        nodes, disks = get_ini_topology("[scale_nodes]\n" + get_host_line("s0.demo.com", True, True),
+                                        {"scale_storage": [{"filesystem": "fs1",
+                                                            "disks": [{"nsd": "nsd_1", "failureGroup": 1}]}]})
+        self.assertEqual([each_node['name'] for each_node in nodes], ["s0.demo.com"])
+        self.assertTrue(nodes[0]['is_quorum'])
+        self.assertEqual(disks, [{"nsd": "nsd_1", "failureGroup": 1}])
+
+
+if __name__ == "__main__":
+    unittest.main()
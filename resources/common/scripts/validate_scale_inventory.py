@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright IBM Corporation 2018
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+
+You may obtain a copy of the License at
+http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import argparse
+import json
+import logging
+import shlex
+import sys
+import yaml
+from scale_log import get_counts, setup_logging
+from scale_placement import get_subnet_zone, get_zone_loss_violations
+
+# Quorum nodes supported along with tiebreaker disks.
+MAX_TIEBREAKER_QUORUM_COUNT = 8
+LOGGER = logging.getLogger("validate_scale_inventory")
+
+
+def read_json_file(json_path):
+    """ Read inventory as json file """
+    tf_inv = {}
+    try:
+        with open(json_path) as json_handler:
+            try:
+                tf_inv = json.load(json_handler)
+            except json.decoder.JSONDecodeError:
+                LOGGER.error("Provided terraform inventory file (%s) is not a valid json.", json_path)
+                sys.exit(1)
+    except OSError:
+        LOGGER.error("Provided terraform inventory file (%s) does not exist.", json_path)
+        sys.exit(1)
+
+    return tf_inv
+
+
+def str_to_bool(value):
+    """ Convert inventory flag (bool or string) to bool """
+    if isinstance(value, bool):
+        return value
+    return str(value).lower() == "true"
+
+
+def get_base_nodeclass(node_class):
+    """ Return primary node class when node belongs to several classes """
+    if isinstance(node_class, list):
+        return node_class[0] if node_class else None
+    if node_class and node_class.startswith('['):
+        return node_class.strip('[]').split(',')[0].strip().strip('\'"')
+    return node_class
+
+
+def get_node_aliases(tf_inv):
+    """ Map every known node name/ip to its primary ip and zone.
+    :args: tf_inv (dict)
+    :return: aliases (dict), zones (dict)
+    """
+    aliases, zones = {}, {}
+    # Inventory generated for the json format carries per instance details
+    for each_key in ['compute_cluster_details', 'storage_cluster_details',
+                     'storage_cluster_desc_details', 'protocol_cluster_details']:
+        for each_instance in tf_inv.get(each_key, []):
+            aliases[each_instance['private_ip']] = each_instance['private_ip']
+            aliases[each_instance['dns']] = each_instance['private_ip']
+            aliases[each_instance['dns'].split('.')[0]] = each_instance['private_ip']
+            if each_instance.get('zone'):
+                zones[each_instance['private_ip']] = each_instance['zone']
+
+    # Inventory generated for the ini format carries parallel name/ip lists,
+    # zones are derived from the subnet as the generator places them
+    multi_az = len(tf_inv.get('vpc_availability_zones', [])) > 1
+    for names_key, ips_key in [('compute_cluster_instance_names', 'compute_cluster_instance_private_ips'),
+                               ('storage_cluster_instance_names', 'storage_cluster_instance_private_ips'),
+                               ('protocol_cluster_instance_names', 'protocol_cluster_instance_private_ips')]:
+        for each_name, each_ip in zip(tf_inv.get(names_key, []), tf_inv.get(ips_key, [])):
+            aliases[each_ip] = each_ip
+            aliases[each_name] = each_ip
+            aliases[each_name.split('.')[0]] = each_ip
+            if multi_az and get_subnet_zone(each_ip):
+                zones[each_ip] = get_subnet_zone(each_ip)
+    for each_ip in tf_inv.get('storage_cluster_desc_instance_private_ips', []):
+        aliases[each_ip] = each_ip
+        if multi_az and get_subnet_zone(each_ip):
+            zones[each_ip] = get_subnet_zone(each_ip)
+    return aliases, zones
+
+
+def get_ini_topology(inventory_content, group_vars):
+    """ Return nodes and disks of generated ini inventory and group_vars.
+    :args: inventory_content (string), group_vars (dict)
+    :return: nodes (list), disks (list)
+    """
+    nodes, disks = [], []
+    in_hosts = False
+    for each_line in inventory_content.splitlines():
+        each_line = each_line.strip()
+        if each_line.startswith('['):
+            in_hosts = each_line == '[scale_nodes]'
+            continue
+        if not in_hosts or not each_line:
+            continue
+        tokens = shlex.split(each_line)
+        host_vars = dict(each_token.split('=', 1) for each_token in tokens[1:]
+                         if '=' in each_token)
+        nodes.append({'name': tokens[0],
+                      'daemon_nodename': host_vars.get('scale_daemon_nodename'),
+                      'is_quorum': str_to_bool(host_vars.get('scale_cluster_quorum')),
+                      'is_manager': str_to_bool(host_vars.get('scale_cluster_manager')),
+                      'is_gui': str_to_bool(host_vars.get('scale_cluster_gui')),
+                      'is_collector': str_to_bool(host_vars.get('scale_zimon_collector')),
+                      'is_nsd': str_to_bool(host_vars.get('is_nsd_server')),
+                      'is_protocol': str_to_bool(host_vars.get('is_protocol_node')),
+                      'class': get_base_nodeclass(host_vars.get('scale_nodeclass'))})
+
+    for each_fs in group_vars.get('scale_storage', []) + group_vars.get('scale_storage_concurrent', []):
+        disks.extend(each_fs.get('disks', []))
+    return nodes, disks
+
+
+def read_ini_topology(inventory_path, group_vars_path):
+    """ Read nodes and disks from generated ini inventory and group_vars.
+    :args: inventory_path (string), group_vars_path (string)
+    :return: nodes (list), disks (list)
+    """
+    try:
+        with open(inventory_path) as inventory_handler:
+            inventory_content = inventory_handler.read()
+    except OSError:
+        LOGGER.error("Generated inventory file (%s) does not exist.", inventory_path)
+        sys.exit(1)
+
+    group_vars = {}
+    if group_vars_path:
+        try:
+            with open(group_vars_path) as group_vars_handler:
+                group_vars = yaml.safe_load(group_vars_handler) or {}
+        except OSError:
+            LOGGER.error("Generated group_vars file (%s) does not exist.", group_vars_path)
+            sys.exit(1)
+    return get_ini_topology(inventory_content, group_vars)
+
+
+def get_json_topology(cluster_definition):
+    """ Return nodes and disks of generated cluster definition.
+    :args: cluster_definition (dict)
+    :return: nodes (list), disks (list)
+    """
+    nodes = []
+    for each_node in cluster_definition.get('node_details', []):
+        nodes.append({'name': each_node['ip_address'],
+                      'daemon_nodename': each_node.get('scale_daemon_nodename'),
+                      'is_quorum': each_node['is_quorum_node'],
+                      'is_manager': each_node['is_manager_node'],
+                      'is_gui': each_node['is_gui_server'],
+                      'is_collector': each_node['scale_zimon_collector'],
+                      'is_nsd': each_node['is_nsd_server'],
+                      'is_protocol': each_node.get('is_protocol_node', False),
+                      'class': get_base_nodeclass(each_node['scale_nodeclass'])})
+    return nodes, list(cluster_definition.get('scale_disks', []))
+
+
+def read_json_topology(cluster_definition_path):
+    """ Read nodes and disks from generated scale_clusterdefinition.json.
+    :args: cluster_definition_path (string)
+    :return: nodes (list), disks (list)
+    """
+    return get_json_topology(read_json_file(cluster_definition_path))
+
+
+def get_tiebreaker_zone_loss_messages(quorum_zones, disk_zones):
+    """ Return zone losses the cluster can not survive with tiebreaker disks.
+    One quorum node and a majority of tiebreaker disks have to remain.
+    :args: quorum_zones (list of zone per quorum node),
+           disk_zones (list of zone per tiebreaker disk)
+    """
+    messages = []
+    if None in quorum_zones + disk_zones or len(set(quorum_zones + disk_zones)) < 2:
+        return messages
+    for zone in sorted(set(quorum_zones + disk_zones), key=str):
+        quorum_left = len(quorum_zones) - quorum_zones.count(zone)
+        disks_left = len(disk_zones) - disk_zones.count(zone)
+        if not quorum_left or disks_left <= len(disk_zones) // 2:
+            messages.append("Loss of zone %s leaves %s quorum nodes and %s of %s tiebreaker disks."
+                            % (zone, quorum_left, disks_left, len(disk_zones)))
+    return messages
+
+
+def read_tiebreaker_disks(group_vars_path=None, cluster_definition_path=None):
+    """ Read tiebreaker NSD names from generated group_vars or cluster definition """
+    tiebreaker_disks = ""
+    if cluster_definition_path:
+        tiebreaker_disks = read_json_file(cluster_definition_path).get(
+            'scale_cluster', {}).get('tiebreaker_disks', "")
+    elif group_vars_path:
+        with open(group_vars_path) as group_vars_handler:
+            group_vars = yaml.safe_load(group_vars_handler) or {}
+        tiebreaker_disks = group_vars.get('scale_cluster_config', {}).get('tiebreaker_disks', "")
+    return [each_disk for each_disk in tiebreaker_disks.split(';') if each_disk]
+
+
+def check_topology(nodes, disks, aliases, zones, tiebreaker_disks=None):
+    """ Check generated topology against placement invariants.
+    :args: nodes (list), disks (list), aliases (dict), zones (dict),
+           tiebreaker_disks (list of NSD names)
+    :return: errors (list), warnings (list)
+    """
+    errors, warnings = [], []
+
+    def resolve(node_ref):
+        return aliases.get(node_ref, node_ref)
+
+    node_by_ip = {}
+    for each_node in nodes:
+        node_ip = resolve(each_node['name'])
+        if each_node['daemon_nodename'] and node_ip == each_node['name']:
+            node_ip = resolve(each_node['daemon_nodename'])
+        each_node['ip'] = node_ip
+        node_by_ip[node_ip] = each_node
+
+    quorum_nodes = [each_node for each_node in nodes if each_node['is_quorum']]
+    manager_nodes = [each_node for each_node in nodes if each_node['is_manager']]
+    gui_nodes = [each_node for each_node in nodes if each_node['is_gui']]
+
+    # Quorum must be odd so that a majority can always be formed, with
+    # tiebreaker disks the majority is formed by the disks instead
+    if not quorum_nodes:
+        errors.append("No quorum node defined.")
+    elif tiebreaker_disks:
+        if len(quorum_nodes) > MAX_TIEBREAKER_QUORUM_COUNT:
+            errors.append("Tiebreaker disks support at most %s quorum nodes, found %s."
+                          % (MAX_TIEBREAKER_QUORUM_COUNT, len(quorum_nodes)))
+        if len(tiebreaker_disks) not in [1, 3]:
+            errors.append("Expected 1 or 3 tiebreaker disks, found %s." % len(tiebreaker_disks))
+        for each_nsd in sorted(set(tiebreaker_disks) - set(each_disk.get('nsd') for each_disk in disks)):
+            errors.append("Tiebreaker disk %s is not a defined NSD." % each_nsd)
+    elif len(quorum_nodes) % 2 == 0 and len(nodes) > 2:
+        errors.append("Even number of quorum nodes (%s)." % len(quorum_nodes))
+
+    if len(gui_nodes) != 1:
+        errors.append("Expected exactly one GUI node, found %s (%s)."
+                      % (len(gui_nodes), ", ".join(each_node['name'] for each_node in gui_nodes)))
+
+    # Zone checks are only possible when the inventory carries zone details
+    quorum_zones = [zones.get(each_node['ip']) for each_node in quorum_nodes]
+    if tiebreaker_disks:
+        disk_zones = [zones.get(resolve(str(each_disk['servers']).split(',')[0].strip()))
+                      for each_disk in disks if each_disk.get('nsd') in tiebreaker_disks]
+        messages = get_tiebreaker_zone_loss_messages(quorum_zones, disk_zones)
+        zone_count = len(set(quorum_zones + disk_zones))
+    elif len(set(quorum_zones)) > 1 and None not in quorum_zones:
+        messages = ["Loss of zone %s leaves %s of %s quorum nodes, majority is lost."
+                    % (zone, len(quorum_zones) - quorum_zones.count(zone), len(quorum_zones))
+                    for zone in get_zone_loss_violations(quorum_zones)]
+        zone_count = len(set(quorum_zones))
+    else:
+        messages, zone_count = [], 0
+    # Two zones can not survive either zone loss without a tiebreaker zone
+    if zone_count > 2:
+        errors.extend(messages)
+    else:
+        warnings.extend(messages)
+
+    cluster_zones = set(zones.get(each_node['ip']) for each_node in nodes) - {None}
+    manager_zones = set(zones.get(each_node['ip']) for each_node in manager_nodes) - {None}
+    if len(manager_nodes) > 1 and len(cluster_zones) > 1 and len(manager_zones) == 1:
+        errors.append("All manager nodes are placed in zone %s." % manager_zones.pop())
+    # Export IPs fail over within their zone, protocol nodes of one zone do not survive its loss
+    protocol_nodes = [each_node for each_node in nodes if each_node.get('is_protocol')]
+    protocol_zones = set(zones.get(each_node['ip']) for each_node in protocol_nodes) - {None}
+    if len(protocol_nodes) > 1 and len(cluster_zones) > 1 and len(protocol_zones) == 1:
+        warnings.append("All protocol nodes are placed in zone %s." % protocol_zones.pop())
+
+    # Every failure group needs NSD servers, descOnly disks belong to tiebreaker node
+    failure_groups = {}
+    for each_disk in disks:
+        servers = [resolve(each_server.strip())
+                   for each_server in str(each_disk['servers']).split(',')]
+        failure_groups.setdefault(each_disk['failureGroup'], set()).update(servers)
+        for each_server in servers:
+            if each_server not in node_by_ip:
+                errors.append("Disk %s server %s is not a cluster node."
+                              % (each_disk['device'], each_server))
+            elif not node_by_ip[each_server]['is_nsd']:
+                errors.append("Disk %s server %s is not an NSD server."
+                              % (each_disk['device'], each_server))
+            elif each_disk.get('usage') == 'descOnly' and \
+                    node_by_ip[each_server]['class'] != 'computedescnodegrp':
+                errors.append("descOnly disk %s is not served by the tiebreaker node."
+                              % each_disk['device'])
+    for failure_group, servers in failure_groups.items():
+        if not any(node_by_ip.get(each_server, {}).get('is_nsd') for each_server in servers):
+            errors.append("Failure group %s has no NSD server." % failure_group)
+
+    return errors, warnings
+
+
+def validate_topology(nodes, disks, tf_inv, tiebreaker_disks=None):
+    """ Print topology violations, exit on errors.
+    :args: nodes (list), disks (list), tf_inv (dict), tiebreaker_disks (list)
+    """
+    aliases, zones = get_node_aliases(tf_inv)
+    errors, warnings = check_topology(nodes, disks, aliases, zones, tiebreaker_disks)
+    for each_warning in warnings:
+        LOGGER.warning("Topology warning: %s", each_warning)
+    for each_error in errors:
+        LOGGER.error("Topology violation: %s", each_error)
+    if errors:
+        sys.exit(1)
+
+
+def get_topology_summary(nodes, disks, tf_inv):
+    """ Return node counts per role, node class and zone, disk counts per failure group.
+    :args: nodes (list), disks (list), tf_inv (dict)
+    """
+    aliases, zones = get_node_aliases(tf_inv)
+    summary = {"nodes": len(nodes),
+               "roles": {each_role: sum(1 for each_node in nodes if each_node['is_%s' % each_role])
+                         for each_role in ['quorum', 'manager', 'gui', 'collector', 'nsd']},
+               "classes": get_counts(each_node['class'] for each_node in nodes),
+               "disks": len(disks),
+               "failure_groups": get_counts(each_disk.get('failureGroup') for each_disk in disks)}
+    if zones:
+        summary["zones"] = get_counts(zones.get(aliases.get(each_node['name'], each_node['name']))
+                                      for each_node in nodes)
+    return summary
+
+
+if __name__ == "__main__":
+    PARSER = argparse.ArgumentParser(description='Validate generated ansible inventory '
+                                                 'topology before deployment.')
+    PARSER.add_argument('--tf_inv_path', required=True,
+                        help='Terraform inventory file path')
+    PARSER.add_argument('--inventory_path',
+                        help='Generated <cluster>_inventory.ini path')
+    PARSER.add_argument('--group_vars_path',
+                        help='Generated group_vars/<cluster>_cluster_config.yaml path')
+    PARSER.add_argument('--cluster_definition_path',
+                        help='Generated scale_clusterdefinition.json path')
+    PARSER.add_argument('--verbose', action='store_true',
+                        help='print log messages')
+    ARGUMENTS = PARSER.parse_args()
+    setup_logging(ARGUMENTS.verbose)
+
+    if ARGUMENTS.cluster_definition_path:
+        NODES, DISKS = read_json_topology(ARGUMENTS.cluster_definition_path)
+    elif ARGUMENTS.inventory_path:
+        NODES, DISKS = read_ini_topology(ARGUMENTS.inventory_path,
+                                         ARGUMENTS.group_vars_path)
+    else:
+        LOGGER.error("Either --inventory_path or --cluster_definition_path is required.")
+        sys.exit(1)
+
+    LOGGER.debug("Validating %s nodes and %s disks.", len(NODES), len(DISKS))
+    validate_topology(NODES, DISKS, read_json_file(ARGUMENTS.tf_inv_path),
+                      read_tiebreaker_disks(ARGUMENTS.group_vars_path,
+                                            ARGUMENTS.cluster_definition_path))
+    LOGGER.info("Topology validation passed.")